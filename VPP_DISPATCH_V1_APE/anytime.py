@@ -0,0 +1,117 @@
+from pymoo.core.callback import Callback
+from pymoo.core.termination import Termination
+from optimality_gap import best_feasible_index
+from variable_layout import VariableLayout
+from time import perf_counter
+import numpy as np
+
+'''
+    Este script fornece o comportamento "anytime" do GA (optimizer_GA): durante a execução é mantido o melhor despacho factível
+    já encontrado, que é informado a uma função do usuário sempre que melhora e que é sempre o resultado devolvido, inclusive
+    quando a execução é encerrada pelo limite de tempo.
+
+    - Classe BestFeasibleTracker(layout, on_improve, tol): callback do pymoo que, a cada geração, compara o melhor indivíduo
+      factível da população com o melhor já encontrado. Quando o lucro melhora (mais do que tol), guarda x, o lucro e a geração
+      e chama on_improve(dispatch), onde dispatch é um dicionário com:
+        - p_bm, p_chg, p_dch, soc, p_dl, u_bm, u_chg, u_dch, u_dl: variáveis de decisão decompostas, shape (N, Nt);
+        - profit: lucro do despacho;
+        - x: vetor de variáveis de decisão;
+        - n_gen: geração em que o despacho foi encontrado;
+        - elapsed: tempo decorrido desde o início da execução (s).
+
+    - Classe StagnationTermination(tracker, period): critério de parada do pymoo, satisfeito quando o melhor lucro factível não
+      melhora há period gerações.
+
+    - Classe Callbacks(*callbacks): executa vários callbacks do pymoo a cada geração.
+'''
+
+class BestFeasibleTracker(Callback):
+
+    def __init__(self, layout: VariableLayout, on_improve = None, tol: float = 1E-6):
+        super().__init__()
+        self.layout = layout
+        self.on_improve = on_improve
+        self.tol = tol
+
+        self.x = None # Melhor despacho factível
+        self.profit = - np.inf
+        self.n_gen = 0 # Geração da última melhora
+        self.history = [] # Lista de (n_gen, elapsed, profit) a cada melhora
+        self.start = None
+
+    def notify(self, algorithm):
+
+        if self.start is None:
+            self.start = perf_counter()
+
+        k = best_feasible_index(algorithm)
+        if k is None:
+            return
+
+        F = algorithm.pop.get('__F__')
+        if F is None:
+            F = algorithm.pop.get('F')
+        profit = - F[k, 0]
+
+        if profit > self.profit + self.tol:
+            self.x = np.array(algorithm.pop[k].X, dtype = np.float64)
+            self.profit = profit
+            self.n_gen = algorithm.n_gen
+            elapsed = perf_counter() - self.start
+            self.history.append((algorithm.n_gen, elapsed, profit))
+
+            if self.on_improve is not None:
+                dispatch = dict(zip(self.layout.NAMES, self.layout.decompose(self.x)))
+                dispatch.update(profit = profit, x = self.x.copy(), n_gen = algorithm.n_gen, elapsed = elapsed)
+                self.on_improve(dispatch)
+
+class StagnationTermination(Termination):
+
+    def __init__(self, tracker: BestFeasibleTracker, period: int):
+        super().__init__()
+        self.tracker = tracker
+        self.period = period
+
+    def _update(self, algorithm):
+
+        # Sem despacho factível a estagnação não é avaliada
+        if self.tracker.x is None:
+            return 0.0
+
+        return min(1.0, (algorithm.n_gen - self.tracker.n_gen) / self.period)
+
+class Callbacks(Callback):
+
+    def __init__(self, *callbacks: Callback):
+        super().__init__()
+        self.callbacks = callbacks
+
+    def notify(self, algorithm):
+        for callback in self.callbacks:
+            callback(algorithm)
+
+# Exemplo de uso
+if __name__ == '__main__':
+
+    from vpp_initial_data import vpp_data
+    from generator_scenarios import import_scenarios_from_pickle
+    from scenario_context import attach_scenario
+    from optimizer_GA import solver
+    from pathlib import Path
+
+    data = vpp_data()
+    data['Nt'] = 24
+
+    # Obtendo as projeções temporais iniciais a partir de um cenário gerado anteriormente
+    path = Path(__file__).parent / 'scenarios_with_PVGIS.pkl'
+    cenario = import_scenarios_from_pickle(path)[0]
+    attach_scenario(data, cenario)
+    data['p_dl_max'] = cenario['p_dl_ref'] * 1.2
+    data['p_dl_min'] = cenario['p_dl_ref'] * 0.8
+
+    # GA limitado a 10 segundos, encerrado antes se o melhor lucro não melhorar em 20 gerações
+    def on_improve(dispatch: dict):
+        print(f"\nGeração {dispatch['n_gen']} ({dispatch['elapsed']:.2f} s): lucro {dispatch['profit']:.4f}")
+
+    res = solver(data, n_gen = None, time_budget = 10.0, stagnation = 20, on_improve = on_improve)
+    print(f'Melhor lucro factível: {- res.F[0]:.4f} em {res.algorithm.n_gen} gerações')
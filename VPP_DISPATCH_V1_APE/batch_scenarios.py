@@ -0,0 +1,176 @@
+from variable_layout import get_layout
+from scenario_context import attach_scenario
+from optimizer_GA import solver
+from evaluator import evaluate
+from multiprocessing import Pool
+from time import perf_counter
+import numpy as np
+
+'''
+    Este script resolve o despacho da VPP para uma lista de cenários (por exemplo, os Ns cenários de create_scenarios), em
+    paralelo em um conjunto (pool) de processos, e reúne os resultados de cada cenário e as estatísticas do lucro, usados no
+    dimensionamento e na avaliação da VPP.
+
+    - O dicionário data (parâmetros da VPP, comuns a todos os cenários) é enviado uma única vez a cada processo, na
+      inicialização; cada tarefa leva apenas as projeções do cenário. O layout das variáveis e os kernels compilados (backend
+      'numba') também são criados uma única vez por processo e reutilizados em todos os cenários que ele resolve.
+
+    - Funções disponíveis:
+        - solve_scenarios(data, scenarios, optimizer, n_workers, delta, **kwargs): resolve cada cenário de scenarios com
+          optimizer(data_cenário, **kwargs) (padrão: optimizer_GA.solver; aceita optimizer_MILP.solver_milp ou
+          rolling_horizon.rolling_horizon) e retorna um BatchResult. Quando o cenário não contém p_dl_max e p_dl_min, a banda de
+          corte de carga é p_dl_ref * (1 ± delta), como em script.py;
+        - scenario_data(data, scenario, delta): dicionário data de um cenário (parâmetros de data e projeções do cenário);
+        - common_data(data, scenarios): parâmetros de data comuns a todos os cenários (sem as projeções);
+        - statistics(profit, percentiles): média, desvio padrão, percentis, melhor e pior caso do lucro (cenários sem solução
+          são ignorados).
+
+    - Classe BatchResult, com os resultados na ordem de scenarios:
+        - profit, CV, elapsed: lucro e violação total das restrições do despacho (avaliados com evaluator.evaluate) e tempo de
+          solução de cada cenário, shape (Ns,) (NaN sem solução);
+        - X: despachos, shape (Ns, Nr + Ni);
+        - dispatch: dicionário com as variáveis de decisão decompostas de todos os cenários, shape (Ns, N, Nt);
+        - stats: estatísticas do lucro (statistics);
+        - median_index(): índice do cenário de lucro mediano (None se nenhum cenário tiver solução);
+        - summary(): texto com as estatísticas.
+'''
+
+# Parâmetros da VPP, otimizador e opções de cada processo (definidos em _init_worker)
+_worker_data = None
+_worker_optimizer = None
+_worker_options = None
+
+def _init_worker(data: dict, optimizer, options: dict)-> None:
+
+    global _worker_data, _worker_optimizer, _worker_options
+
+    _worker_data = data
+    _worker_optimizer = optimizer
+    _worker_options = options
+
+def scenario_data(data: dict, scenario: dict, delta: float = 0.2)-> dict:
+
+    # Dicionário data do cenário: parâmetros comuns (sem cópia dos arrays) e projeções do cenário
+    data = dict(data)
+    attach_scenario(data, scenario)
+    if 'p_dl_max' not in scenario:
+        data['p_dl_max'] = scenario['p_dl_ref'] * (1 + delta)
+        data['p_dl_min'] = scenario['p_dl_ref'] * (1 - delta)
+
+    return data
+
+def common_data(data: dict, scenarios: list)-> dict:
+
+    # Parâmetros comuns a todos os cenários (sem as projeções e o contexto de um cenário anterior)
+    keys = set().union(*scenarios) | {'scenario_ctx', 'p_dl_max', 'p_dl_min'}
+    return {key: value for key, value in data.items() if key not in keys}
+
+def _solve(task: tuple)-> tuple:
+
+    k, scenario, delta = task
+    data = scenario_data(_worker_data, scenario, delta)
+
+    start = perf_counter()
+    res = _worker_optimizer(data, **_worker_options)
+    elapsed = perf_counter() - start
+
+    if res.X is None:
+        return k, None, np.nan, np.nan, elapsed
+
+    # Lucro e violação do despacho avaliados com as mesmas funções para todos os otimizadores (res.F do GA é o objetivo
+    # penalizado quando não há indivíduo factível)
+    x = np.asarray(res.X, dtype = np.float64)
+    fval, c_ieq, c_eq = evaluate(x, data)
+
+    return k, x, fval, np.sum(np.maximum(0, c_ieq)) + np.sum(np.abs(c_eq)), elapsed
+
+def statistics(profit: np.ndarray, percentiles: tuple = (5, 25, 50, 75, 95))-> dict:
+
+    solved = profit[np.isfinite(profit)]
+    if len(solved) == 0:
+        return {'solved': 0}
+
+    stats = {'solved': len(solved), 'mean': np.mean(solved), 'std': np.std(solved)}
+    for q, value in zip(percentiles, np.percentile(solved, percentiles)):
+        stats[f'p{q}'] = value
+    stats['worst'] = np.min(solved)
+    stats['worst_index'] = int(np.flatnonzero(profit == stats['worst'])[0])
+    stats['best'] = np.max(solved)
+
+    return stats
+
+class BatchResult:
+
+    def __init__(self, layout, X: np.ndarray, profit: np.ndarray, CV: np.ndarray, elapsed: np.ndarray):
+        self.X = X
+        self.profit = profit
+        self.CV = CV
+        self.elapsed = elapsed
+        self.dispatch = dict(zip(layout.NAMES, layout.decompose(X)))
+        self.stats = statistics(profit)
+
+    def median_index(self)-> int:
+        solved = np.flatnonzero(np.isfinite(self.profit))
+        if len(solved) == 0:
+            return None
+        return int(solved[np.argsort(self.profit[solved])[len(solved) // 2]])
+
+    def summary(self)-> str:
+
+        stats = self.stats
+        if stats['solved'] == 0:
+            return 'Nenhum cenário com solução'
+
+        lines = [f"Cenários resolvidos: {stats['solved']} de {len(self.profit)}",
+                 f"Lucro médio: {stats['mean']:.4f} (desvio padrão {stats['std']:.4f})"]
+        lines += [f'Percentil {key[1:]}: {value:.4f}' for key, value in stats.items() if key.startswith('p') and key[1:].isdigit()]
+        lines += [f"Pior caso: {stats['worst']:.4f} (cenário {stats['worst_index']})",
+                  f"Melhor caso: {stats['best']:.4f}",
+                  f'Tempo total de solução: {np.sum(self.elapsed):.2f} s']
+
+        return '\n'.join(lines)
+
+def solve_scenarios(data: dict, scenarios: list, optimizer = None, n_workers: int = 1, delta: float = 0.2, **kwargs)-> BatchResult:
+
+    if optimizer is None:
+        optimizer = solver
+
+    common = common_data(data, scenarios)
+    layout = get_layout(data)
+
+    Ns = len(scenarios)
+    X = np.full((Ns, layout.nvars), np.nan)
+    profit, CV, elapsed = np.full(Ns, np.nan), np.full(Ns, np.nan), np.zeros(Ns)
+
+    tasks = [(k, scenario, delta) for k, scenario in enumerate(scenarios)]
+    if n_workers > 1:
+        with Pool(n_workers, initializer = _init_worker, initargs = (common, optimizer, kwargs)) as pool:
+            results = list(pool.imap_unordered(_solve, tasks))
+    else:
+        _init_worker(common, optimizer, kwargs)
+        results = [_solve(task) for task in tasks]
+
+    for k, x, p, cv, t in results:
+        if x is not None:
+            X[k] = x
+        profit[k], CV[k], elapsed[k] = p, cv, t
+
+    return BatchResult(layout, X, profit, CV, elapsed)
+
+# Exemplo de uso
+if __name__ == '__main__':
+
+    from vpp_initial_data import vpp_data
+    from generator_scenarios import import_scenarios_from_pickle
+    from pathlib import Path
+
+    data = vpp_data()
+    data['Nt'] = 24
+
+    # Cenários gerados anteriormente, resolvidos em 4 processos
+    path = Path(__file__).parent / 'scenarios_with_PVGIS.pkl'
+    cenarios = import_scenarios_from_pickle(path)
+
+    batch = solve_scenarios(data, cenarios, n_workers = 4, n_gen = 100, verbose = False)
+    print(batch.summary())
+    print(f"\nSoC do cenário mediano, shape {batch.dispatch['soc'][batch.median_index()].shape}")
@@ -0,0 +1,273 @@
+from vpp_initial_data import vpp_data
+from generator_scenarios import import_scenarios_from_pickle
+from scenario_context import attach_scenario
+from decompose_vetor import decompose, decompose_pop
+from objetive_function import obj_function, obj_function_pop
+from ieq_constraints import ieq_constr, ieq_constr_pop
+from eq_constraints import eq_constr, eq_constr_pop
+from evaluator import evaluate
+from get_limits import bounds
+from timeit import Timer
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+import platform
+import json
+
+'''
+    Este script fornece o conjunto de micro-benchmarks do caminho crítico do despacho (decomposição, função objetivo,
+    restrições e limites), com os tempos de referência (baseline) gravados em um arquivo JSON. Cada otimização é verificada
+    comparando os tempos atuais com os tempos de referência medidos na mesma máquina.
+
+    - Casos: cada combinação de período Nt (padrão: 24, 96, 168 e 8760 h) e de escala da frota (padrão: 1, 10 e 100 vezes os
+      ativos de vpp_data(), ou seja, de 3 UBTMs, 2 armazenadores e 2 cargas despacháveis até centenas de ativos). As projeções
+      são os cenários de scenarios_with_PVGIS.pkl repetidos até completar Nt e replicadas para cada cópia dos ativos.
+
+    - Funções medidas:
+        - Indivíduo único (x 1-D): decompose, obj_function, ieq_constr, eq_constr e bounds;
+        - População (X 2-D, pop_size indivíduos): decompose_pop, obj_function_pop, ieq_constr_pop, eq_constr_pop e evaluate
+          (avaliador único do GA). Nos casos grandes a população é reduzida para que X ocupe no máximo max_mb MB.
+
+    - O tempo de cada função é o menor tempo médio por chamada entre repeat repetições (timeit), cada uma com chamadas
+      suficientes para durar ao menos min_time segundos. Funções que levam mais que 5 * min_time em uma única chamada são
+      medidas uma única vez (por exemplo, os laços em Python de ieq_constr com Nt = 8760 e centenas de ativos). A referência
+      (--save) é medida com mais repetições e repetições mais longas (BASELINE_MIN_TIME e BASELINE_REPEAT), para que o seu
+      menor tempo seja estável.
+
+    - Ruído: um caso só é regressão quando o tempo atual passa de referência * (1 + tolerance) + slack. A folga absoluta slack
+      (padrão: 0.05 ms) cobre a variação das funções que levam frações de milissegundo (alocação, cache e escalonamento do
+      sistema). Os casos acima da tolerância são medidos novamente (confirm, até 3 vezes) e só são regressões se continuarem
+      lentos, pois os períodos lentos da máquina (outros processos, frequência da CPU) atrasam também os casos mais longos.
+
+    - Funções disponíveis:
+        - benchmark_data(Nt, scale): dados da VPP para o caso (Nt, scale);
+        - run_benchmarks(Nts, scales, pop_size, max_mb, min_time, repeat, verbose, keys): tempos de todos os casos (ou apenas
+          dos casos em keys), {'função|modo|Nt=..|scale=..': segundos por chamada};
+        - save_baseline(results, path) / load_baseline(path): grava e lê os tempos de referência (com a versão do Python,
+          do NumPy e a máquina);
+        - compare(results, baseline, tolerance, slack): tabela (lista de tuplas) com a razão entre os tempos atuais e os de
+          referência;
+        - confirm(results, baseline, tolerance, slack, rounds, pop_size): mede novamente (até rounds vezes) os casos acima da
+          tolerância e retorna os tempos com o menor valor de cada caso;
+        - missing(results, baseline): casos da referência que não foram medidos e casos medidos que não estão na referência;
+        - check(results, baseline, tolerance, slack): levanta RuntimeError quando algum caso medido não está na referência (por
+          exemplo, com outro --pop-size) ou quando algum caso fica mais que tolerance (fração, padrão 0.25 = 25 %) mais slack
+          (segundos, padrão 5E-5) mais lento que a referência.
+
+    - Uso (na pasta VPP_DISPATCH_V1_APE):
+        - python benchmark.py --save: mede todos os casos e grava benchmark_baseline.json;
+        - python benchmark.py: mede e compara com benchmark_baseline.json, terminando com erro (código 1) se houver regressão;
+        - python benchmark.py --nt 24 96 --scale 1 10 --tolerance 0.1 --slack 0.01: casos, tolerância e folga (ms) escolhidos.
+'''
+
+BASELINE = Path(__file__).parent / 'benchmark_baseline.json'
+
+NTS = (24, 96, 168, 8760)
+SCALES = (1, 10, 100)
+
+# Medição da referência (--save): repetições mais longas e em maior número que as da comparação
+BASELINE_MIN_TIME = 0.5
+BASELINE_REPEAT = 15
+
+def benchmark_data(Nt: int, scale: int = 1)-> dict:
+
+    data = vpp_data()
+
+    # Frota com scale cópias de cada ativo (quantidades Nbm, Npv, ... e parâmetros por ativo repetidos)
+    for key, value in list(data.items()):
+        if key.startswith('N'):
+            data[key] = value * scale
+        elif isinstance(value, np.ndarray):
+            data[key] = np.tile(value, scale)
+    data['Nt'] = Nt
+
+    # Projeções: cenários de 24 h repetidos até completar Nt e replicados para cada cópia dos ativos
+    path = Path(__file__).parent / 'scenarios_with_PVGIS.pkl'
+    cenarios = import_scenarios_from_pickle(path)
+    days = -(-Nt // 24)
+    cenario = {}
+    for key in cenarios[0]:
+        series = np.concatenate([np.asarray(cenarios[d % len(cenarios)][key]) for d in range(days)], axis = -1)[..., :Nt]
+        cenario[key] = np.tile(series, (scale, 1)) if series.ndim == 2 else series
+    attach_scenario(data, cenario)
+    data['p_dl_max'] = cenario['p_dl_ref'] * 1.2
+    data['p_dl_min'] = cenario['p_dl_ref'] * 0.8
+
+    return data
+
+def _time(function, min_time: float, repeat: int)-> float:
+
+    timer = Timer(function)
+
+    # Chamadas por repetição (timeit.autorange): a primeira medida já conta como uma repetição
+    number, elapsed = timer.autorange()
+    if elapsed >= 5 * min_time and number == 1:
+        return elapsed
+
+    times = [elapsed / number] + [timer.timeit(number) / number for _ in range(repeat - 1)]
+
+    return min(times)
+
+def _key(name: str, mode: str, Nt: int, scale: int)-> str:
+    return f'{name}|{mode}|Nt={Nt}|scale={scale}'
+
+def run_benchmarks(Nts: tuple = NTS, scales: tuple = SCALES, pop_size: int = 50, max_mb: float = 256, min_time: float = 0.2,
+                   repeat: int = 5, verbose: bool = True, keys: set = None)-> dict:
+
+    results = {}
+
+    for Nt in Nts:
+        for scale in scales:
+
+            if keys is not None and not any(key.endswith(f'|Nt={Nt}|scale={scale}') for key in keys):
+                continue
+
+            # Mesma população em todas as medições do caso (inclusive nas repetições de confirm)
+            rng = np.random.default_rng([1, Nt, scale])
+            data = benchmark_data(Nt, scale)
+            ub, lb = bounds(data)
+
+            # População dentro dos limites (reduzida para ocupar no máximo max_mb MB)
+            n_pop = int(max(1, min(pop_size, max_mb * 1E6 // (8 * ub.size))))
+            X = lb + rng.random((n_pop, ub.size)) * (ub - lb)
+            x = X[0].copy()
+
+            single = {'decompose': lambda: decompose(x, data),
+                      'obj_function': lambda: obj_function(x, data),
+                      'ieq_constr': lambda: ieq_constr(x, data),
+                      'eq_constr': lambda: eq_constr(x, data),
+                      'bounds': lambda: bounds(data)}
+            population = {'decompose_pop': lambda: decompose_pop(X, data),
+                          'obj_function_pop': lambda: obj_function_pop(X, data),
+                          'ieq_constr_pop': lambda: ieq_constr_pop(X, data),
+                          'eq_constr_pop': lambda: eq_constr_pop(X, data),
+                          'evaluate': lambda: evaluate(X, data)}
+
+            # Casos de população identificados pelo pop_size pedido (n_pop depende apenas de pop_size, max_mb e do caso)
+            for mode, functions in (('single', single), (f'pop{pop_size}', population)):
+                for name, function in functions.items():
+                    key = _key(name, mode, Nt, scale)
+                    if keys is not None and key not in keys:
+                        continue
+                    results[key] = _time(function, min_time, repeat)
+                    if verbose:
+                        print(f'{key:<50}{results[key] * 1E3:>14.4f} ms')
+
+    return results
+
+def save_baseline(results: dict, path = BASELINE)-> None:
+
+    baseline = {'created': datetime.now().isoformat(timespec = 'seconds'),
+                'python': platform.python_version(),
+                'numpy': np.__version__,
+                'machine': f'{platform.system()} {platform.machine()} {platform.processor()}'.strip(),
+                'results': results}
+
+    with open(Path(path), 'w') as file:
+        json.dump(baseline, file, indent = 2)
+
+def load_baseline(path = BASELINE)-> dict:
+
+    with open(Path(path)) as file:
+        return json.load(file)
+
+def compare(results: dict, baseline: dict, tolerance: float = 0.25, slack: float = 5E-5)-> list[tuple]:
+
+    # (caso, tempo de referência, tempo atual, razão, regressão) para os casos presentes nas duas medições
+    reference = baseline['results']
+    rows = []
+    for key, current in results.items():
+        if key in reference:
+            ratio = current / reference[key]
+            rows.append((key, reference[key], current, ratio, current > reference[key] * (1 + tolerance) + slack))
+
+    return rows
+
+def confirm(results: dict, baseline: dict, tolerance: float = 0.25, slack: float = 5E-5, rounds: int = 3, pop_size: int = 50,
+            verbose: bool = True, **kwargs)-> dict:
+
+    # Casos acima da tolerância medidos novamente (até rounds vezes), mantendo o menor tempo: uma regressão real continua
+    # lenta em todas as medições, enquanto a variação da máquina (outros processos, frequência da CPU) é transitória
+    results = dict(results)
+    for _ in range(rounds):
+        keys = {row[0] for row in compare(results, baseline, tolerance, slack) if row[4]}
+        if not keys:
+            break
+        if verbose:
+            print(f'\nMedindo novamente {len(keys)} caso(s) acima da tolerância')
+        Nts = sorted({int(key.split('|')[2][3:]) for key in keys})
+        scales = sorted({int(key.split('|')[3][6:]) for key in keys})
+        again = run_benchmarks(Nts, scales, pop_size = pop_size, verbose = verbose, keys = keys, **kwargs)
+        results.update({key: min(results[key], value) for key, value in again.items()})
+
+    return results
+
+def missing(results: dict, baseline: dict)-> tuple[list, list]:
+
+    reference = baseline['results']
+    return [key for key in reference if key not in results], [key for key in results if key not in reference]
+
+def check(results: dict, baseline: dict, tolerance: float = 0.25, slack: float = 5E-5)-> None:
+
+    rows = compare(results, baseline, tolerance, slack)
+    not_in_baseline = missing(results, baseline)[1]
+    if not rows or not_in_baseline:
+        raise RuntimeError(f'{len(not_in_baseline)} de {len(results)} caso(s) medido(s) sem referência: confira --nt, --scale e --pop-size '
+                           'ou grave uma nova referência com --save')
+
+    regressions = [row for row in rows if row[4]]
+    if regressions:
+        lines = [f'    {key}: {reference * 1E3:.4f} ms -> {current * 1E3:.4f} ms ({ratio:.2f}x)' for key, reference, current, ratio, _ in regressions]
+        raise RuntimeError(f'{len(regressions)} caso(s) mais de {tolerance:.0%} (+ {slack * 1E3:.3f} ms) mais lento(s) que a referência:\n'
+                           + '\n'.join(lines))
+
+# Exemplo de uso
+if __name__ == '__main__':
+
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description = 'Micro-benchmarks do caminho crítico do despacho da VPP')
+    parser.add_argument('--nt', type = int, nargs = '+', default = NTS, help = 'Períodos Nt (padrão: 24 96 168 8760)')
+    parser.add_argument('--scale', type = int, nargs = '+', default = SCALES, help = 'Escalas da frota (padrão: 1 10 100)')
+    parser.add_argument('--pop-size', type = int, default = 50, help = 'Indivíduos da população (padrão: 50)')
+    parser.add_argument('--tolerance', type = float, default = 0.25, help = 'Lentidão tolerada em relação à referência (padrão: 0.25)')
+    parser.add_argument('--slack', type = float, default = 0.05, help = 'Folga absoluta em ms para o ruído dos casos rápidos (padrão: 0.05)')
+    parser.add_argument('--baseline', type = Path, default = BASELINE, help = 'Arquivo JSON de referência')
+    parser.add_argument('--save', action = 'store_true', help = 'Grava os tempos medidos como referência')
+    args = parser.parse_args()
+
+    if args.save:
+        results = run_benchmarks(tuple(args.nt), tuple(args.scale), pop_size = args.pop_size, min_time = BASELINE_MIN_TIME,
+                                 repeat = BASELINE_REPEAT)
+    else:
+        results = run_benchmarks(tuple(args.nt), tuple(args.scale), pop_size = args.pop_size)
+
+    if args.save:
+        save_baseline(results, args.baseline)
+        print(f'\nReferência gravada em {args.baseline}')
+        sys.exit(0)
+
+    if not args.baseline.exists():
+        print(f'\nReferência {args.baseline} não encontrada; grave-a com --save')
+        sys.exit(1)
+
+    baseline = load_baseline(args.baseline)
+    results = confirm(results, baseline, args.tolerance, args.slack / 1E3, pop_size = args.pop_size)
+    print(f'\nReferência de {baseline["created"]} (Python {baseline["python"]}, NumPy {baseline["numpy"]}, {baseline["machine"]})')
+    for key, reference, current, ratio, regression in compare(results, baseline, args.tolerance, args.slack / 1E3):
+        print(f'{key:<50}{reference * 1E3:>12.4f}{current * 1E3:>12.4f} ms{ratio:>8.2f}x{"  REGRESSÃO" if regression else ""}')
+
+    not_run, not_in_baseline = missing(results, baseline)
+    if not_run:
+        print(f'\n{len(not_run)} caso(s) da referência não medido(s):\n    ' + '\n    '.join(not_run))
+    if not_in_baseline:
+        print(f'\n{len(not_in_baseline)} caso(s) medido(s) sem referência:\n    ' + '\n    '.join(not_in_baseline))
+
+    try:
+        check(results, baseline, args.tolerance, args.slack / 1E3)
+    except RuntimeError as error:
+        print(f'\n{error}')
+        sys.exit(1)
+
+    print('\nSem regressões')
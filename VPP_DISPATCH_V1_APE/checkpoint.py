@@ -0,0 +1,110 @@
+from pymoo.core.meta import Meta
+from time import perf_counter
+from pathlib import Path
+from types import FunctionType
+import importlib
+import pickle
+import sys
+import gzip
+import os
+
+'''
+    Este script fornece pontos de verificação (checkpoints) para execuções longas do GA (optimizer_GA). O estado completo do
+    algoritmo do pymoo (população, gerador de números aleatórios, contador de gerações, critério de parada e o esquema de epsilon
+    de AdaptiveEpsilonConstraintHandling) é serializado com pickle e compactado com gzip. A retomada a partir do arquivo continua
+    a execução exatamente como se ela não tivesse sido interrompida (mesmos resultados para a mesma semente).
+
+    Objetos que dependem do processo atual (o problema do pymoo, definido dentro de optimizer_GA.solver, o avaliador da
+    população, que pode conter um pool de processos e memória compartilhada, e a barra de progresso) não são gravados: são registrados como referências
+    externas e, na retomada, substituídos pelos objetos recriados no novo processo.
+
+    - Funções disponíveis:
+        - save_checkpoint(path, algorithm, external): grava o estado do algoritmo em path (escrita atômica);
+        - load_checkpoint(path, external): lê o estado do algoritmo de path;
+
+    - Classe Checkpointer(path, every, seconds): decide quando gravar (a cada every gerações e/ou a cada seconds segundos).
+
+    - external: dicionário {nome: objeto} com os objetos externos (por exemplo, {'problem': problem, 'evaluator': evaluator}).
+'''
+
+def _new_meta(clazz: type, wrapped: type):
+
+    # Recria a classe dinâmica de pymoo.core.meta.Meta (clazz + mro da classe envolvida) sem executar __init__
+    obj = object.__new__(wrapped)
+    obj.__class__ = type(clazz.__name__, tuple([clazz] + wrapped.mro()), {})
+    return obj
+
+def _set_meta_state(obj, state: dict)-> None:
+    obj.__dict__ = state
+
+def _lookup(module: str, name: str):
+    return getattr(importlib.import_module(module), name)
+
+class _Pickler(pickle.Pickler):
+
+    def __init__(self, file, external: dict):
+        super().__init__(file, protocol = pickle.HIGHEST_PROTOCOL)
+        self.external = {id(obj): name for name, obj in external.items()}
+
+    def persistent_id(self, obj):
+        return self.external.get(id(obj))
+
+    def reducer_override(self, obj):
+
+        # Objetos Meta do pymoo (por exemplo, AdaptiveEpsilonConstraintHandling) têm uma classe criada dinamicamente, que não
+        # pode ser localizada por nome: são gravados pela classe do wrapper, pela classe envolvida e pelo dicionário de atributos
+        if isinstance(obj, Meta) and not isinstance(obj, type):
+            clazz, wrapped = type(obj).__bases__[:2]
+            return _new_meta, (clazz, wrapped), obj.__dict__, None, None, _set_meta_state
+
+        # Funções decoradas do pymoo (por exemplo, comp_by_cv_and_fitness, com @default_random_state) são funções locais do
+        # decorador, mas estão disponíveis pelo nome no módulo da função original (guardada no closure do decorador)
+        if isinstance(obj, FunctionType) and '<locals>' in obj.__qualname__:
+            for cell in obj.__closure__ or ():
+                func = cell.cell_contents
+                if isinstance(func, FunctionType) and getattr(sys.modules.get(func.__module__), func.__name__, None) is obj:
+                    return _lookup, (func.__module__, func.__name__)
+
+        return NotImplemented
+
+class _Unpickler(pickle.Unpickler):
+
+    def __init__(self, file, external: dict):
+        super().__init__(file)
+        self.external = external
+
+    def persistent_load(self, pid):
+        return self.external[pid]
+
+def save_checkpoint(path, algorithm, external: dict)-> None:
+
+    # Escrita em um arquivo temporário seguida de substituição (um checkpoint interrompido não corrompe o anterior)
+    path = Path(path)
+    tmp = path.with_name(path.name + '.tmp')
+    with gzip.open(tmp, 'wb') as file:
+        _Pickler(file, external).dump(algorithm)
+    os.replace(tmp, path)
+
+def load_checkpoint(path, external: dict):
+
+    with gzip.open(path, 'rb') as file:
+        return _Unpickler(file, external).load()
+
+class Checkpointer:
+
+    def __init__(self, path, every: int = None, seconds: float = None):
+        self.path = path
+        self.every = every
+        self.seconds = seconds
+        self.last = perf_counter()
+
+    def due(self, n_gen: int)-> bool:
+
+        by_gen = self.every is not None and n_gen % self.every == 0
+        by_time = self.seconds is not None and perf_counter() - self.last >= self.seconds
+
+        return by_gen or by_time
+
+    def save(self, algorithm, external: dict)-> None:
+        save_checkpoint(self.path, algorithm, external)
+        self.last = perf_counter()
@@ -1,3 +1,5 @@
+from variable_layout import get_layout
+from profiling import instrument
 import numpy as np
 
 """
@@ -39,88 +41,27 @@ import numpy as np
 
 def decompose(x: np.ndarray, data: dict)-> tuple[np.ndarray, ...]:
 
-    # Parâmetros iniciais de VPP
-    Nt = data['Nt'] # Período de simulação da VPP
-    Ndl = data['Ndl'] # Quantidade de cargas despacháveis da VPP
-    Nbm = data['Nbm'] # Quantidade de usinas de biomassa da VPP
-    Nbat = data['Nbat'] # Quantidade de armazenadores da VPP
-
-    # Definindo a quantidade de variáveis reais (Nr) e variáveis inteiras (Ni)
-    # Variáveis reais: p_bm, p_chg, p_dch, soc, p_dl
-    Nr = (Nt * Nbm) + (Nt * Nbat) + (Nt * Nbat) + (Nbat * Nt) + (Nt * Ndl)
-    # Variáveis inteiras: u_bm, u_chg, u_dch, u_dl
-    Ni = (Nt * Nbm) + (Nt * Nbat) + (Nt * Nbat) + (Nt * Ndl)
-
-    # Definindo o vetor de variáveis reais (xr)
-    begin = 0
-    end = Nr
-    xr = np.array(x[begin: end])
-
-    # Definindo o vetor de variáveis inteiras (xi)
-    begin = end
-    end = end + Ni
-    xi = np.array(x[begin: end])
-
-    # Obtenção da variável de decisão p_bm (potência da biomassa)
-    begin = 0
-    end = (Nt * Nbm)
-    p_bm = xr[begin: end]
-    p_bm = p_bm.reshape((Nbm, Nt)) # Ajustando a dimensão da de p_bm para (Nbm, Nt)
-
-    # Obtenção da variável de decisão p_chg (potência de carregamento dos armazenadores)
-    begin = end
-    end = end + (Nt * Nbat)
-    p_chg = xr[begin: end]
-    p_chg = p_chg.reshape((Nbat, Nt)) # Ajustando a dimensão da de p_bm para (Nbm, Nt)
-
-    # Obtenção da variável de decisão p_dch (potência de descarregamento dos armazenadores)
-    begin = end
-    end = end + (Nt * Nbat)
-    p_dch = xr[begin: end]
-    p_dch = p_dch.reshape((Nbat, Nt)) # Ajustando a dimensão da de p_bm para (Nbm, Nt)
-
-    # Obtenção da variável de decisão soc (State of Charge - Estado de Carga)
-    begin = end
-    end = end + (Nt * Nbat)
-    soc = xr[begin: end]
-    soc = soc.reshape((Nbat, Nt)) # Ajustando a dimensão da de p_bm para (Nbm, Nt)
-
-    # Obtenção da variável de decisão p_dl (potência das cargas despacháveis)
-    begin = end
-    end = end + (Nt * Ndl)
-    p_dl = xr[begin: end]
-    p_dl = p_dl.reshape((Ndl, Nt)) # Ajustando a dimensão da de p_bm para (Nbm, Nt)
-
-    # Obtenção da variável de estado da usinas de biomassa (u_bm), onde: (0 = desligado e 1 ligado)
-    begin = 0
-    end = (Nt * Nbm)
-    u_bm = xi[begin: end]
-    u_bm = np.float64(u_bm > 0.5) # Lógica para que u_bm seja binário
-    u_bm = u_bm.reshape((Nbm, Nt)) # Ajustando a dimensão de u_bm para (Nbm, Nt) 
-
-    # Obtenção da variável de estado de carregamento dos armazenadores da VPP (u_chg), onde: (0 = desligado e 1 ligado)
-    begin = end
-    end = end + (Nt * Nbat)
-    u_chg = xi[begin: end]
-    u_chg = np.float64(u_chg > 0.5) # Lógica para que u_chg seja binário
-    u_chg = u_chg.reshape((Nbat, Nt)) # Ajustando a dimensão de u_bm para (Nbat, Nt) 
-
-    # Obtenção da variável de estado de descarregamento dos armazenadores da VPP (u_dch), onde: (0 = desligado e 1 ligado)
-    begin = end
-    end = end + (Nt * Nbat)
-    u_dch = xi[begin: end]
-    u_dch = np.float64(u_dch > 0.5) # Lógica para que u_bm seja binário
-    u_dch = u_dch.reshape((Nbat, Nt)) # Ajustando a dimensão de u_bm para (Nbat, Nt) 
-
-    # Obtenção da variável de estado das cargas despacháveis da VPP (u_dl), onde: (0 = desligado e 1 ligado)
-    begin = end
-    end = end + (Nt * Ndl)
-    u_dl = xi[begin: end]
-    u_dl = np.float64(u_dl > 0.5) # Lógica para que u_dl seja binário
-    u_dl = u_dl.reshape((Ndl, Nt)) # Ajustando a dimensão de u_bm para (Ndl, Nt) 
+    # Layout do vetor de variáveis para os parâmetros da VPP (Nt, Nbm, Nbat, Ndl)
+    layout = get_layout(data)
+
+    # As variáveis reais são visões de x (sem cópia) e as inteiras são binarizadas (0 = desligado e 1 ligado)
+    p_bm, p_chg, p_dch, soc, p_dl, u_bm, u_chg, u_dch, u_dl = layout.decompose(np.asarray(x))
 
     return p_bm, p_chg, p_dch, soc, p_dl, u_bm, u_chg, u_dch, u_dl
 
+"""
+    Versão populacional de decompose: recebe uma matriz de indivíduos X, shape (Npop, Nr + Ni), e retorna as mesmas variáveis
+    de decisão com uma dimensão extra para a população, ou seja, no layout (Npop, N, Nt), onde N é a quantidade de ativos (Nbm, Nbat ou Ndl).
+"""
+
+@instrument()
+def decompose_pop(X: np.ndarray, data: dict)-> tuple[np.ndarray, ...]:
+
+    # Layout do vetor de variáveis para os parâmetros da VPP (Nt, Nbm, Nbat, Ndl)
+    layout = get_layout(data)
+
+    return layout.decompose(np.atleast_2d(X))
+
 # Exemplo de uso
 if __name__ == '__main__':
 
@@ -129,19 +70,12 @@ if __name__ == '__main__':
     # Obtendo os parâmetros iniciais
     data = vpp_data()
     data['Nt'] = 24
-    Nt = data['Nt']
-    Ndl = data['Ndl']
-    Nbm = data['Nbm']
-    Nbat = data['Nbat']
 
-    # Definindo a quantidade de variáveis reais (Nr) e variáveis inteiras (Ni)
-    # p_bm, p_chg, p_dch, soc, p_dl
-    Nr = (Nt * Nbm) + (Nt * Nbat) + (Nbat * Nt) + (Nt * Nbat) + (Nt * Ndl)
-    # u_bm, u_chg, u_dch, u_dl
-    Ni = (Nt * Nbm) + (Nt * Nbat) + (Nt * Nbat) + (Nt * Ndl)
+    # Quantidade de variáveis de decisão (Nr + Ni)
+    nvars = get_layout(data).nvars
 
     # Gerando um população inicial de teste
-    x = np.random.rand(Nr + Ni)
+    x = np.random.rand(nvars)
 
     # Decompondo a população inicial em variáveis de decisão para teste
     p_bm, p_chg, p_dch, soc, p_dl, u_bm, u_chg, u_dch, u_dl = decompose(x, data)
@@ -0,0 +1,147 @@
+from variable_layout import get_layout, VariableLayout
+from decompose_vetor import decompose
+from scenario_context import get_context
+from evaluator import evaluate
+from get_limits import bounds
+from linear_constraints import compile_constraints
+from scipy import sparse
+from scipy.optimize import minimize
+import numpy as np
+
+'''
+    Este script fornece as derivadas analíticas do modelo de despacho da VPP, considerando as variáveis de estado (u_bm, u_chg,
+    u_dch, u_dl) fixas. Nessa condição a função objetivo é linear por partes nas variáveis reais (p_bm, p_chg, p_dch, soc, p_dl)
+    e as restrições de desigualdade e de igualdade são lineares, de modo que suas derivadas em relação às variáveis de estado são
+    nulas (as colunas correspondentes às variáveis inteiras ficam vazias).
+
+    - Funções disponíveis:
+        - obj_gradient(x: np.ndarray, data: dict): gradiente do lucro (obj_function) em relação a x, shape (Nr + Ni,);
+        - ieq_jacobian(data: dict): jacobiana das restrições de desigualdade (ieq_constr), scipy.sparse.csr_matrix, shape (Nieq, Nr + Ni);
+        - eq_jacobian(data: dict): jacobiana das restrições de igualdade (eq_constr), scipy.sparse.csr_matrix, shape (Neq, Nr + Ni);
+        - local_refine(x: np.ndarray, data: dict, method: str): refinamento local das variáveis reais de x (SLSQP ou trust-constr),
+          mantendo as variáveis de estado fixas.
+
+    - As jacobianas são as colunas das variáveis reais das matrizes compiladas por linear_constraints (cujos padrões de
+      esparsidade são calculados uma única vez para cada layout).
+'''
+
+def obj_gradient(x: np.ndarray, data: dict)-> np.ndarray:
+
+    layout = get_layout(data)
+    ctx = get_context(data)
+    p_bm, p_chg, p_dch, soc, p_dl, u_bm, u_chg, u_dch, u_dl = decompose(x, data)
+
+    # Potência líquida, shape (Nt,)
+    p_liq = ctx.p_fixed + np.sum(p_bm * u_bm, axis = 0) - np.sum(p_dl * u_dl, axis = 0) - np.sum(p_chg * u_chg + p_dch * u_dch, axis = 0)
+
+    # Derivada de (R - D) em relação à potência líquida: PLD quando exporta e tarifa da distribuidora quando importa
+    m = np.where(p_liq > 0, ctx.tau_pld_pu, ctx.tau_dist_pu)
+
+    grad = np.zeros(layout.nvars)
+    layout.view(grad, 'p_bm')[:] = u_bm * (m - data['kappa_bm'][:, None])
+    layout.view(grad, 'p_chg')[:] = u_chg * (- m - data['kappa_bat'][:, None])
+    layout.view(grad, 'p_dch')[:] = u_dch * (- m - data['kappa_bat'][:, None])
+    layout.view(grad, 'p_dl')[:] = u_dl * (- m - ctx.tau_dl_pu)
+
+    return grad
+
+def _real_columns(A: sparse.csr_matrix, layout: VariableLayout)-> sparse.csr_matrix:
+
+    # Mantém apenas as colunas das variáveis reais (derivadas em relação às variáveis de estado são nulas)
+    zeros = sparse.csr_matrix((A.shape[0], layout.Ni))
+    return sparse.hstack((A[:, :layout.Nr], zeros), format = 'csr')
+
+def ieq_jacobian(data: dict)-> sparse.csr_matrix:
+
+    # Restrições de desigualdade compiladas: c_ieq = A_ieq @ [xr, u] - b_ieq
+    return _real_columns(compile_constraints(data).A_ieq, get_layout(data))
+
+def eq_jacobian(data: dict)-> sparse.csr_matrix:
+
+    # Restrições de igualdade compiladas: c_eq = A_eq @ [xr, u] - b_eq
+    return _real_columns(compile_constraints(data).A_eq, get_layout(data))
+
+def local_refine(x: np.ndarray, data: dict, method: str = 'SLSQP', maxiter: int = 200):
+
+    layout = get_layout(data)
+    Nr = layout.Nr
+
+    # Variáveis de estado fixas e limites das variáveis reais
+    x = np.array(x, dtype = np.float64)
+    ub, lb = bounds(data)
+
+    # Jacobianas restritas às variáveis reais (constantes para estados fixos)
+    J_ieq = ieq_jacobian(data)[:, :Nr]
+    J_eq = eq_jacobian(data)[:, :Nr]
+
+    # Linhas de igualdade sem variáveis (complemento de c_eq até Nbat * Nt) são descartadas
+    rows_eq = np.flatnonzero(np.diff(J_eq.indptr))
+    J_eq = J_eq[rows_eq]
+
+    def full(xr):
+        z = x.copy()
+        z[:Nr] = xr
+        return z
+
+    # Minimização do lucro negativo (mesma convenção do GA)
+    def fun(xr):
+        return - evaluate(full(xr), data)[0]
+
+    def jac(xr):
+        return - obj_gradient(full(xr), data)[:Nr]
+
+    # Restrições: c_ieq <= 0 e c_eq = 0
+    if method == 'trust-constr':
+        from scipy.optimize import NonlinearConstraint
+        constraints = [NonlinearConstraint(lambda xr: evaluate(full(xr), data)[1], - np.inf, 0, jac = lambda xr: J_ieq),
+                       NonlinearConstraint(lambda xr: evaluate(full(xr), data)[2][rows_eq], 0, 0, jac = lambda xr: J_eq)]
+    else:
+        J_ieq_dense = J_ieq.toarray()
+        J_eq_dense = J_eq.toarray()
+        constraints = [{'type': 'ineq', 'fun': lambda xr: - evaluate(full(xr), data)[1], 'jac': lambda xr: - J_ieq_dense},
+                       {'type': 'eq', 'fun': lambda xr: evaluate(full(xr), data)[2][rows_eq], 'jac': lambda xr: J_eq_dense}]
+
+    res = minimize(fun, x[:Nr], jac = jac, method = method, bounds = list(zip(lb[:Nr], ub[:Nr])),
+                   constraints = constraints, options = {'maxiter': maxiter})
+
+    return full(res.x), res
+
+# Exemplo de uso
+if __name__ == '__main__':
+
+    from vpp_initial_data import vpp_data
+    from generator_scenarios import import_scenarios_from_pickle
+    from objetive_function import obj_function
+    from pathlib import Path
+
+    data = vpp_data()
+    data['Nt'] = 24
+
+    # Obtendo as projeções temporais iniciais a partir de um cenário gerado anteriormente
+    path = Path(__file__).parent / 'scenarios_with_PVGIS.pkl'
+    cenario = import_scenarios_from_pickle(path)[0]
+    for key in ['p_pv', 'p_wt', 'p_l', 'tau_pld', 'tau_dist', 'tau_dl']:
+        data[key] = cenario[key]
+    data['p_dl_max'] = cenario['p_dl_ref'] * 1.2
+    data['p_dl_min'] = cenario['p_dl_ref'] * 0.8
+
+    ub, lb = bounds(data)
+    x = lb + np.random.rand(len(ub)) * (ub - lb)
+
+    # Conferindo o gradiente por diferenças finitas
+    grad = obj_gradient(x, data)
+    eps = 1E-7
+    I = np.eye(len(x))[:get_layout(data).Nr]
+    fd = np.array([(obj_function(x + eps * e, data) - obj_function(x - eps * e, data)) / (2 * eps) for e in I])
+    print(f'Erro máximo do gradiente: {np.max(np.abs(grad[:len(fd)] - fd)):.2e}')
+
+    J_ieq = ieq_jacobian(data)
+    J_eq = eq_jacobian(data)
+    print(f'J_ieq shape {J_ieq.shape}, nnz {J_ieq.nnz}; J_eq shape {J_eq.shape}, nnz {J_eq.nnz}')
+
+    # Refinando as potências com estados fixos (UBTMs e cargas ligadas, armazenadores apenas carregando)
+    layout = get_layout(data)
+    x[layout.Nr:] = 1.0
+    layout.view(x, 'u_dch')[:] = 0.0
+    x_ref, res = local_refine(x, data)
+    print(f'Lucro antes: {obj_function(x, data):.4f}, depois: {obj_function(x_ref, data):.4f} ({res.message})')
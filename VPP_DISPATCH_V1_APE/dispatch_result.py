@@ -0,0 +1,200 @@
+from variable_layout import variable_layout, get_layout, VariableLayout
+from evaluator import evaluate
+from types import MappingProxyType
+from pathlib import Path
+import numpy as np
+import json
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+'''
+    Este script define o resultado compacto de um despacho da VPP (DispatchResult), que substitui a gravação das variáveis de
+    decisão no dicionário data e permite guardar em disco os resultados de muitas execuções sem pickle dos objetos do pymoo.
+
+    - Classe DispatchResult (imutável, com __slots__; terms, timings e metadata são mapeamentos somente leitura):
+        - x: vetor de variáveis de decisão (contíguo, somente leitura), com o layout de variable_layout;
+        - p_bm, p_chg, p_dch, soc, p_dl, u_bm, u_chg, u_dch, u_dl: visões de x, shape (N, Nt) (estados binarizados);
+        - profit, CV: lucro e violação total das restrições;
+        - terms: parcelas da função objetivo (R, D, Cpv, Cwt, Cbm, Cdl, Cbat);
+        - timings: tempos da execução em segundos (por exemplo, {'solve': 1.2});
+        - metadata: dados da execução (otimizador, semente, cenário, ...), com valores serializáveis em JSON (escalares do
+          NumPy, como os índices de argmax, são convertidos para os tipos do Python);
+        - DispatchResult.from_solution(x, data, timings, **metadata): avalia x em data (lucro, violação e parcelas);
+        - plot_data(): potências ponderadas pelos estados e estados, no formato usado por plot.plot;
+        - save(path) / DispatchResult.load(path): arquivo .npz (NumPy) ou .parquet (Arrow, se o pyarrow estiver instalado);
+          um caminho sem extensão recebe .npz.
+
+    - Funções disponíveis (lotes de resultados, por exemplo de batch_scenarios ou sweep):
+        - save_batch(results, path): grava uma lista de resultados com o mesmo layout em um único arquivo .npz ou .parquet;
+        - load_batch(path): lê a lista de resultados gravada por save_batch.
+'''
+
+def _plain(value):
+
+    # Escalares e vetores do NumPy convertidos para os tipos do Python (serializáveis em JSON)
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return value
+
+class DispatchResult:
+
+    __slots__ = ('x', 'shape', 'profit', 'CV', 'terms', 'timings', 'metadata')
+
+    def __init__(self, x: np.ndarray, shape: tuple, profit: float, CV: float, terms: dict = None, timings: dict = None, metadata: dict = None):
+
+        x = np.array(x, dtype = np.float64)
+        x.flags.writeable = False
+
+        object.__setattr__(self, 'x', x)
+        object.__setattr__(self, 'shape', tuple(int(n) for n in shape)) # (Nt, Nbm, Nbat, Ndl)
+        object.__setattr__(self, 'profit', float(profit))
+        object.__setattr__(self, 'CV', float(CV))
+        object.__setattr__(self, 'terms', MappingProxyType({key: float(value) for key, value in (terms or {}).items()}))
+        object.__setattr__(self, 'timings', MappingProxyType({key: float(value) for key, value in (timings or {}).items()}))
+        object.__setattr__(self, 'metadata', MappingProxyType({key: _plain(value) for key, value in (metadata or {}).items()}))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('DispatchResult é imutável')
+
+    def __reduce__(self):
+        return (DispatchResult, (self.x, self.shape, self.profit, self.CV, dict(self.terms), dict(self.timings), dict(self.metadata)))
+
+    def __repr__(self)-> str:
+        return f'DispatchResult(Nt = {self.shape[0]}, profit = {self.profit:.4f}, CV = {self.CV:.2e})'
+
+    @property
+    def layout(self)-> VariableLayout:
+        return variable_layout(*self.shape)
+
+    @classmethod
+    def from_solution(cls, x: np.ndarray, data: dict, timings: dict = None, **metadata)-> 'DispatchResult':
+
+        layout = get_layout(data)
+        fval, c_ieq, c_eq, terms = evaluate(np.asarray(x, dtype = np.float64), data, breakdown = True)
+        CV = np.sum(np.maximum(0, c_ieq)) + np.sum(np.abs(c_eq))
+
+        return cls(x, (layout.Nt, layout.Nbm, layout.Nbat, layout.Ndl), fval, CV, terms, timings, metadata)
+
+    def plot_data(self)-> dict:
+
+        # Potências ponderadas pelos estados (p_bm, p_chg e p_dch nulas com o ativo desligado), como usado por plot.plot
+        variables = dict(zip(VariableLayout.NAMES, self.layout.decompose(self.x)))
+        for name, state in (('p_bm', 'u_bm'), ('p_chg', 'u_chg'), ('p_dch', 'u_dch')):
+            variables[name] = variables[name] * variables[state]
+
+        return variables
+
+    def _record(self)-> dict:
+        return {'x': self.x, 'shape': np.array(self.shape), 'profit': self.profit, 'CV': self.CV,
+                'terms': json.dumps(dict(self.terms)), 'timings': json.dumps(dict(self.timings)),
+                'metadata': json.dumps(dict(self.metadata), default = _plain)}
+
+    @classmethod
+    def _from_record(cls, record: dict)-> 'DispatchResult':
+        return cls(record['x'], record['shape'], record['profit'], record['CV'],
+                   json.loads(str(record['terms'])), json.loads(str(record['timings'])), json.loads(str(record['metadata'])))
+
+    def save(self, path)-> None:
+        save_batch([self], path)
+
+    @classmethod
+    def load(cls, path)-> 'DispatchResult':
+        return load_batch(path)[0]
+
+# Variáveis de decisão decompostas (visões de x, shape (N, Nt))
+def _block(name: str)-> property:
+    return property(lambda self: self.layout.decompose(self.x)[VariableLayout.NAMES.index(name)])
+
+for _name in VariableLayout.NAMES:
+    setattr(DispatchResult, _name, _block(_name))
+
+def _require_arrow()-> None:
+    if not ARROW_AVAILABLE:
+        raise ImportError('O pyarrow não está instalado; utilize um arquivo .npz')
+
+def _batch_path(path)-> Path:
+
+    # np.savez acrescenta .npz ao nome do arquivo: o caminho sem extensão é normalizado para que load_batch o encontre
+    path = Path(path)
+    if path.suffix == '':
+        return path.with_suffix('.npz')
+    if path.suffix not in ('.npz', '.parquet'):
+        raise ValueError(f'Extensão não suportada: {path.suffix} (utilize .npz ou .parquet)')
+    return path
+
+def save_batch(results: list, path)-> None:
+
+    path = _batch_path(path)
+    records = [result._record() for result in results]
+
+    if path.suffix == '.parquet':
+        _require_arrow()
+        table = pa.table({'x': pa.array([record['x'] for record in records], type = pa.list_(pa.float64())),
+                          'shape': pa.array([record['shape'] for record in records], type = pa.list_(pa.int64())),
+                          **{key: [record[key] for record in records] for key in ('profit', 'CV', 'terms', 'timings', 'metadata')}})
+        pq.write_table(table, path)
+    else:
+        # Todos os resultados com o mesmo layout: x empilhado em uma única matriz contígua, shape (n, Nr + Ni)
+        if len({result.shape for result in results}) != 1:
+            raise ValueError('save_batch em .npz exige resultados com o mesmo layout (Nt, Nbm, Nbat, Ndl)')
+        np.savez(path,
+                 x = np.stack([record['x'] for record in records]),
+                 shape = records[0]['shape'],
+                 profit = np.array([record['profit'] for record in records]),
+                 CV = np.array([record['CV'] for record in records]),
+                 **{key: np.array([record[key] for record in records]) for key in ('terms', 'timings', 'metadata')})
+
+def load_batch(path)-> list:
+
+    path = _batch_path(path)
+
+    if path.suffix == '.parquet':
+        _require_arrow()
+        columns = pq.read_table(path).to_pydict()
+        return [DispatchResult._from_record({key: values[k] for key, values in columns.items()}) for k in range(len(columns['x']))]
+
+    with np.load(path, allow_pickle = False) as file:
+        arrays = {key: file[key] for key in file.files}
+
+    return [DispatchResult._from_record(dict({key: arrays[key][k] for key in arrays if key != 'shape'}, shape = arrays['shape']))
+            for k in range(len(arrays['x']))]
+
+# Exemplo de uso
+if __name__ == '__main__':
+
+    from vpp_initial_data import vpp_data
+    from generator_scenarios import import_scenarios_from_pickle
+    from scenario_context import attach_scenario
+    from optimizer_GA import solver
+    from time import perf_counter
+    import tempfile
+
+    data = vpp_data()
+    data['Nt'] = 24
+
+    # Obtendo as projeções temporais iniciais a partir de um cenário gerado anteriormente
+    path = Path(__file__).parent / 'scenarios_with_PVGIS.pkl'
+    cenario = import_scenarios_from_pickle(path)[0]
+    attach_scenario(data, cenario)
+    data['p_dl_max'] = cenario['p_dl_ref'] * 1.2
+    data['p_dl_min'] = cenario['p_dl_ref'] * 0.8
+
+    start = perf_counter()
+    res = solver(data, verbose = False)
+    result = DispatchResult.from_solution(res.X, data, {'solve': perf_counter() - start}, optimizer = 'GA', seed = 1)
+    print(result, result.terms)
+
+    with tempfile.TemporaryDirectory() as folder:
+        file = Path(folder) / 'despacho.npz'
+        save_batch([result] * 1000, file)
+        start = perf_counter()
+        results = load_batch(file)
+        print(f'1000 resultados: {file.stat().st_size / 1E6:.2f} MB, lidos em {(perf_counter() - start) * 1E3:.1f} ms')
+        print(f'Recuperado sem perdas: {np.array_equal(results[0].x, result.x) and results[0].terms == result.terms}')
@@ -1,5 +1,6 @@
 import numpy as np
-from decompose_vetor import decompose
+from decompose_vetor import decompose, decompose_pop
+from profiling import instrument
 
 """
     Este script tem a finalidade de fornecer uma função de restrições de igualdades de uma VPP a um otimizador (GA), para que o mesmo encontre a solução ótima da função objetivo, sem que haja violação das restrições.
@@ -33,6 +34,7 @@ from decompose_vetor import decompose
 
 """
 
+@instrument()
 def eq_constr(x: np.ndarray, data: dict) -> np.ndarray:
 
     # Parâmetros iniciais da VPP:
@@ -57,28 +59,56 @@ def eq_constr(x: np.ndarray, data: dict) -> np.ndarray:
 
     return c_eq
 
+"""
+    Versão populacional de eq_constr: avalia as restrições de igualdade de toda a população X, shape (Npop, Nr + Ni), de uma só vez.
+    A ordem das restrições em cada linha é a mesma de eq_constr (t externo e i interno, completando com zeros até Nbat * Nt).
+
+    - Retorna c_eq: -> np.ndarray, shape (Npop, Nbat * Nt)
+"""
+
+def eq_constr_pop(X: np.ndarray, data: dict) -> np.ndarray:
+
+    # Variáveis de decisão, shape (Npop, N, Nt):
+    variables = decompose_pop(X, data)
+
+    return eq_constr_vars(variables, data)
+
+"""
+    Calcula as restrições de igualdade a partir das variáveis já decompostas por decompose_pop, shape (Npop, N, Nt).
+"""
+
+@instrument()
+def eq_constr_vars(variables: tuple, data: dict) -> np.ndarray:
+
+    # Parâmetros iniciais da VPP:
+    Nbat = data['Nbat'] # Quantidade de armazenadores da VPP
+    eta_chg = data['eta_chg'][:, None] # Rendimento do carregamento da bateria
+    eta_dch = data['eta_dch'][:, None] # Rendimento do descarregamento da bateria
+
+    p_bm, p_chg, p_dch, soc, p_dl, u_bm, u_chg, u_dch, u_dl = variables
+    Npop = soc.shape[0]
+
+    # Restrições de igualdade do estado de carga (SoC) dos armazenadores
+    soc_constr = soc[:, :, 1:] - soc[:, :, :-1] - (p_chg[:, :, 1:] * eta_chg) + (p_dch[:, :, 1:] / eta_dch)
+    soc_constr = soc_constr.transpose(0, 2, 1).reshape((Npop, -1))
+
+    # Matriz com todas as restrições de igualdade da VPP
+    c_eq = np.concatenate((soc_constr, np.zeros((Npop, Nbat))), axis = 1)
+
+    return c_eq
+
 # exemplos de uso
 if __name__ == '__main__':
 
     from vpp_initial_data import vpp_data
-    from decompose_vetor import decompose
+    from variable_layout import get_layout
     from generator_scenarios import import_scenarios_from_pickle
     from pathlib import Path
 
     data = vpp_data()
 
     data['Nt'] = 24
-    Nt = data['Nt']
-    Ndl = data['Ndl']
-    Nbm = data['Nbm']
-    Nbat = data['Nbat']
-
-    # Definindo a quantidade de variáveis reais (Nr) e variáveis inteiras (Ni)
-    # p_bm, p_chg, p_dch, soc, p_dl
-    Nr = (Nt * Nbm) + (Nt * Nbat) + (Nbat * Nt) + (Nbat * Nt) + (Ndl * Nt)
-    # u_bm, u_chg, u_dch, u_dl
-    Ni = (Nt * Nbm) + (Nt * Nbat) + (Nbat * Nt) + (Ndl * Nt)
-    x = np.random.rand(Nr + Ni)
+    x = np.random.rand(get_layout(data).nvars)
 
 
     path = Path(__file__).parent / 'scenarios_with_PVGIS.pkl'
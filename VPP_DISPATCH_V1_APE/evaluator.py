@@ -0,0 +1,125 @@
+from objetive_function import cost_terms, profit
+from ieq_constraints import ieq_constr_vars
+from eq_constraints import eq_constr_vars
+from decompose_vetor import decompose_pop
+from numba_kernels import NumbaEvaluator, NUMBA_AVAILABLE
+from linear_constraints import compile_constraints, LinearConstraints
+from profiling import instrument, count
+from time import perf_counter
+import numpy as np
+import warnings
+
+'''
+    Este script fornece um avaliador único (fused) da VPP: o vetor (ou a população) de variáveis de decisão é decomposto uma
+    única vez e, a partir das mesmas variáveis decompostas, são calculados a função objetivo, as restrições de desigualdade e as
+    restrições de igualdade.
+
+    - Parâmetros de entrada (x: np.ndarray, data: dict, breakdown: bool, constraints: LinearConstraints):
+        - (x: np.ndarray): Vetor de variáveis de decisão, shape (Nr + Ni,), ou população de vetores, shape (Npop, Nr + Ni);
+        - (data: dict): Dicionário contendo os parâmetros iniciais e as projeções temporais da VPP;
+        - (breakdown: bool): Quando verdadeiro, retorna também as parcelas da função objetivo (R, D, Cpv, Cwt, Cbm, Cdl, Cbat);
+        - (constraints: LinearConstraints): Restrições compiladas por linear_constraints (opcional). Quando fornecidas, c_ieq e c_eq
+          são calculadas por produto de matrizes esparsas.
+        - (timings: dict): Dicionário (opcional) em que são acumulados os tempos, em segundos, da decomposição ('decompose'), da
+          função objetivo ('objective') e das restrições ('constraints').
+
+    - Retorna uma tupla (fval, c_ieq, c_eq) ou (fval, c_ieq, c_eq, terms):
+        - fval: Lucro obtido na operação da VPP, escalar ou shape (Npop,);
+        - c_ieq: Restrições de desigualdade, shape (Nieq,) ou (Npop, Nieq);
+        - c_eq: Restrições de igualdade, shape (Neq,) ou (Npop, Neq);
+        - terms: Dicionário com as parcelas da função objetivo, cada uma escalar ou shape (Npop,).
+
+    - A função get_evaluator(data, backend, timings) retorna um avaliador x -> (fval, c_ieq, c_eq) para o backend escolhido:
+        - 'numpy': evaluate (padrão);
+        - 'numba': kernels compilados de numba_kernels (se o Numba não estiver instalado, usa o backend 'numpy'); os tempos não são
+          acumulados em timings, pois objetivo e restrições são calculados na mesma passada;
+        - 'sparse': evaluate com as restrições compiladas uma única vez em matrizes esparsas (linear_constraints).
+'''
+
+@instrument()
+def evaluate(x: np.ndarray, data: dict, breakdown: bool = False, constraints: LinearConstraints = None, timings: dict = None)-> tuple:
+
+    # Indica se foi recebido um único indivíduo (vetor 1-D)
+    single = np.ndim(x) == 1
+    count('individuals', 1 if single else len(x))
+
+    # Decompondo o vetor (ou a população) uma única vez, shape (Npop, N, Nt)
+    start = perf_counter()
+    variables = decompose_pop(x, data)
+
+    # Função objetivo, restrições de desigualdade e restrições de igualdade a partir das mesmas variáveis
+    middle = perf_counter()
+    terms = cost_terms(variables, data)
+    fval = profit(terms)
+    end = perf_counter()
+    if constraints is None:
+        c_ieq = ieq_constr_vars(variables, data)
+        c_eq = eq_constr_vars(variables, data)
+    else:
+        c_ieq = constraints.ieq(np.atleast_2d(x))
+        c_eq = constraints.eq(np.atleast_2d(x))
+
+    # Tempos acumulados de cada etapa (s)
+    if timings is not None:
+        timings['decompose'] = timings.get('decompose', 0.0) + middle - start
+        timings['objective'] = timings.get('objective', 0.0) + end - middle
+        timings['constraints'] = timings.get('constraints', 0.0) + perf_counter() - end
+
+    if single:
+        fval, c_ieq, c_eq = fval[0], c_ieq[0], c_eq[0]
+        terms = {key: value[0] for key, value in terms.items()}
+
+    if breakdown:
+        return fval, c_ieq, c_eq, terms
+
+    return fval, c_ieq, c_eq
+
+def get_evaluator(data: dict, backend: str = 'numpy', timings: dict = None):
+
+    if backend == 'numba':
+        if NUMBA_AVAILABLE:
+            return NumbaEvaluator(data)
+        warnings.warn('Numba não está instalado, utilizando o backend numpy')
+    elif backend == 'sparse':
+        constraints = compile_constraints(data)
+        return lambda x: evaluate(x, data, constraints = constraints, timings = timings)
+    elif backend != 'numpy':
+        raise ValueError(f'Backend desconhecido: {backend}')
+
+    return lambda x: evaluate(x, data, timings = timings)
+
+# Exemplo de uso
+if __name__ == '__main__':
+
+    from vpp_initial_data import vpp_data
+    from generator_scenarios import import_scenarios_from_pickle
+    from get_limits import bounds
+    from pathlib import Path
+
+    data = vpp_data()
+    data['Nt'] = 24
+
+    # Obtendo as projeções temporais iniciais a partir de um cenário gerado anteriormente
+    path = Path(__file__).parent / 'scenarios_with_PVGIS.pkl'
+    cenarios = import_scenarios_from_pickle(path)
+    cenario = cenarios[0]
+
+    data['p_pv'] = cenario['p_pv']
+    data['p_wt'] = cenario['p_wt']
+    data['p_l'] = cenario['p_l']
+    data['tau_pld'] = cenario['tau_pld']
+    data['tau_dist'] = cenario['tau_dist']
+    data['tau_dl'] = cenario['tau_dl']
+    data['p_dl_max'] = cenario['p_dl_ref'] * 1.2
+    data['p_dl_min'] = cenario['p_dl_ref'] * 0.8
+
+    # Gerando um indivíduo aleatório dentro dos limites
+    ub, lb = bounds(data)
+    x = lb + np.random.rand(len(ub)) * (ub - lb)
+
+    fval, c_ieq, c_eq, terms = evaluate(x, data, breakdown = True)
+
+    print(f'O valor da função objetivo é {fval:.2f}\n')
+    print(f'c_ieq shape {c_ieq.shape}, c_eq shape {c_eq.shape}\n')
+    for key, value in terms.items():
+        print(f'{key}: {value:.4f}')
@@ -1,4 +1,5 @@
 from load_projections import projections
+from profiling import instrument
 from datetime import datetime, timedelta
 from pathlib import Path
 import numpy as np
@@ -62,6 +63,7 @@ import pickle
                 Lista de dicionários com os dados de cada cenário importado.
 '''
 
+@instrument()
 def create_scenarios(Ns: int, data: dict) -> list[dict[str, np.ndarray]]:
 
     Nt = data['Nt']
@@ -1,3 +1,5 @@
+from variable_layout import get_layout
+from profiling import instrument
 import numpy as np
 
 '''
@@ -27,78 +29,22 @@ import numpy as np
 
     - Retorna upper_bounds, lower_bounds:
         - upper_bonds: Vetor de limites superiores das variáveis de decisão
-        - lower_bonds: Vetor de limites inferiores das variáveis de decisão        
+        - lower_bonds: Vetor de limites inferiores das variáveis de decisão
+
+    - Os limites de cada bloco seguem o layout de variable_layout (ativo no índice externo e tempo no índice interno), o mesmo usado por decompose.
+    - O limite inferior de p_bm é 0, permitindo desligar as UBTMs; com a usina ligada, p_bm >= p_bm_min é imposto pelas restrições de desigualdade.
+    - Com data['initial_state'] (opcional), o período t = 0 dos blocos informados é fixado (lb = ub), ver variable_layout.
 '''
 
+@instrument()
 def bounds(data: dict)-> tuple[np.ndarray, np.ndarray]:
 
-    # Parâmetros iniciais da VPP
-    Nt = data['Nt'] # Período da simulação da VPP
-    Nbm = data['Nbm'] # Quantidade de UBTMs
-    Ndl = data['Ndl'] # Quantidade de carga despacháveis
-    Nbat = data['Nbat'] # Quantidade de armazenadores
-
-    # Parâmetros das UBTMs
-    # p_bm = data['p_bm'] # Potênica das UBTMs
-    p_bm_min = data['p_bm_min'] # Potênica mínima das UBTMs
-    p_bm_max = data['p_bm_max'] # Potênica máxima das UBTMS
-
-    # Parâmetros das UBTMs
-    p_bat_max = data['p_bat_max'] # Potênica máxima de carregamento/descarregamento dos armazenadores 
-    soc_min = data['soc_min'] # Nível mínimo de carga da bateria
-    soc_max = data['soc_max'] # Nível máximo de carga da bateria
-
-    # Parâmetros das UBTMs
-    p_dl_max = data['p_dl_max']
-    p_dl_min = data['p_dl_min']
-
-    # Definindo a quantidade de variáveis reais (Nr) e inteiras (Ni)
-    # p_bm, p_chg, p_dch, soc, p_dl
-    Nr =  (Nt * Nbm) + (Nt * Nbat) + (Nbat * Nt) + (Nt * Nbat) + (Nt * Ndl)
-    # u_bm, u_chg, u_dch, u_dl
-    Ni = (Nt * Nbm) + (Nt * Nbat) + (Nt * Nbat) + (Nt * Ndl)
-
-    # Iniciando os vetores limitadores superior e inferior das variáveis de decisão
-    upper_bounds = np.ones(Nr + Ni)
-    lower_bounds = np.zeros(Nr + Ni)
-    k = 0
-
-    # Limite de p_bm
-    for t in range(Nt):
-        for i in range(Nbm):
-            upper_bounds[k] = p_bm_max[i]
-            lower_bounds[k] = p_bm_min[i]
-            k += 1
-
-    # Limite de p_chg
-    for t in range(Nt):
-        for i in range(Nbat):
-            upper_bounds[k] = p_bat_max[i]
-            lower_bounds[k] = 0
-            k += 1
-
-    # Limite de p_dch
-    for t in range(Nt):
-        for i in range(Nbat):
-            upper_bounds[k] = p_bat_max[i]
-            lower_bounds[k] = 0
-            k += 1
-
-    # Limite de soc
-    for t in range(Nt):
-        for i in range(Nbat):
-            upper_bounds[k] = soc_max[i]
-            lower_bounds[k] = soc_min[i]
-            k += 1
- 
-    # Limite de p_dl
-    for i in range(Ndl):
-        for t in range(Nt):
-            upper_bounds[k] = p_dl_max[i, t]
-            lower_bounds[k] = p_dl_min[i, t]
-            k += 1
+    # Layout do vetor de variáveis para os parâmetros da VPP (Nt, Nbm, Nbat, Ndl)
+    layout = get_layout(data)
 
+    # Limites preenchidos de forma vetorizada, na mesma ordem (N, Nt) usada por decompose
     # u_bm, u_chg, u_dch, u_dl: upper_bounds = 1 and lower_bounds = 0
+    upper_bounds, lower_bounds = layout.bounds(data)
 
     return upper_bounds, lower_bounds
 
@@ -113,19 +59,9 @@ if __name__ == '__main__':
     # Obtenção dos parâmetros iniciais
     data = vpp_data()
     data['Nt'] = 24
-    Nt = data['Nt']
-    Ndl = data['Ndl']
-    Nbm = data['Nbm']
-    Nbat = data['Nbat']
-
-    # Definindo a quantidade de variáveis reais (Nr) e variáveis inteiras (Ni)
-    # p_bm, p_chg, p_dch, soc, p_dl
-    Nr = (Nt * Nbm) + (Nt * Nbat) + (Nbat * Nt) + (Nt * Nbat) + (Nt * Ndl)
-    # u_bm, u_chg, u_dch, u_dl
-    Ni = (Nt * Nbm) + (Nt * Nbat) + (Nt * Nbat) + (Nt * Ndl)
 
     # Gerando um população inicial para teste
-    x = np.random.rand(Nr + Ni)
+    x = np.random.rand(get_layout(data).nvars)
 
     # Decompondo a população em variáveis de decisão
     p_bm, p_chg, p_dch, soc, p_dl, u_bm, u_chg, u_dch, u_dl = decompose(x, data)
@@ -1,5 +1,6 @@
 import numpy as np
-from decompose_vetor import decompose
+from decompose_vetor import decompose, decompose_pop
+from profiling import instrument
 
 '''
     Este script tem a finalidade de fornecer uma função de restrições de desigualdades de uma VPP a um otimizador (GA), para que o mesmo encontre a solução ótima da função objetivo, sem que haja violação das restrições.
@@ -42,6 +43,7 @@ from decompose_vetor import decompose
             - dl_constr: Vetor contendo as restrições de desigualdade das cargas despacháveis da VPP em cada instante t no período da simulação NT;
 '''
 
+@instrument()
 def ieq_constr(x: np.ndarray, data: dict)-> np.ndarray:
 
     # Parâmetros iniciais da VPP
@@ -134,16 +136,74 @@ def ieq_constr(x: np.ndarray, data: dict)-> np.ndarray:
     for i in range(Ndl):
         for t in range(Nt):
             dl_constr[k] = p_dl_min[i, t] * u_dl[i, t] - p_dl[i, t]
+            k += 1
 
     # Vetor com todas as restrições de desigualdade da VPP
     c_ieq = np.concatenate((bm_constr, bat_constr, dl_constr))
 
     return c_ieq
 
+'''
+    Versão populacional de ieq_constr: avalia as restrições de desigualdade de toda a população X, shape (Npop, Nr + Ni), de uma só vez.
+    A ordem das restrições em cada linha é a mesma de ieq_constr.
+
+    - Retorna (c_ieq: np.ndarray), shape (Npop, Nbmc + Nbatc + Ndlc)
+'''
+
+def ieq_constr_pop(X: np.ndarray, data: dict)-> np.ndarray:
+
+    # Decompondo a população em variáveis de decisão, shape (Npop, N, Nt)
+    variables = decompose_pop(X, data)
+
+    return ieq_constr_vars(variables, data)
+
+'''
+    Calcula as restrições de desigualdade a partir das variáveis já decompostas por decompose_pop, shape (Npop, N, Nt).
+'''
+
+@instrument()
+def ieq_constr_vars(variables: tuple, data: dict)-> np.ndarray:
+
+    # Parâmetros iniciais da VPP
+    p_bm_min = data['p_bm_min'][:, None] # Potênica Mínima das UBTMs
+    p_bm_max = data['p_bm_max'][:, None] # Potênca máxima das UBTMs
+    p_bm_rup = data['p_bm_rup'][:, None] # Potência de rampa de subida das UBTMs
+    p_bm_rdown = data['p_bm_rdown'][:, None] # Potência de rampa de descida das UBTMs
+    p_bat_max = data['p_bat_max'][:, None] # Potência máxima dos armazenadores
+    p_dl_min = data['p_dl_min'] # Potência das cargas despacháveis
+    p_dl_max = data['p_dl_max'] # Potência das cargas despacháveis
+
+    p_bm, p_chg, p_dch, soc, p_dl, u_bm, u_chg, u_dch, u_dl = variables
+    Npop = p_bm.shape[0]
+
+    # Restrições ordenadas com t externo e i interno, como nos laços de ieq_constr
+    def t_major(c):
+        return c.transpose(0, 2, 1).reshape((Npop, -1))
+
+    # Restrições de desigualdade das UBTMs: potência mínima, potência máxima, rampa de subida e rampa de descida
+    bm_constr = np.concatenate((t_major(p_bm_min * u_bm - p_bm),
+                                t_major(p_bm - p_bm_max * u_bm),
+                                t_major(p_bm[:, :, 1:] - p_bm[:, :, :-1] - p_bm_rup),
+                                t_major(p_bm[:, :, :-1] - p_bm[:, :, 1:] - p_bm_rdown)), axis = 1)
+
+    # Restrições de desigualdade dos armazenadores: carregamento máximo, descarregamento máximo e simultaneidade
+    bat_constr = np.concatenate((t_major(p_chg - p_bat_max * u_chg),
+                                 t_major(p_dch - p_bat_max * u_dch),
+                                 t_major(u_chg + u_dch - 1)), axis = 1)
+
+    # Restrições de desigualdade das cargas despacháveis (i externo e t interno): potência máxima e potência mínima
+    dl_constr = np.concatenate(((p_dl - p_dl_max * u_dl).reshape((Npop, -1)),
+                                (p_dl_min * u_dl - p_dl).reshape((Npop, -1))), axis = 1)
+
+    # Matriz com todas as restrições de desigualdade da VPP
+    c_ieq = np.concatenate((bm_constr, bat_constr, dl_constr), axis = 1)
+
+    return c_ieq
+
 # Exemplo de uso
 if __name__ == '__main__':
 
-    from decompose_vetor import decompose
+    from variable_layout import get_layout
     from generator_scenarios import import_scenarios_from_pickle
     from pathlib import Path
     from vpp_initial_data import vpp_data
@@ -151,19 +211,9 @@ if __name__ == '__main__':
     # Obtendo as projeões inicias
     data = vpp_data()
     data['Nt'] = 24
-    Nt = data['Nt']
-    Ndl = data['Ndl']
-    Nbm = data['Nbm']
-    Nbat = data['Nbat']
-
-    # Definindo a quantidade de variáveis reais (Nr) e variáveis inteiras (Ni)
-    # p_bm, p_chg, p_dch, soc, p_dl
-    Nr = (Nt * Nbm) + (Nt * Nbat) + (Nbat * Nt) + (Nt * Nbat) + (Nt * Ndl)
-    # u_bm, u_chg, u_dch, u_dl
-    Ni = (Nt * Nbm) + (Nt * Nbat) + (Nt * Nbat) + (Nt * Ndl)
 
     # Gerando um população inicial de indivíduos
-    x = np.random.rand(Nr + Ni)
+    x = np.random.rand(get_layout(data).nvars)
 
     # Obtendo as projeções a partir de cenários gerados anteriormente
     path = Path(__file__).parent / 'scenarios_with_PVGIS.pkl'
@@ -0,0 +1,179 @@
+from variable_layout import get_layout
+from scenario_context import get_context
+import numpy as np
+
+'''
+    Este script fornece um avaliador incremental da função objetivo da VPP (obj_function), voltado para buscas locais e operadores
+    de mutação que alteram poucos genes de um indivíduo (pai).
+
+    O avaliador guarda, para o pai, a potência líquida e as parcelas da função objetivo em cada instante t (receita R, despesa
+    com importação D e custos Cbm, Cdl e Cbat). Como todos os blocos de x estão no layout (N, Nt), o gene x[j] pertence ao
+    instante t = j % Nt. Assim, ao alterar alguns genes, apenas os instantes afetados são recalculados. A única parcela que
+    acopla instantes vizinhos é o custo de partida das UBTMs, que depende de (t - 1, t); por isso uma alteração em u_bm[i, t]
+    também recalcula o instante t + 1.
+
+    - Classe IncrementalObjective(x: np.ndarray, data: dict):
+        - fval: lucro do indivíduo atual;
+        - terms(): dicionário com as parcelas da função objetivo (R, D, Cpv, Cwt, Cbm, Cdl, Cbat);
+        - evaluate_move(idx, values): lucro do indivíduo com x[idx] = values, sem alterar o indivíduo atual;
+        - apply_move(idx, values): aplica x[idx] = values ao indivíduo atual e retorna o novo lucro;
+        - refresh(): recalcula todas as parcelas a partir de x (elimina o acúmulo de erros de arredondamento).
+'''
+
+class IncrementalObjective:
+
+    # Parcelas da função objetivo mantidas por instante t
+    TERMS = ('R', 'D', 'Cbm', 'Cdl', 'Cbat')
+
+    def __init__(self, x: np.ndarray, data: dict):
+
+        self.layout = get_layout(data)
+        self.x = np.array(x, dtype = np.float64) # Cópia do indivíduo atual
+
+        # Parcela da potência líquida, custos e tarifas que independem de x (contexto do cenário)
+        ctx = get_context(data)
+        self.p_fixed = ctx.p_fixed
+        self.Cpv = ctx.Cpv
+        self.Cwt = ctx.Cwt
+        self.tau_pld_pu = ctx.tau_pld_pu
+        self.tau_dist_pu = ctx.tau_dist_pu
+        self.tau_dl_pu = ctx.tau_dl_pu
+
+        # Custos dos ativos
+        self.kappa_bm = data['kappa_bm']
+        self.kappa_bm_start = data['kappa_bm_start']
+        self.kappa_bat = data['kappa_bat']
+
+        # Visões (sem cópia) dos blocos do indivíduo atual, shape (N, Nt)
+        self.views = {name: self.layout.view(self.x, name) for name in self.layout.NAMES}
+
+        self.refresh()
+
+    def _timestep_terms(self, ts: np.ndarray)-> tuple[np.ndarray, dict]:
+
+        v = self.views
+        u_bm = v['u_bm'][:, ts] > 0.5
+        u_chg = v['u_chg'][:, ts] > 0.5
+        u_dch = v['u_dch'][:, ts] > 0.5
+        u_dl = v['u_dl'][:, ts] > 0.5
+
+        # Potências efetivas (ponderadas pelos estados) nos instantes ts
+        p_bm_on = v['p_bm'][:, ts] * u_bm
+        p_dl_on = np.sum(v['p_dl'][:, ts] * u_dl, axis = 0)
+        p_bat_on = v['p_chg'][:, ts] * u_chg + v['p_dch'][:, ts] * u_dch
+
+        # Potência líquida nos instantes ts
+        p_liq = self.p_fixed[ts] + np.sum(p_bm_on, axis = 0) - p_dl_on - np.sum(p_bat_on, axis = 0)
+
+        terms = {}
+        terms['R'] = np.maximum(0, p_liq) * self.tau_pld_pu[ts]
+        terms['D'] = np.maximum(0, - p_liq) * self.tau_dist_pu[ts]
+        terms['Cbm'] = self.kappa_bm @ p_bm_on
+        terms['Cdl'] = p_dl_on * self.tau_dl_pu[ts]
+        terms['Cbat'] = self.kappa_bat @ p_bat_on
+
+        # Custo de partida das UBTMs (ligando de 0 → 1 entre t - 1 e t), nulo em t = 0
+        prev = np.maximum(ts - 1, 0)
+        start = u_bm & ~(v['u_bm'][:, prev] > 0.5)
+        terms['Cbm'] = terms['Cbm'] + np.where(ts > 0, self.kappa_bm_start @ start, 0.0)
+
+        return p_liq, terms
+
+    def _affected(self, idx: np.ndarray)-> np.ndarray:
+
+        # Instantes afetados pelos genes idx (e o instante seguinte quando u_bm é alterado)
+        Nt = self.layout.Nt
+        begin, end, _ = self.layout.blocks['u_bm']
+        ts = idx % Nt
+        in_u_bm = (idx >= begin) & (idx < end)
+        ts = np.concatenate((ts, ts[in_u_bm & (ts < Nt - 1)] + 1))
+
+        return np.unique(ts)
+
+    def _delta(self, idx: np.ndarray, values: np.ndarray, commit: bool)-> float:
+
+        idx = np.atleast_1d(np.asarray(idx))
+        ts = self._affected(idx)
+        old = self.x[idx].copy()
+
+        # Parcelas do indivíduo com os genes alterados, apenas nos instantes afetados
+        self.x[idx] = values
+        p_liq, terms = self._timestep_terms(ts)
+
+        total = self._total.copy()
+        for key in self.TERMS:
+            total[key] += np.sum(terms[key]) - np.sum(self.terms_t[key][ts])
+
+        if commit:
+            self.p_liq[ts] = p_liq
+            for key in self.TERMS:
+                self.terms_t[key][ts] = terms[key]
+            self._total = total
+        else:
+            self.x[idx] = old
+
+        return self._profit(total)
+
+    def _profit(self, total: dict)-> float:
+
+        # Despesa total
+        D = total['D'] + self.Cpv + self.Cwt + total['Cbm'] + total['Cdl'] + total['Cbat']
+        return total['R'] - D
+
+    @property
+    def fval(self)-> float:
+        return self._profit(self._total)
+
+    def terms(self)-> dict[str, float]:
+        terms = {key: float(value) for key, value in self._total.items()}
+        terms['Cpv'] = float(self.Cpv)
+        terms['Cwt'] = float(self.Cwt)
+        return terms
+
+    def evaluate_move(self, idx, values)-> float:
+        return self._delta(idx, values, commit = False)
+
+    def apply_move(self, idx, values)-> float:
+        return self._delta(idx, values, commit = True)
+
+    def refresh(self)-> None:
+
+        # Recalculando todas as parcelas em todos os instantes
+        self.p_liq, self.terms_t = self._timestep_terms(np.arange(self.layout.Nt))
+        self._total = {key: np.sum(self.terms_t[key]) for key in self.TERMS}
+
+# Exemplo de uso
+if __name__ == '__main__':
+
+    from vpp_initial_data import vpp_data
+    from generator_scenarios import import_scenarios_from_pickle
+    from objetive_function import obj_function
+    from get_limits import bounds
+    from pathlib import Path
+    from time import perf_counter
+
+    data = vpp_data()
+    data['Nt'] = 24
+
+    # Obtendo as projeções temporais iniciais a partir de um cenário gerado anteriormente
+    path = Path(__file__).parent / 'scenarios_with_PVGIS.pkl'
+    cenario = import_scenarios_from_pickle(path)[0]
+    for key in ['p_pv', 'p_wt', 'p_l', 'tau_pld', 'tau_dist', 'tau_dl']:
+        data[key] = cenario[key]
+
+    ub, lb = bounds({**data, 'p_dl_max': cenario['p_dl_ref'] * 1.2, 'p_dl_min': cenario['p_dl_ref'] * 0.8})
+    x = lb + np.random.rand(len(ub)) * (ub - lb)
+
+    incremental = IncrementalObjective(x, data)
+    print(f'Lucro inicial: {incremental.fval:.6f} (obj_function: {obj_function(x, data):.6f})')
+
+    # Busca local simples: mutação de 3 genes por movimento, aceitando apenas melhorias
+    start = perf_counter()
+    for _ in range(2000):
+        idx = np.random.choice(len(x), 3, replace = False)
+        values = lb[idx] + np.random.rand(3) * (ub[idx] - lb[idx])
+        if incremental.evaluate_move(idx, values) > incremental.fval:
+            incremental.apply_move(idx, values)
+    print(f'2000 movimentos em {(perf_counter() - start) * 1E3:.1f} ms')
+
+    print(f'Lucro final: {incremental.fval:.6f} (obj_function: {obj_function(incremental.x, data):.6f})')
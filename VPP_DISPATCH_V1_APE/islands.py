@@ -0,0 +1,179 @@
+from pymoo.core.population import Population
+from pymoo.core.duplicate import DefaultDuplicateElimination
+from optimizer_GA import solver
+from evaluator import evaluate
+from multiprocessing import Process, Queue
+import numpy as np
+import traceback
+import queue
+
+'''
+    Este script implementa o modelo de ilhas do GA (optimizer_GA): K populações independentes evoluem em processos separados,
+    cada uma com a sua semente (e, opcionalmente, com operadores ou penalização diferentes), e a cada every gerações os melhores
+    indivíduos de cada ilha migram para a ilha seguinte (topologia em anel). As populações pequenas mantêm o custo de cada
+    geração e a migração preserva a diversidade, evitando a convergência prematura de uma única população.
+
+    - A migração é assíncrona: cada ilha envia os seus n_migrants melhores indivíduos por uma fila (multiprocessing.Queue) e
+      recebe, sem esperar, os indivíduos que já estiverem na sua fila. Os imigrantes são avaliados e disputam a sobrevivência com
+      a população da ilha (os piores indivíduos são descartados). Por isso, com mais de uma ilha, os resultados dependem da
+      ordem de execução dos processos.
+
+    - Funções disponíveis:
+        - island_solver(data, n_islands, every, n_migrants, island_options, **kwargs): resolve o despacho com n_islands ilhas e
+          retorna um IslandResult. Cada ilha executa optimizer_GA.solver(data, seed = 1 + k, **kwargs, **island_options[k]),
+          de modo que island_options (lista de dicionários, opcional) permite variar, por exemplo, mixed, repair ou penalty.
+
+    - Classe Migration(inbox, outbox, every, n_migrants): migração de uma ilha, chamada pelo solver após cada geração.
+
+    - Classe IslandResult: X, F e CV da melhor ilha (menor violação e, entre as factíveis, maior lucro), best_island e islands,
+      uma lista com (F, CV, n_gen) de cada ilha. F e CV são avaliados com evaluator.evaluate no despacho final de cada ilha (o
+      objetivo do GA é penalizado quando a ilha não tem indivíduo factível) e n_gen é o número de gerações executadas.
+
+    - Se uma ilha levantar uma exceção (ou o seu processo terminar sem resultado), as demais são encerradas e island_solver
+      levanta RuntimeError com o traceback da ilha.
+'''
+
+class Migration:
+
+    def __init__(self, inbox: Queue, outbox: Queue, every: int, n_migrants: int):
+        self.inbox = inbox # Fila de imigrantes da ilha
+        self.outbox = outbox # Fila de imigrantes da ilha seguinte
+        self.every = every
+        self.n_migrants = n_migrants
+
+    def __call__(self, algorithm):
+
+        if algorithm.n_gen % self.every != 0:
+            return
+
+        # Emigrantes: os melhores indivíduos (a população sobrevivente está ordenada do melhor para o pior)
+        self.outbox.put(algorithm.pop[:self.n_migrants].get('X'))
+
+        # Imigrantes já disponíveis (sem esperar pelas demais ilhas)
+        received = []
+        while True:
+            try:
+                received.append(self.inbox.get_nowait())
+            except queue.Empty:
+                break
+        if not received:
+            return
+
+        immigrants = Population.new(X = np.vstack(received))
+        immigrants = DefaultDuplicateElimination().do(immigrants, algorithm.pop)
+        if len(immigrants) == 0:
+            return
+
+        # Imigrantes avaliados e disputando a sobrevivência com a população da ilha
+        algorithm.evaluator.eval(algorithm.problem, immigrants, algorithm = algorithm)
+        merged = Population.merge(algorithm.pop, immigrants)
+        algorithm.pop = algorithm.survival.do(algorithm.problem, merged, n_survive = len(algorithm.pop), algorithm = algorithm)
+
+class IslandResult:
+
+    def __init__(self, X, F, CV, best_island: int, islands: list):
+        self.X = X # Vetor de variáveis de decisão da melhor ilha
+        self.F = F # Lucro negativo, shape (1,) (mesma convenção do GA)
+        self.CV = CV # Violação total das restrições, shape (1,)
+        self.best_island = best_island
+        self.islands = islands # (F, CV, n_gen) de cada ilha
+
+def _island(k: int, data: dict, options: dict, migration: Migration, results: Queue)-> None:
+
+    # Os imigrantes não entregues ao final da execução são descartados (o processo não espera a fila esvaziar)
+    migration.outbox.cancel_join_thread()
+
+    # A exceção é enviada ao processo principal como texto (o traceback nem sempre pode ser serializado)
+    try:
+        res = solver(data, migration = migration, **options)
+    except Exception:
+        results.put((k, None, traceback.format_exc()))
+        return
+
+    results.put((k, res.X, res.algorithm.n_gen - 1))
+
+def island_solver(data: dict, n_islands: int = 4, every: int = 20, n_migrants: int = 2, island_options: list = None, **kwargs)-> IslandResult:
+
+    if island_options is None:
+        island_options = [{}] * n_islands
+    if len(island_options) != n_islands:
+        raise ValueError('island_options deve ter um dicionário por ilha')
+
+    # Filas da topologia em anel: a ilha k recebe de inboxes[k] e envia para inboxes[k + 1]
+    inboxes = [Queue() for _ in range(n_islands)]
+    results = Queue()
+
+    processes = []
+    for k in range(n_islands):
+        options = dict(kwargs, seed = 1 + k, verbose = False)
+        options.update(island_options[k])
+        migration = Migration(inboxes[k], inboxes[(k + 1) % n_islands], every, n_migrants)
+        processes.append(Process(target = _island, args = (k, data, options, migration, results)))
+
+    for process in processes:
+        process.start()
+
+    X = [None] * n_islands
+    n_gens = [None] * n_islands
+    try:
+        for _ in range(n_islands):
+            while True:
+                try:
+                    k, x, n_gen = results.get(timeout = 1)
+                    break
+                except queue.Empty:
+                    # Ilha encerrada sem enviar o resultado (por exemplo, finalizada pelo sistema)
+                    for j, process in enumerate(processes):
+                        if n_gens[j] is None and process.exitcode is not None and results.empty():
+                            raise RuntimeError(f'A ilha {j} terminou sem resultado (código de saída {process.exitcode})')
+            if x is None:
+                raise RuntimeError(f'A ilha {k} falhou:\n{n_gen}')
+            X[k] = x
+            n_gens[k] = n_gen
+    finally:
+        for process in processes:
+            if process.is_alive() and any(n_gen is None for n_gen in n_gens):
+                process.terminate()
+            process.join()
+
+    # Lucro e violação do despacho final de cada ilha avaliados com as mesmas funções (res.F do GA é penalizado)
+    islands = []
+    for k in range(n_islands):
+        fval, c_ieq, c_eq = evaluate(np.asarray(X[k], dtype = np.float64), data)
+        islands.append((np.array([- fval]), np.array([np.sum(np.maximum(0, c_ieq)) + np.sum(np.abs(c_eq))]), n_gens[k]))
+
+    # Melhor ilha: menor violação das restrições e, entre as de mesma violação, maior lucro
+    best = min(range(n_islands), key = lambda k: (islands[k][1][0], islands[k][0][0]))
+
+    return IslandResult(X[best], islands[best][0], islands[best][1], best, islands)
+
+# Exemplo de uso
+if __name__ == '__main__':
+
+    from vpp_initial_data import vpp_data
+    from generator_scenarios import import_scenarios_from_pickle
+    from scenario_context import attach_scenario
+    from time import perf_counter
+    from pathlib import Path
+
+    data = vpp_data()
+    data['Nt'] = 24
+
+    # Obtendo as projeções temporais iniciais a partir de um cenário gerado anteriormente
+    path = Path(__file__).parent / 'scenarios_with_PVGIS.pkl'
+    cenario = import_scenarios_from_pickle(path)[0]
+    attach_scenario(data, cenario)
+    data['p_dl_max'] = cenario['p_dl_ref'] * 1.2
+    data['p_dl_min'] = cenario['p_dl_ref'] * 0.8
+
+    # 4 ilhas de 50 indivíduos, com migração de 2 indivíduos a cada 20 gerações
+    start = perf_counter()
+    res = island_solver(data, n_islands = 4, every = 20, n_migrants = 2, n_gen = 100)
+    print(f'Ilhas: lucro {- res.F[0]:.4f} (ilha {res.best_island}) em {perf_counter() - start:.2f} s')
+    for k, (F, CV, n_gen) in enumerate(res.islands):
+        print(f'    Ilha {k}: lucro {- F[0]:.4f}, violação {CV[0]:.2e}, {n_gen} gerações')
+
+    # Uma única população com o mesmo número total de indivíduos
+    start = perf_counter()
+    res = solver(data, pop_size = 200, n_gen = 100, verbose = False)
+    print(f'População única de 200 indivíduos: lucro {- res.F[0]:.4f} em {perf_counter() - start:.2f} s')
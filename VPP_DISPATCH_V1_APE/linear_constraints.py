@@ -0,0 +1,219 @@
+from variable_layout import get_layout, VariableLayout
+from functools import lru_cache
+from scipy import sparse
+import numpy as np
+
+'''
+    Este script compila as restrições de desigualdade (ieq_constr) e de igualdade (eq_constr) da VPP em matrizes esparsas (CSR).
+    Com as variáveis de estado binarizadas (u = x > 0.5), todas as restrições são lineares no vetor z = [xr, u], onde xr são as
+    variáveis reais de x:
+
+        - c_ieq = A_ieq @ z - b_ieq
+        - c_eq = A_eq @ z - b_eq
+
+    As matrizes são montadas uma única vez para cada dicionário data (por exemplo, no início de optimizer_GA.solver) e a avaliação
+    de toda a população se reduz a um produto matriz esparsa x matriz densa. A ordem das linhas é a mesma de ieq_constr e eq_constr.
+
+    - Funções disponíveis:
+        - compile_constraints(data: dict): retorna um objeto LinearConstraints com A_ieq, b_ieq, A_eq e b_eq;
+
+    - Classe LinearConstraints:
+        - ieq(x): restrições de desigualdade, shape (Nieq,) ou (Npop, Nieq);
+        - eq(x): restrições de igualdade, shape (Neq,) ou (Npop, Neq);
+
+    - Os índices (linha, coluna) dos elementos não nulos dependem apenas do layout (Nt, Nbm, Nbat, Ndl) e são calculados uma única
+      vez para cada layout; apenas os coeficientes são obtidos de data.
+'''
+
+# Numeração das linhas com t externo e i interno (UBTMs e armazenadores) ou i externo e t interno (cargas despacháveis)
+def _t_major(N: int, T: int)-> np.ndarray:
+    return np.arange(T)[None, :] * N + np.arange(N)[:, None]
+
+def _i_major(N: int, T: int)-> np.ndarray:
+    return np.arange(N)[:, None] * T + np.arange(T)[None, :]
+
+@lru_cache(maxsize = None)
+def _ieq_pattern(layout: VariableLayout)-> dict[str, tuple[np.ndarray, np.ndarray]]:
+
+    Nt, Nbm, Nbat, Ndl = layout.Nt, layout.Nbm, layout.Nbat, layout.Ndl
+
+    # Índice de cada variável em x, no layout (N, Nt)
+    idx = np.arange(layout.nvars)
+    col = {name: layout.view(idx, name) for name in layout.NAMES}
+
+    # Posição de cada grupo de restrições
+    o_bm_max = Nbm * Nt
+    o_rup = 2 * Nbm * Nt
+    o_rdown = o_rup + Nbm * (Nt - 1)
+    o_chg = o_rdown + Nbm * (Nt - 1)
+    o_dch = o_chg + Nbat * Nt
+    o_sim = o_dch + Nbat * Nt
+    o_dl_max = o_sim + Nbat * Nt
+    o_dl_min = o_dl_max + Ndl * Nt
+
+    # Cada entrada: (linhas, colunas), ambas no layout (N, T) do coeficiente correspondente
+    pattern = {
+        # UBTMs: p_bm_min * u_bm - p_bm <= 0 e p_bm - p_bm_max * u_bm <= 0
+        'bm_min_p': (_t_major(Nbm, Nt), col['p_bm']),
+        'bm_min_u': (_t_major(Nbm, Nt), col['u_bm']),
+        'bm_max_p': (o_bm_max + _t_major(Nbm, Nt), col['p_bm']),
+        'bm_max_u': (o_bm_max + _t_major(Nbm, Nt), col['u_bm']),
+        # UBTMs: p_bm[t] - p_bm[t - 1] <= p_bm_rup e p_bm[t - 1] - p_bm[t] <= p_bm_rdown
+        'rup_t': (o_rup + _t_major(Nbm, Nt - 1), col['p_bm'][:, 1:]),
+        'rup_t1': (o_rup + _t_major(Nbm, Nt - 1), col['p_bm'][:, :-1]),
+        'rdown_t': (o_rdown + _t_major(Nbm, Nt - 1), col['p_bm'][:, 1:]),
+        'rdown_t1': (o_rdown + _t_major(Nbm, Nt - 1), col['p_bm'][:, :-1]),
+        # Armazenadores: p_chg - p_bat_max * u_chg <= 0, p_dch - p_bat_max * u_dch <= 0 e u_chg + u_dch <= 1
+        'chg_p': (o_chg + _t_major(Nbat, Nt), col['p_chg']),
+        'chg_u': (o_chg + _t_major(Nbat, Nt), col['u_chg']),
+        'dch_p': (o_dch + _t_major(Nbat, Nt), col['p_dch']),
+        'dch_u': (o_dch + _t_major(Nbat, Nt), col['u_dch']),
+        'sim_chg': (o_sim + _t_major(Nbat, Nt), col['u_chg']),
+        'sim_dch': (o_sim + _t_major(Nbat, Nt), col['u_dch']),
+        # Cargas despacháveis: p_dl - p_dl_max * u_dl <= 0 e p_dl_min * u_dl - p_dl <= 0
+        'dl_max_p': (o_dl_max + _i_major(Ndl, Nt), col['p_dl']),
+        'dl_max_u': (o_dl_max + _i_major(Ndl, Nt), col['u_dl']),
+        'dl_min_p': (o_dl_min + _i_major(Ndl, Nt), col['p_dl']),
+        'dl_min_u': (o_dl_min + _i_major(Ndl, Nt), col['u_dl']),
+    }
+
+    return pattern
+
+@lru_cache(maxsize = None)
+def _eq_pattern(layout: VariableLayout)-> dict[str, tuple[np.ndarray, np.ndarray]]:
+
+    Nt, Nbat = layout.Nt, layout.Nbat
+
+    # Índice de cada variável em x, no layout (N, Nt)
+    idx = np.arange(layout.nvars)
+    col = {name: layout.view(idx, name) for name in ('soc', 'p_chg', 'p_dch')}
+
+    # Linhas (t - 1) * Nbat + i, para t = 1, ..., Nt - 1: soc[i, t] - soc[i, t - 1] - p_chg[i, t] * eta_chg[i] + p_dch[i, t] / eta_dch[i] = 0
+    rows = _t_major(Nbat, Nt - 1)
+    pattern = {
+        'soc_t': (rows, col['soc'][:, 1:]),
+        'soc_t1': (rows, col['soc'][:, :-1]),
+        'chg': (rows, col['p_chg'][:, 1:]),
+        'dch': (rows, col['p_dch'][:, 1:]),
+    }
+
+    return pattern
+
+def _assemble(pattern: dict, values: dict, shape: tuple)-> sparse.csr_matrix:
+
+    # Montando a matriz a partir dos índices (cacheados) e dos coeficientes (obtidos de data)
+    rows, cols, vals = [], [], []
+    for key, (r, c) in pattern.items():
+        rows.append(r.ravel())
+        cols.append(c.ravel())
+        vals.append(np.broadcast_to(values[key], r.shape).ravel())
+
+    return sparse.csr_matrix((np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))), shape = shape)
+
+class LinearConstraints:
+
+    __slots__ = ('layout', 'A_ieq', 'b_ieq', 'A_eq', 'b_eq', '_ieq_parts', '_eq_parts')
+
+    def __init__(self, layout: VariableLayout, A_ieq, b_ieq, A_eq, b_eq):
+        self.layout = layout
+        self.A_ieq = A_ieq
+        self.b_ieq = b_ieq
+        self.A_eq = A_eq
+        self.b_eq = b_eq
+
+        # Colunas das variáveis reais e das variáveis de estado separadas (A @ z = A[:, :Nr] @ xr + A[:, Nr:] @ u)
+        Nr = layout.Nr
+        self._ieq_parts = (A_ieq[:, :Nr].tocsr(), A_ieq[:, Nr:].tocsr(), b_ieq[:, None])
+        self._eq_parts = (A_eq[:, :Nr].tocsr(), A_eq[:, Nr:].tocsr(), b_eq[:, None])
+
+    def _apply(self, parts: tuple, x: np.ndarray)-> np.ndarray:
+
+        # Produto com z = [xr, u] sem copiar xr; apenas as variáveis de estado são binarizadas
+        A_r, A_i, b = parts
+        Nr = self.layout.Nr
+        X = np.atleast_2d(x)
+        U = np.float64(X[:, Nr:] > 0.5)
+        C = (A_r @ X[:, :Nr].T + A_i @ U.T - b).T
+
+        return C[0] if np.ndim(x) == 1 else C
+
+    def ieq(self, x: np.ndarray)-> np.ndarray:
+        return self._apply(self._ieq_parts, x)
+
+    def eq(self, x: np.ndarray)-> np.ndarray:
+        return self._apply(self._eq_parts, x)
+
+def compile_constraints(data: dict)-> LinearConstraints:
+
+    layout = get_layout(data)
+    Nt, Nbat = layout.Nt, layout.Nbat
+
+    # Coeficientes das restrições de desigualdade, no layout (N, T) de cada entrada do padrão
+    p_bm_min = data['p_bm_min'][:, None]
+    p_bm_max = data['p_bm_max'][:, None]
+    p_bat_max = data['p_bat_max'][:, None]
+    ieq_values = {
+        'bm_min_p': -1.0, 'bm_min_u': p_bm_min,
+        'bm_max_p': 1.0, 'bm_max_u': - p_bm_max,
+        'rup_t': 1.0, 'rup_t1': -1.0,
+        'rdown_t': -1.0, 'rdown_t1': 1.0,
+        'chg_p': 1.0, 'chg_u': - p_bat_max,
+        'dch_p': 1.0, 'dch_u': - p_bat_max,
+        'sim_chg': 1.0, 'sim_dch': 1.0,
+        'dl_max_p': 1.0, 'dl_max_u': - data['p_dl_max'],
+        'dl_min_p': -1.0, 'dl_min_u': data['p_dl_min'],
+    }
+    A_ieq = _assemble(_ieq_pattern(layout), ieq_values, (layout.n_ieq, layout.nvars))
+
+    # Termos independentes: rampas de subida e de descida e simultaneidade dos armazenadores
+    pattern = _ieq_pattern(layout)
+    b_ieq = np.zeros(layout.n_ieq)
+    b_ieq[pattern['rup_t'][0]] = data['p_bm_rup'][:, None]
+    b_ieq[pattern['rdown_t'][0]] = data['p_bm_rdown'][:, None]
+    b_ieq[pattern['sim_chg'][0]] = 1.0
+
+    # Coeficientes das restrições de igualdade (SoC)
+    eq_values = {
+        'soc_t': 1.0, 'soc_t1': -1.0,
+        'chg': - data['eta_chg'][:, None],
+        'dch': 1 / data['eta_dch'][:, None],
+    }
+    A_eq = _assemble(_eq_pattern(layout), eq_values, (layout.n_eq, layout.nvars))
+    b_eq = np.zeros(Nbat * Nt)
+
+    return LinearConstraints(layout, A_ieq, b_ieq, A_eq, b_eq)
+
+# Exemplo de uso
+if __name__ == '__main__':
+
+    from vpp_initial_data import vpp_data
+    from generator_scenarios import import_scenarios_from_pickle
+    from ieq_constraints import ieq_constr_pop
+    from eq_constraints import eq_constr_pop
+    from pathlib import Path
+    from time import perf_counter
+
+    data = vpp_data()
+    data['Nt'] = 24
+
+    # Obtendo as projeções temporais iniciais a partir de um cenário gerado anteriormente
+    path = Path(__file__).parent / 'scenarios_with_PVGIS.pkl'
+    cenario = import_scenarios_from_pickle(path)[0]
+    data['p_dl_max'] = cenario['p_dl_ref'] * 1.2
+    data['p_dl_min'] = cenario['p_dl_ref'] * 0.8
+
+    constraints = compile_constraints(data)
+    print(f'A_ieq shape {constraints.A_ieq.shape}, nnz {constraints.A_ieq.nnz}')
+    print(f'A_eq shape {constraints.A_eq.shape}, nnz {constraints.A_eq.nnz}')
+
+    X = np.random.rand(100, get_layout(data).nvars)
+
+    start = perf_counter()
+    G, H = constraints.ieq(X), constraints.eq(X)
+    print(f'Esparso: {(perf_counter() - start) * 1E3:.3f} ms')
+
+    start = perf_counter()
+    G_np, H_np = ieq_constr_pop(X, data), eq_constr_pop(X, data)
+    print(f'NumPy: {(perf_counter() - start) * 1E3:.3f} ms')
+
+    print(f'Diferença máxima: {np.max(np.abs(G - G_np)):.2e}, {np.max(np.abs(H - H_np)):.2e}')
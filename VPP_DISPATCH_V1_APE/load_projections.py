@@ -1,3 +1,4 @@
+from profiling import instrument, span
 from pathlib import Path
 import pandas as pd
 import numpy as np
@@ -26,6 +27,7 @@ import numpy as np
 
 '''
 
+@instrument()
 def projections(data: dict, begin: int, end: int, idx)-> tuple[np.ndarray]:
 
     # Obtendo a pasta mãe
@@ -46,7 +48,8 @@ def projections(data: dict, begin: int, end: int, idx)-> tuple[np.ndarray]:
     # Iterando sobre as abas do arquivo .xlsx
     for i, sheet in enumerate(files.sheet_names):
 
-        load_hourly_series = pd.read_excel(path_1, header = None, sheet_name = sheet)
+        with span('read_excel'):
+            load_hourly_series = pd.read_excel(path_1, header = None, sheet_name = sheet)
         p_l[i, :] = load_hourly_series.iloc[idx, begin: end].values
 
     # Carregamento das projeções das cargas despacháveis
@@ -57,7 +60,8 @@ def projections(data: dict, begin: int, end: int, idx)-> tuple[np.ndarray]:
     # Iterando sobre as abas do arquivo .xlsx
     for i, sheet in enumerate(files.sheet_names):
 
-        dload_hourly_series = pd.read_excel(path_2, header = None, sheet_name = sheet)
+        with span('read_excel'):
+            dload_hourly_series = pd.read_excel(path_2, header = None, sheet_name = sheet)
         p_dl_ref[i, :] = dload_hourly_series.iloc[idx, begin: end].values
 
     # Carregamento das projeções das usinas solares (FVs)
@@ -71,7 +75,8 @@ def projections(data: dict, begin: int, end: int, idx)-> tuple[np.ndarray]:
     # Iterando sobre as abas do arquivo .xlsx
     for i, sheet in enumerate(files.sheet_names):
 
-        PVsystem_hourly_series = pd.read_excel(path_3, header = None, sheet_name = sheet)
+        with span('read_excel'):
+            PVsystem_hourly_series = pd.read_excel(path_3, header = None, sheet_name = sheet)
         p_pv[i, :] = PVsystem_hourly_series.iloc[idx, begin: end].values
 
     # Carregamento das projeções das usinas eólicas (EOs)
@@ -82,7 +87,8 @@ def projections(data: dict, begin: int, end: int, idx)-> tuple[np.ndarray]:
     # Iterando sobre as abas do arquivo .xlsx
     for i, sheet in enumerate(files.sheet_names):
                
-        WTGsystem_hourly_series = pd.read_excel(path_4, header = None, sheet_name = sheet)
+        with span('read_excel'):
+            WTGsystem_hourly_series = pd.read_excel(path_4, header = None, sheet_name = sheet)
         p_wt[i, :] = WTGsystem_hourly_series.iloc[idx, begin: end].values
 
     # Carregamento do Preço de Liquidação de Diferenças (PLD)
@@ -0,0 +1,148 @@
+from pymoo.core.problem import Problem
+from pymoo.core.crossover import Crossover
+from pymoo.core.mutation import Mutation
+from pymoo.core.sampling import Sampling
+from pymoo.operators.crossover.sbx import SBX
+from pymoo.operators.crossover.ux import UX
+from pymoo.operators.mutation.pm import PM
+from pymoo.operators.mutation.bitflip import BitflipMutation
+from variable_layout import get_layout, VariableLayout
+from get_limits import bounds
+import numpy as np
+
+'''
+    Este script fornece a codificação mista do vetor de variáveis de decisão para o GA (optimizer_GA): as variáveis reais
+    (p_bm, p_chg, p_dch, soc, p_dl) mantêm os operadores contínuos (SBX e PM) e as variáveis de estado (u_bm, u_chg, u_dch, u_dl)
+    são genes booleanos, com cruzamento uniforme (UX) e mutação por inversão de bits (bit-flip). Assim, as variáveis de estado
+    assumem apenas os valores 0 e 1 (a binarização u = x > 0.5 de decompose passa a ser exata).
+
+    - Classes disponíveis (operadores do pymoo):
+        - MixedSampling(data): variáveis reais uniformes nos limites e estados sorteados em {0, 1} (exceto os fixados pelos limites);
+        - MixedCrossover(data): SBX nas variáveis reais e UX nos estados;
+        - MixedMutation(data): PM nas variáveis reais e bit-flip nos estados;
+
+    - Classe PackedPopulation: cópia compacta de uma população, com os estados em bits (np.packbits), 8 estados por byte, ou
+      seja, 1/64 da memória de float64 (e 1/8 da memória de bool) para a parte inteira do vetor. Útil para guardar ou transmitir
+      muitas populações; o GA continua operando sobre a matriz float64 do pymoo, sem usar esta classe:
+        - PackedPopulation.from_X(X, layout): compacta a matriz X, shape (Npop, Nr + Ni);
+        - X: matriz da população descompactada;
+        - nbytes: memória ocupada.
+'''
+
+def _split_problems(data: dict)-> tuple[VariableLayout, Problem, Problem]:
+
+    # Subproblemas com os limites das variáveis reais e dos estados (usados pelos operadores do pymoo)
+    layout = get_layout(data)
+    ub, lb = bounds(data)
+    real = Problem(n_var = layout.Nr, xl = lb[:layout.Nr], xu = ub[:layout.Nr])
+    binary = Problem(n_var = layout.Ni, xl = lb[layout.Nr:], xu = ub[layout.Nr:], vtype = bool)
+
+    return layout, real, binary
+
+class MixedSampling(Sampling):
+
+    def __init__(self, data: dict):
+        super().__init__()
+        self.layout, self.real, self.binary = _split_problems(data)
+
+    def _do(self, problem, n_samples, *args, random_state = None, **kwargs):
+
+        Nr = self.layout.Nr
+        X = np.empty((n_samples, self.layout.nvars))
+        X[:, :Nr] = self.real.xl + random_state.random((n_samples, Nr)) * (self.real.xu - self.real.xl)
+        X[:, Nr:] = np.clip(random_state.random((n_samples, self.layout.Ni)) < 0.5, self.binary.xl, self.binary.xu)
+
+        return X
+
+class MixedCrossover(Crossover):
+
+    def __init__(self, data: dict, real = None, binary = None, **kwargs):
+        super().__init__(2, 2, **kwargs)
+        self.layout, self.real, self.binary = _split_problems(data)
+        self.real_op = SBX(eta = 15, prob = 1.0) if real is None else real
+        self.binary_op = UX(prob = 1.0) if binary is None else binary
+
+    def _do(self, problem, X, *args, random_state = None, **kwargs):
+
+        # X: pais, shape (2, n_matings, Nr + Ni)
+        Nr = self.layout.Nr
+        Q = np.empty_like(X)
+        Q[..., :Nr] = self.real_op._do(self.real, X[..., :Nr], random_state = random_state)
+        Q[..., Nr:] = self.binary_op._do(self.binary, X[..., Nr:] > 0.5, random_state = random_state)
+
+        return Q
+
+class MixedMutation(Mutation):
+
+    def __init__(self, data: dict, real = None, binary = None, **kwargs):
+        super().__init__(**kwargs)
+        self.layout, self.real, self.binary = _split_problems(data)
+        self.real_op = PM(eta = 20) if real is None else real
+        self.binary_op = BitflipMutation() if binary is None else binary
+
+    def _do(self, problem, X, *args, random_state = None, **kwargs):
+
+        Nr = self.layout.Nr
+        Xp = np.empty_like(X, dtype = np.float64)
+        Xp[:, :Nr] = self.real_op._do(self.real, X[:, :Nr], random_state = random_state)
+        Xp[:, Nr:] = self.binary_op._do(self.binary, X[:, Nr:] > 0.5, random_state = random_state)
+
+        # Estados fixados pelos limites (estado inicial) não são invertidos
+        Xp[:, Nr:] = np.clip(Xp[:, Nr:], self.binary.xl, self.binary.xu)
+
+        return Xp
+
+class PackedPopulation:
+
+    __slots__ = ('layout', 'Xr', 'bits')
+
+    def __init__(self, layout: VariableLayout, Xr: np.ndarray, bits: np.ndarray):
+        self.layout = layout
+        self.Xr = Xr # Variáveis reais, shape (Npop, Nr)
+        self.bits = bits # Estados compactados, shape (Npop, ceil(Ni / 8)), uint8
+
+    @classmethod
+    def from_X(cls, X: np.ndarray, layout: VariableLayout)-> 'PackedPopulation':
+        X = np.atleast_2d(X)
+        return cls(layout, np.array(X[:, :layout.Nr], dtype = np.float64), np.packbits(X[:, layout.Nr:] > 0.5, axis = 1))
+
+    @property
+    def X(self)-> np.ndarray:
+        U = np.unpackbits(self.bits, axis = 1, count = self.layout.Ni)
+        return np.hstack((self.Xr, U.astype(np.float64)))
+
+    @property
+    def nbytes(self)-> int:
+        return self.Xr.nbytes + self.bits.nbytes
+
+    def __len__(self)-> int:
+        return len(self.Xr)
+
+# Exemplo de uso
+if __name__ == '__main__':
+
+    from vpp_initial_data import vpp_data
+    from generator_scenarios import import_scenarios_from_pickle
+    from scenario_context import attach_scenario
+    from pathlib import Path
+
+    data = vpp_data()
+    data['Nt'] = 24
+
+    # Obtendo as projeções temporais iniciais a partir de um cenário gerado anteriormente
+    path = Path(__file__).parent / 'scenarios_with_PVGIS.pkl'
+    cenario = import_scenarios_from_pickle(path)[0]
+    attach_scenario(data, cenario)
+    data['p_dl_max'] = cenario['p_dl_ref'] * 1.2
+    data['p_dl_min'] = cenario['p_dl_ref'] * 0.8
+
+    layout = get_layout(data)
+    rng = np.random.default_rng(1)
+    X = MixedSampling(data)._do(None, 10000, random_state = rng)
+    Xm = MixedMutation(data)._do(None, X, random_state = rng)
+    print(f'Estados binários após a mutação: {np.all(np.isin(Xm[:, layout.Nr:], (0.0, 1.0)))}')
+
+    packed = PackedPopulation.from_X(X, layout)
+    print(f'Memória da parte inteira: float64 {X[:, layout.Nr:].nbytes / 1E6:.2f} MB, bool {X[:, layout.Nr:].astype(bool).nbytes / 1E6:.2f} MB, '
+          f'compactada {packed.bits.nbytes / 1E6:.3f} MB')
+    print(f'População recuperada sem perdas: {np.array_equal(packed.X, X)}')
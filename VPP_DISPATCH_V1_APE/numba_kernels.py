@@ -0,0 +1,206 @@
+from variable_layout import get_layout
+from scenario_context import get_context
+import numpy as np
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+'''
+    Este script fornece um backend opcional, compilado com Numba (@njit), para a avaliação da função objetivo e das restrições
+    de desigualdade e de igualdade da VPP. Os kernels percorrem diretamente o vetor de variáveis x (sem decompor nem criar arrays
+    temporários), calculando o lucro, c_ieq e c_eq em uma única passada. Para populações há uma variante paralela (prange) sobre
+    os indivíduos.
+
+    Quando o Numba não está instalado, NUMBA_AVAILABLE é falso e o avaliador NumPy (evaluator.evaluate) deve ser usado.
+
+    - Classe NumbaEvaluator(data: dict):
+        - Pré-processa, uma única vez, os parâmetros e as projeções de data em arrays contíguos;
+        - Chamada com x 1-D, shape (Nr + Ni,): retorna (fval, c_ieq, c_eq) de um indivíduo (kernel serial);
+        - Chamada com X 2-D, shape (Npop, Nr + Ni): retorna (fval, c_ieq, c_eq) de toda a população (kernel paralelo).
+
+    - A ordem de c_ieq e c_eq é a mesma de ieq_constr e eq_constr.
+'''
+
+if NUMBA_AVAILABLE:
+
+    @njit(cache = True)
+    def _genome_kernel(x, g, h, Nt, Nbm, Nbat, Ndl, p_fixed, c_fixed, tau_pld_pu, tau_dist_pu, tau_dl_pu,
+                       p_bm_min, p_bm_max, p_bm_rup, p_bm_rdown, p_bat_max, p_dl_min, p_dl_max,
+                       eta_chg, eta_dch, kappa_bm, kappa_bm_start, kappa_bat):
+
+        # Posição de cada bloco no vetor x (mesma ordem de variable_layout)
+        o_bm = 0
+        o_chg = o_bm + Nbm * Nt
+        o_dch = o_chg + Nbat * Nt
+        o_soc = o_dch + Nbat * Nt
+        o_dl = o_soc + Nbat * Nt
+        o_ubm = o_dl + Ndl * Nt
+        o_uchg = o_ubm + Nbm * Nt
+        o_udch = o_uchg + Nbat * Nt
+        o_udl = o_udch + Nbat * Nt
+
+        # Posição de cada grupo de restrições de desigualdade em g
+        g_bm_max = Nbm * Nt
+        g_rup = 2 * Nbm * Nt
+        g_rdown = g_rup + Nbm * (Nt - 1)
+        g_chg = g_rdown + Nbm * (Nt - 1)
+        g_dch = g_chg + Nbat * Nt
+        g_sim = g_dch + Nbat * Nt
+        g_dl_max = g_sim + Nbat * Nt
+        g_dl_min = g_dl_max + Ndl * Nt
+
+        R = 0.0
+        D = 0.0
+        C = 0.0
+
+        for t in range(Nt):
+
+            # Potência líquida no instante t
+            p_liq = p_fixed[t]
+
+            # UBTMs
+            for i in range(Nbm):
+                p = x[o_bm + i * Nt + t]
+                u = 1.0 if x[o_ubm + i * Nt + t] > 0.5 else 0.0
+                p_liq += p * u
+                C += p * u * kappa_bm[i]
+                g[t * Nbm + i] = p_bm_min[i] * u - p
+                g[g_bm_max + t * Nbm + i] = p - p_bm_max[i] * u
+                if t > 0:
+                    p_prev = x[o_bm + i * Nt + t - 1]
+                    u_prev = 1.0 if x[o_ubm + i * Nt + t - 1] > 0.5 else 0.0
+                    g[g_rup + (t - 1) * Nbm + i] = p - p_prev - p_bm_rup[i]
+                    g[g_rdown + (t - 1) * Nbm + i] = p_prev - p - p_bm_rdown[i]
+                    if u > u_prev:
+                        C += kappa_bm_start[i]
+
+            # Armazenadores
+            for i in range(Nbat):
+                p_chg = x[o_chg + i * Nt + t]
+                p_dch = x[o_dch + i * Nt + t]
+                u_chg = 1.0 if x[o_uchg + i * Nt + t] > 0.5 else 0.0
+                u_dch = 1.0 if x[o_udch + i * Nt + t] > 0.5 else 0.0
+                p_bat = p_chg * u_chg + p_dch * u_dch
+                p_liq -= p_bat
+                C += p_bat * kappa_bat[i]
+                g[g_chg + t * Nbat + i] = p_chg - p_bat_max[i] * u_chg
+                g[g_dch + t * Nbat + i] = p_dch - p_bat_max[i] * u_dch
+                g[g_sim + t * Nbat + i] = u_chg + u_dch - 1
+                if t > 0:
+                    h[(t - 1) * Nbat + i] = (x[o_soc + i * Nt + t] - x[o_soc + i * Nt + t - 1]
+                                             - p_chg * eta_chg[i] + p_dch / eta_dch[i])
+                else:
+                    h[(Nt - 1) * Nbat + i] = 0.0
+
+            # Cargas despacháveis
+            for i in range(Ndl):
+                p = x[o_dl + i * Nt + t]
+                u = 1.0 if x[o_udl + i * Nt + t] > 0.5 else 0.0
+                p_liq -= p * u
+                C += p * u * tau_dl_pu[t]
+                g[g_dl_max + i * Nt + t] = p - p_dl_max[i, t] * u
+                g[g_dl_min + i * Nt + t] = p_dl_min[i, t] * u - p
+
+            # Receita com exportação e despesa com importação
+            if p_liq > 0:
+                R += p_liq * tau_pld_pu[t]
+            else:
+                D -= p_liq * tau_dist_pu[t]
+
+        return R - (D + c_fixed + C)
+
+    @njit(cache = True, parallel = True)
+    def _population_kernel(X, F, G, H, Nt, Nbm, Nbat, Ndl, p_fixed, c_fixed, tau_pld_pu, tau_dist_pu, tau_dl_pu,
+                           p_bm_min, p_bm_max, p_bm_rup, p_bm_rdown, p_bat_max, p_dl_min, p_dl_max,
+                           eta_chg, eta_dch, kappa_bm, kappa_bm_start, kappa_bat):
+
+        # Avaliação paralela dos indivíduos da população
+        for k in prange(X.shape[0]):
+            F[k] = _genome_kernel(X[k], G[k], H[k], Nt, Nbm, Nbat, Ndl, p_fixed, c_fixed, tau_pld_pu, tau_dist_pu, tau_dl_pu,
+                                  p_bm_min, p_bm_max, p_bm_rup, p_bm_rdown, p_bat_max, p_dl_min, p_dl_max,
+                                  eta_chg, eta_dch, kappa_bm, kappa_bm_start, kappa_bat)
+
+class NumbaEvaluator:
+
+    def __init__(self, data: dict):
+
+        if not NUMBA_AVAILABLE:
+            raise ImportError('O backend numba requer o pacote numba instalado')
+
+        self.layout = get_layout(data)
+
+        def as_array(value):
+            return np.ascontiguousarray(value, dtype = np.float64)
+
+        # Parcela da potência líquida, custos e tarifas que independem de x (contexto do cenário)
+        ctx = get_context(data)
+
+        # Argumentos dos kernels, na ordem esperada por _genome_kernel
+        self.args = (self.layout.Nt, self.layout.Nbm, self.layout.Nbat, self.layout.Ndl,
+                     as_array(ctx.p_fixed), float(ctx.Cpv + ctx.Cwt),
+                     as_array(ctx.tau_pld_pu), as_array(ctx.tau_dist_pu), as_array(ctx.tau_dl_pu),
+                     as_array(data['p_bm_min']), as_array(data['p_bm_max']), as_array(data['p_bm_rup']), as_array(data['p_bm_rdown']),
+                     as_array(data['p_bat_max']), as_array(data['p_dl_min']), as_array(data['p_dl_max']),
+                     as_array(data['eta_chg']), as_array(data['eta_dch']),
+                     as_array(data['kappa_bm']), as_array(data['kappa_bm_start']), as_array(data['kappa_bat']))
+
+    def __call__(self, x: np.ndarray)-> tuple:
+
+        x = np.ascontiguousarray(x, dtype = np.float64)
+
+        # Um único indivíduo: kernel serial
+        if x.ndim == 1:
+            g = np.empty(self.layout.n_ieq)
+            h = np.empty(self.layout.n_eq)
+            fval = _genome_kernel(x, g, h, *self.args)
+            return fval, g, h
+
+        # População: kernel paralelo sobre os indivíduos
+        Npop = x.shape[0]
+        F = np.empty(Npop)
+        G = np.empty((Npop, self.layout.n_ieq))
+        H = np.empty((Npop, self.layout.n_eq))
+        _population_kernel(x, F, G, H, *self.args)
+
+        return F, G, H
+
+# Exemplo de uso
+if __name__ == '__main__':
+
+    from vpp_initial_data import vpp_data
+    from generator_scenarios import import_scenarios_from_pickle
+    from evaluator import evaluate
+    from get_limits import bounds
+    from pathlib import Path
+    from time import perf_counter
+
+    data = vpp_data()
+    data['Nt'] = 24
+
+    # Obtendo as projeções temporais iniciais a partir de um cenário gerado anteriormente
+    path = Path(__file__).parent / 'scenarios_with_PVGIS.pkl'
+    cenario = import_scenarios_from_pickle(path)[0]
+    for key in ['p_pv', 'p_wt', 'p_l', 'tau_pld', 'tau_dist', 'tau_dl']:
+        data[key] = cenario[key]
+    data['p_dl_max'] = cenario['p_dl_ref'] * 1.2
+    data['p_dl_min'] = cenario['p_dl_ref'] * 0.8
+
+    ub, lb = bounds(data)
+    X = lb + np.random.rand(50, len(ub)) * (ub - lb)
+
+    evaluator = NumbaEvaluator(data)
+    evaluator(X[0]) # Compilação dos kernels
+    evaluator(X)
+
+    start = perf_counter()
+    fval, c_ieq, c_eq = evaluator(X[0])
+    print(f'Numba (1 indivíduo): {(perf_counter() - start) * 1E6:.1f} us')
+
+    start = perf_counter()
+    fval_np, c_ieq_np, c_eq_np = evaluate(X[0], data)
+    print(f'NumPy (1 indivíduo): {(perf_counter() - start) * 1E6:.1f} us')
+
+    print(f'Diferença máxima: {abs(fval - fval_np):.2e}, {np.max(np.abs(c_ieq - c_ieq_np)):.2e}, {np.max(np.abs(c_eq - c_eq_np)):.2e}')
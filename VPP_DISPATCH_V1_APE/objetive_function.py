@@ -1,4 +1,6 @@
-from decompose_vetor import decompose
+from decompose_vetor import decompose, decompose_pop
+from scenario_context import get_context
+from profiling import instrument
 import numpy as np
 
 """
@@ -41,6 +43,7 @@ import numpy as np
         - fval: O lucro obtido na operação da VPP(Virtual Power Plant)
 """
 
+@instrument()
 def obj_function(x, vpp_data) -> np.float64:
 
     # Definindo a potência aparente base (1MVA)
@@ -155,11 +158,103 @@ def obj_function(x, vpp_data) -> np.float64:
     
     return fval
 
+"""
+    Versão populacional da função objetivo: avalia toda a população X, shape (Npop, Nr + Ni), de uma só vez.
+    Os laços em t e i são substituídos por operações vetorizadas do NumPy sobre o layout (Npop, N, Nt) retornado por decompose_pop.
+
+    Retorna:
+        - fval: O lucro obtido na operação da VPP para cada indivíduo, shape (Npop,)
+"""
+
+@instrument()
+def obj_function_pop(X, vpp_data) -> np.ndarray:
+
+    # Decompondo a população em suas variáveis, shape (Npop, N, Nt)
+    variables = decompose_pop(X, vpp_data)
+
+    # Parcelas de receita e custos da VPP
+    terms = cost_terms(variables, vpp_data)
+
+    return profit(terms)
+
+"""
+    Calcula as parcelas da função objetivo a partir das variáveis já decompostas por decompose_pop.
+
+    Parâmetros:
+    - variables: tupla (p_bm, p_chg, p_dch, soc, p_dl, u_bm, u_chg, u_dch, u_dl), cada uma com shape (Npop, N, Nt)
+    - vpp_data: estrutura de dicionário contendo os parâmetros da VPP
+
+    Retorna:
+        - terms: dicionário com a receita (R), a despesa com importação (D) e os custos (Cpv, Cwt, Cbm, Cdl, Cbat), cada um com shape (Npop,)
+"""
+
+@instrument()
+def cost_terms(variables, vpp_data) -> dict[str, np.ndarray]:
+
+    # Grandezas que dependem apenas do cenário (calculadas uma única vez por cenário)
+    ctx = get_context(vpp_data)
+
+    # Custos dos ativos da VPP
+    kappa_bm = vpp_data['kappa_bm']
+    kappa_bat = vpp_data['kappa_bat']
+    kappa_bm_start = vpp_data['kappa_bm_start']
+
+    p_bm, p_chg, p_dch, soc, p_dl, u_bm, u_chg, u_dch, u_dl = variables
+    Npop = p_bm.shape[0]
+
+    # Potências efetivas (ponderadas pelos estados)
+    p_bm_on = p_bm * u_bm
+    p_dl_on = p_dl * u_dl
+    p_bat_on = p_chg * u_chg + p_dch * u_dch
+
+    # Calculando a Potência líquida, shape (Npop, Nt): parcela fixa do cenário mais as parcelas que dependem de X
+    p_liq = ctx.p_fixed + np.sum(p_bm_on, axis = 1) - np.sum(p_dl_on, axis = 1) - np.sum(p_bat_on, axis = 1)
+
+    # Obtendo a potência exportada e a potência importada
+    p_exp = np.maximum(0, p_liq)
+    p_imp = np.maximum(0, -p_liq)
+
+    terms = {}
+
+    # Receita com excedente de energia
+    terms['R'] = p_exp @ ctx.tau_pld_pu
+
+    # Despesa com importação de energia da distribuidora
+    terms['D'] = p_imp @ ctx.tau_dist_pu
+
+    # Custos de geração solar fotovoltaica e eólica (independem de X)
+    terms['Cpv'] = np.full(Npop, ctx.Cpv)
+    terms['Cwt'] = np.full(Npop, ctx.Cwt)
+
+    # Custos de geração biomassa (custo linear) e custo de partida (ligando de 0 → 1)
+    terms['Cbm'] = np.einsum('pit,i->p', p_bm_on, kappa_bm)
+    terms['Cbm'] = terms['Cbm'] + np.einsum('pit,i->p', np.float64(u_bm[:, :, 1:] > u_bm[:, :, :-1]), kappa_bm_start)
+
+    # Custo de controle carga despachada
+    terms['Cdl'] = np.einsum('pit,t->p', p_dl_on, ctx.tau_dl_pu)
+
+    # Custo da bateria
+    terms['Cbat'] = np.einsum('pit,i->p', p_bat_on, kappa_bat)
+
+    return terms
+
+"""
+    Combina as parcelas calculadas por cost_terms no lucro da VPP: fval = R - (D + Cpv + Cwt + Cbm + Cdl + Cbat)
+"""
+
+def profit(terms: dict) -> np.ndarray:
+
+    # Despesa total
+    D = terms['D'] + terms['Cpv'] + terms['Cwt'] + terms['Cbm'] + terms['Cdl'] + terms['Cbat']
+    fval = terms['R'] - D
+
+    return fval
+
 # Test de uso
 if __name__ == '__main__':
 
     from vpp_initial_data import vpp_data
-    from decompose_vetor import decompose
+    from variable_layout import get_layout
     from generator_scenarios import import_scenarios_from_pickle
     from pathlib import Path
 
@@ -167,19 +262,9 @@ if __name__ == '__main__':
 
     # Parâmetros iniciais de VPP
     data['Nt'] = 24
-    Nt = data['Nt'] # Período de simulação da VPP
-    Nbm = data['Nbm'] # Quantidade de usinas de biomassa da VPP
-    Nbat = data['Nbat'] # Quantidade de armazenadores da VPP
-    Ndl = data['Ndl'] # Quantidade de cargas despacháveis da VPP
-
-    # Definindo a quantidade de variáveis reais (Nr) e variáveis inteiras (Ni)
-    # Variáveis reais: p_bm, p_chg, p_dch, soc, p_dl
-    Nr = (Nt * Nbm) + (Nt * Nbat) + (Nt * Nbat) + (Nbat * Nt) + (Nt * Ndl)
-    # Variáveis inteiras: u_bm, u_chg, u_dch, u_dl
-    Ni = (Nt * Nbm) + (Nt * Nbat) + (Nt * Nbat) + (Nt * Ndl)
-    
+
     # Gerando um população inicial para teste
-    x = np.random.rand(Nr + Ni)
+    x = np.random.rand(get_layout(data).nvars)
 
     # Obtendo as projeções temporais iniciais a partir de um cenário gerado anteriormente
     path = Path(__file__).parent / 'scenarios_with_PVGIS.pkl'
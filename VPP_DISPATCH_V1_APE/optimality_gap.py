@@ -0,0 +1,108 @@
+from pymoo.core.callback import Callback
+from pymoo.core.termination import Termination
+from pymoo.core.individual import calc_cv
+from variable_layout import get_layout
+from get_limits import bounds
+import numpy as np
+
+'''
+    Este script relaciona o GA (optimizer_GA) com a relaxação linear do modelo de despacho da VPP (optimizer_MILP.lp_relaxation),
+    cujo valor é um limite superior do lucro. A partir dele são fornecidos:
+
+    - Funções disponíveis:
+        - lp_seed_population(x_lp, data, n, seed): n indivíduos obtidos por arredondamento da solução relaxada x_lp. O primeiro
+          indivíduo usa arredondamento determinístico (u >= 0.5) e os demais arredondamento aleatório (u = 1 com probabilidade u_lp);
+        - best_feasible_index(algorithm): índice do indivíduo factível de maior lucro da população do GA (None se não houver);
+        - best_feasible(algorithm): maior lucro entre os indivíduos factíveis da população do GA (- inf se não houver);
+        - gap(bound, best): gap relativo entre o limite superior e o melhor lucro factível.
+
+    - Classe GapCallback(bound, verbose): callback do pymoo que registra (e exibe) o melhor lucro factível e o gap a cada geração
+      em history, uma lista de tuplas (n_gen, lucro, gap).
+
+    - Classe GapTermination(bound, tol): critério de parada do pymoo, satisfeito quando o gap é menor ou igual a tol.
+
+    - Como o GA usa ConstraintsAsPenalty, a factibilidade é avaliada pelas restrições originais (__G__ e __H__), com as mesmas
+      tolerâncias padrão do pymoo.
+'''
+
+def lp_seed_population(x_lp: np.ndarray, data: dict, n: int, seed: int = 1)-> np.ndarray:
+
+    layout = get_layout(data)
+    Nr = layout.Nr
+    ub, lb = bounds(data)
+    rng = np.random.default_rng(seed)
+
+    # Variáveis reais da relaxação (limitadas aos limites do GA) e estados relaxados em [0, 1]
+    X = np.tile(np.clip(x_lp, lb, ub), (n, 1))
+    u_lp = np.clip(x_lp[Nr:], 0, 1)
+
+    # Arredondamento determinístico do primeiro indivíduo e aleatório dos demais
+    X[0, Nr:] = np.float64(u_lp >= 0.5)
+    X[1:, Nr:] = np.float64(rng.random((n - 1, layout.Ni)) < u_lp)
+
+    return X
+
+def best_feasible_index(algorithm)-> int:
+
+    pop = algorithm.pop
+    if pop is None or len(pop) == 0:
+        return None
+
+    # Objetivo e restrições originais (antes da penalização)
+    F = pop.get('__F__')
+    if F is None:
+        F, G, H = pop.get('F'), pop.get('G'), pop.get('H')
+    else:
+        G, H = pop.get('__G__'), pop.get('__H__')
+
+    feasible = np.flatnonzero(calc_cv(G = G, H = H) <= 0)
+    if len(feasible) == 0:
+        return None
+
+    return feasible[np.argmin(F[feasible, 0])]
+
+def best_feasible(algorithm)-> float:
+
+    k = best_feasible_index(algorithm)
+    if k is None:
+        return - np.inf
+
+    F = algorithm.pop.get('__F__')
+    if F is None:
+        F = algorithm.pop.get('F')
+
+    return - F[k, 0]
+
+def gap(bound: float, best: float)-> float:
+
+    if not np.isfinite(best):
+        return np.inf
+
+    return (bound - best) / max(abs(bound), 1E-9)
+
+class GapCallback(Callback):
+
+    def __init__(self, bound: float, verbose: bool = True):
+        super().__init__()
+        self.bound = bound
+        self.verbose = verbose
+        self.history = []
+
+    def notify(self, algorithm):
+
+        best = best_feasible(algorithm)
+        g = gap(self.bound, best)
+        self.history.append((algorithm.n_gen, best, g))
+
+        if self.verbose:
+            print(f'Geração {algorithm.n_gen}: limite superior {self.bound:.4f}, melhor lucro factível {best:.4f}, gap {g:.2%}')
+
+class GapTermination(Termination):
+
+    def __init__(self, bound: float, tol: float):
+        super().__init__()
+        self.bound = bound
+        self.tol = tol
+
+    def _update(self, algorithm):
+        return 1.0 if gap(self.bound, best_feasible(algorithm)) <= self.tol else 0.0
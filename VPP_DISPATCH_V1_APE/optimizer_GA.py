@@ -1,10 +1,23 @@
-from pymoo.core.problem import ElementwiseProblem
+from pymoo.core.problem import Problem
 from pymoo.algorithms.soo.nonconvex.ga import GA
-from objetive_function import obj_function
-from ieq_constraints import ieq_constr
-from eq_constraints import eq_constr
+from evaluator import get_evaluator
+from parallel_evaluator import ParallelEvaluator
+from repair import VPPRepair
+from mixed_variables import MixedSampling, MixedCrossover, MixedMutation
 from get_limits import bounds
-from pymoo.optimize import minimize
+from variable_layout import get_layout
+from optimizer_MILP import lp_relaxation
+from optimality_gap import lp_seed_population, GapCallback, GapTermination
+from warm_start import warm_start_population
+from stochastic_objective import StochasticEvaluator, check_alpha
+from pymoo.termination.collection import TerminationCollection
+from pymoo.termination import get_termination
+from pymoo.termination.max_time import TimeBasedTermination
+from anytime import BestFeasibleTracker, StagnationTermination, Callbacks
+from telemetry import TelemetryCallback
+import numpy as np
+from checkpoint import Checkpointer, load_checkpoint
+from pymoo.util.display.progress import ProgressBar
 
 from pymoo.config import Config
 Config.warnings['not_compiled'] = False
@@ -18,6 +31,29 @@ Config.warnings['not_compiled'] = False
             - Ndl: Quantidade de cargas despacháveis.
             - Nbm: Quantidade de usinas de biomassa (UBTM).
             - Nbat: Quantidade de armazenadores de energia.
+        - backend (str): Backend de avaliação da função objetivo e das restrições: 'numpy' (padrão), 'numba' (kernels compilados, se o Numba estiver instalado) ou 'sparse' (restrições compiladas em matrizes esparsas).
+        - lp_bound (bool): Resolve a relaxação linear do modelo (optimizer_MILP.lp_relaxation) e exibe, a cada geração, o limite superior do lucro e o gap do melhor indivíduo factível.
+        - lp_seed (float): Fração da população inicial obtida por arredondamento da solução relaxada (0 a 1, padrão 0).
+        - gap_tol (float): Gap relativo abaixo do qual o GA é interrompido antes do número máximo de gerações (opcional).
+        - repair (bool): Aplica o reparo VPPRepair aos descendentes antes da avaliação (estrutura factível das UBTMs e dos armazenadores, padrão True).
+        - mixed (bool): Codificação mista (mixed_variables): SBX e PM nas variáveis reais e UX e bit-flip nos estados booleanos (padrão True). Com mixed = False todas as variáveis são contínuas e os estados são binarizados por u = x > 0.5.
+        - n_gen (int): Número máximo de gerações (padrão 50; None para não limitar).
+        - time_budget (float): Tempo máximo de execução em segundos (opcional).
+        - stagnation (int): Encerra o GA quando o melhor lucro factível não melhora há stagnation gerações (opcional).
+        - on_improve (callable): Função chamada com o melhor despacho factível (variáveis decompostas, lucro, x, geração e tempo decorrido) sempre que ele melhora (anytime).
+        - initial (np.ndarray): Despacho(s) anterior(es) para o início a quente (warm_start), por exemplo res.X de uma execução anterior (deslocado com warm_start.shift_solution quando o horizonte avança). Os despachos e variações mutadas deles formam initial_frac da população inicial (padrão 0.5); combinado com stagnation, a nova resolução termina em poucas gerações.
+        - verbose (bool): Exibe o progresso do GA a cada geração (padrão True).
+        - seed (int): Semente do gerador de números aleatórios do GA (padrão 1).
+        - pop_size (int): Tamanho da população (padrão 50).
+        - penalty (float): Fator de penalização das restrições violadas (ConstraintsAsPenalty, padrão 100).
+        - eps_until (float): Fração do número máximo de gerações ao longo da qual a tolerância das restrições (epsilon) é reduzida a zero (AdaptiveEpsilonConstraintHandling, padrão 0.5); com None apenas a penalização (ConstraintsAsPenalty) é usada.
+        - ftol (float): Encerra o GA quando a variação do melhor objetivo fica abaixo de ftol por 15 gerações (RobustTermination, opcional).
+        - scenarios (list): Lista de cenários (dicionários de create_scenarios) para a função objetivo estocástica (stochastic_objective): um único despacho é otimizado para todos os cenários, maximizando (1 - cvar_weight) * E[lucro] + cvar_weight * CVaR_cvar_alpha[lucro], com cvar_alpha em (0, 1] quando cvar_weight > 0. Nesse caso o lucro de res.F e do callback on_improve é esse objetivo, e as restrições usam os limites de data (p_dl_max, p_dl_min).
+        - telemetry (str): Arquivo .jsonl ou .csv em que é gravado um registro por geração (telemetry.TelemetryCallback): geração, tempo, avaliações por segundo, melhor e médio objetivo, menor e média violação, fração factível, epsilon e tempos da função objetivo e das restrições (opcional).
+        - migration (callable): Função chamada com o algoritmo após cada geração (usada pelo modelo de ilhas, islands.Migration).
+        - checkpoint (str): Arquivo em que o estado do algoritmo é gravado periodicamente (checkpoint), a cada checkpoint_every gerações e/ou a cada checkpoint_seconds segundos (padrão: a cada 10 gerações).
+        - resume (str): Arquivo de checkpoint a partir do qual a execução é retomada, com os mesmos resultados da execução sem interrupção. Os demais parâmetros devem ser os mesmos da execução original.
+        - n_workers (int): Quantidade de processos na avaliação da população (padrão 1, avaliação serial). Com n_workers > 1 os arrays de data são copiados uma única vez para memória compartilhada (parallel_evaluator); os resultados são idênticos aos da avaliação serial.
 
     -> Processo:
         1. Definição do Problema: O problema é modelado como um problema de otimização interira mista de múltiplas variáveis, com variáveis contínuas (potências, carga, e tarifas) e variáveis inteiras (estados de operação).
@@ -26,59 +62,85 @@ Config.warnings['not_compiled'] = False
         4. Otimização: O GA é utilizado para encontrar as soluções ótimas, considerando penalidades para restrições violadas.
 
     -> Saída:
-        - res (Result): Resultado da otimização contendo as variáveis de decisão otimizadas (potências, estados de carga, etc.) e o valor da função objetivo (lucro).
+        - res (Result): Resultado da otimização contendo as variáveis de decisão otimizadas (potências, estados de carga, etc.) e o valor da função objetivo (lucro). Quando algum despacho factível é encontrado, res.X, res.F e res.CV correspondem ao melhor deles (res.best_history registra cada melhora).
 
     -> Dependências:
         - pymoo: Framework de otimização para resolução de problemas de otimização de múltiplos objetivos.
-        - objetive_function: Função objetivo para cálculo do lucro.
-        - ieq_constr: Restrições de desigualdade.
-        - eq_constr: Restrições de igualdade.
+        - evaluator: Avaliação conjunta da função objetivo (lucro), das restrições de desigualdade e de igualdade.
         - get_limits: Função para obter os limites das variáveis de decisão.
+        - checkpoint: Gravação e leitura do estado do algoritmo (checkpoints).
+        - optimizer_MILP, optimality_gap: Relaxação linear, população inicial semeada e gap de otimalidade.
+        - warm_start: População inicial a partir de despachos anteriores.
+        - stochastic_objective: Lucro esperado (e CVaR) de um despacho em todos os cenários.
 '''
 
-def solver(data: dict):
+# Barra de progresso nula na retomada sem verbose (substitui a referência gravada no checkpoint, sem exibir nada)
+class _NoProgress:
 
-    # Parâmetros iniciais da VPP
-    Nt = data['Nt'] # Período da simulação da VPP
-    Ndl = data['Ndl'] # Quantidade de cargas despacháveis da VPP
-    Nbm = data['Nbm'] # Quantidade de UBTMs da VPP
-    Nbat = data['Nbat'] # Quantidade de armazenadores da VPP
+    def __bool__(self):
+        return False
 
-    # Variáveis reais: p_bm, p_chg, p_dch, soc, p_dl
-    Nr = (Nt * Nbm) + (Nt * Nbat) + (Nt * Nbat) + (Nbat * Nt) + (Nt * Ndl)
-    # Variáveis inteiras: u_bm, u_chg, u_dch, u_dl
-    Ni = (Nt * Nbm) + (Nt * Nbat) + (Nt * Nbat) + (Nt * Ndl)
-    # Definido a quantidade de variáveis
-    nvars = Nr + Ni
+    def set(self, *args, **kwargs):
+        pass
 
-    # Definindo a quantidade de restrições de igualdade da VPP
-    Nsoc = (Nbat * Nt) # Quantidade restrições de igualdade do estado de carga dos armazenadores da VPP
-    c_eq = Nsoc # Total de restrições de igualdade da VPP
+    def close(self):
+        pass
 
-    # Definindo a quantidade de restrições de desigualdades da VPP
-    Nbmc =(Nbm * Nt) + (Nbm * Nt) + (Nbm * (Nt - 1)) + (Nbm * (Nt - 1)) # Quantidade de restrições de desigualdade da VPP
-    Nbatc = (Nbat * Nt) + (Nbat * Nt) + (Nbat * Nt) # Quantidade de restrições de desigualdade dos armazenadores da VPP
-    Ndlc = (Ndl * Nt) + (Ndl * Nt)# Quantidade de restrições de desigualdade das cargas despacháveis da VPP
-    c_ieq = Nbmc + Nbatc + Ndlc # Total de restrições de desigualdade da VPP
+def solver(data: dict, backend: str = 'numpy', lp_bound: bool = False, lp_seed: float = 0.0, gap_tol: float = None, n_workers: int = 1, repair: bool = True, mixed: bool = True,
+           checkpoint: str = None, checkpoint_every: int = None, checkpoint_seconds: float = None, resume: str = None,
+           n_gen: int = 50, time_budget: float = None, stagnation: int = None, on_improve = None, initial: np.ndarray = None, initial_frac: float = 0.5,
+           verbose: bool = True, seed: int = 1, pop_size: int = 50, penalty: float = 100.0, migration = None,
+           eps_until: float = 0.5, ftol: float = None, scenarios: list = None, cvar_alpha: float = None, cvar_weight: float = 0.0,
+           telemetry: str = None):
+
+    # Layout do vetor de variáveis da VPP (quantidade de variáveis e de restrições)
+    layout = get_layout(data)
+
+    # Definido a quantidade de variáveis (Nr + Ni)
+    nvars = layout.nvars
+
+    # Definindo a quantidade de restrições de igualdade (SoC) e de desigualdade (UBTMs, armazenadores e cargas despacháveis) da VPP
+    c_eq = layout.n_eq
+    c_ieq = layout.n_ieq
 
     # Obtendo os limites superior (ub) e inferior (lb) das variáveis de decisão
     ub, lb = bounds(data)
 
-    # Criando uma classe que define o problema
-    class MyProblem(ElementwiseProblem):
+    # Criando uma classe que define o problema (avaliação vetorizada de toda a população a cada geração)
+    class MyProblem(Problem):
 
-        def __init__(self, data: dict, **kwargs):
-            super().__init__(data, **kwargs)
+        def __init__(self, data: dict, evaluator, **kwargs):
+            super().__init__(**kwargs)
             self.data = data # Atribuindo o dicionário data a classe
+            self.evaluator = evaluator # Avaliador do backend escolhido (serial ou em paralelo)
+
+        def _evaluate(self, X, out, *args, **kwargs):
+
+            # X: matriz da população, shape (pop_size, nvars)
+            fval, c_ieq, c_eq = self.evaluator(X)
 
-        def _evaluate(self, x, out, *args, **kwargs):
+            out['F'] = - fval[:, None]
+            out['G'] = c_ieq
+            out['H'] = c_eq
 
-            out['F'] = - obj_function(x, self.data)
-            out['G'] = ieq_constr(x, self.data)
-            out['H'] = eq_constr(x, self.data)
+    # Tempos da decomposição, da função objetivo e das restrições (telemetria)
+    timings = {} if telemetry is not None else None
+
+    # Avaliador da população: estocástico (todos os cenários), serial ou em um pool de processos com os dados em memória compartilhada
+    if scenarios is not None:
+        if n_workers > 1 or backend != 'numpy':
+            raise ValueError('A função objetivo estocástica (scenarios) usa apenas o backend numpy, com n_workers = 1')
+        if cvar_weight > 0:
+            check_alpha(cvar_alpha)
+        evaluator = StochasticEvaluator(data, scenarios, cvar_alpha, cvar_weight)
+    elif n_workers > 1:
+        evaluator = ParallelEvaluator(data, n_workers, backend)
+    else:
+        evaluator = get_evaluator(data, backend, timings)
 
     # Instanciando a classe problema
     problem = MyProblem(data,
+                        evaluator,
                         n_obj = 1,
                         n_var = nvars,
                         n_eq_constr = c_eq,
@@ -94,26 +156,141 @@ def solver(data: dict):
     from pymoo.constraints.eps import AdaptiveEpsilonConstraintHandling
 
     # Aplicando penalidades as restrições do problema
-    problem = ConstraintsAsPenalty(problem, penalty = 100.0)
+    problem = ConstraintsAsPenalty(problem, penalty = penalty)
+
+    # pop_size = 50
+
+    # Melhor despacho factível encontrado (anytime), informado a on_improve sempre que melhora
+    tracker = BestFeasibleTracker(layout, on_improve)
+    gap_callback = None
+
+    # Indivíduos semeados na população inicial (início a quente e/ou solução relaxada)
+    seeds = []
+    if initial is not None:
+        n_warm = max(len(np.atleast_2d(initial)), int(round(initial_frac * pop_size)))
+        seeds.append(warm_start_population(initial, data, min(n_warm, pop_size), seed = seed))
+
+    # Relaxação linear: limite superior do lucro e solução relaxada
+    if lp_bound or lp_seed > 0 or gap_tol is not None:
+        bound, x_lp, _ = lp_relaxation(data)
+        gap_callback = GapCallback(bound, verbose)
+
+        n_seed = int(round(lp_seed * pop_size)) if x_lp is not None else 0
+        if n_seed > 0:
+            seeds.append(lp_seed_population(x_lp, data, n_seed, seed))
+
+    # População inicial: indivíduos semeados e o restante aleatório dentro dos limites
+    sampling = None
+    if seeds:
+        seeds = np.vstack(seeds)[:pop_size]
+        rng = np.random.default_rng(seed)
+        sampling = np.vstack((seeds, lb + rng.random((pop_size - len(seeds), nvars)) * (ub - lb)))
+        if mixed:
+            sampling[:, layout.Nr:] = sampling[:, layout.Nr:] > 0.5
 
     # Definindo o algoritmo 
     # algorithm = GA(pop_size = 100, eliminate_duplicates = True)
-    algorithm = AdaptiveEpsilonConstraintHandling(GA(pop_size = 50, eliminate_duplicates = True), perc_eps_until = 0.5)
+    options = {}
+    if sampling is not None:
+        options['sampling'] = sampling
+    if repair:
+        options['repair'] = VPPRepair(data)
+    if mixed:
+        options['crossover'] = MixedCrossover(data)
+        options['mutation'] = MixedMutation(data)
+        options.setdefault('sampling', MixedSampling(data))
+    algorithm = GA(pop_size = pop_size, eliminate_duplicates = True, **options)
+    if eps_until is not None:
+        algorithm = AdaptiveEpsilonConstraintHandling(algorithm, perc_eps_until = eps_until)
 
     # Definindo quando o algoritmo deve parar
     # termination = RobustTermination(SingleObjectiveSpaceTermination(tol = 0.1), period = 15)
     # termination = DefaultSingleObjectiveTermination(xtol = 0.01, cvtol = 0.01, ftol = 0.01, period = 15)
     # termination = SingleObjectiveSpaceTermination()
-    termination = ('n_gen', 50)
-
-    res = minimize(problem,
-                   algorithm,
-                   termination,
-                   return_least_infeasible = True,
-                   seed = 1,
-                   verbose = True,
-                   progress = True
-                   )
+    # termination = ('n_gen', 50)
+    # Critérios de parada: o primeiro que for satisfeito encerra o GA (número de gerações, tempo, estagnação, convergência ou gap)
+    criteria = []
+    if n_gen is not None:
+        criteria.append(get_termination('n_gen', n_gen))
+    if time_budget is not None:
+        criteria.append(TimeBasedTermination(time_budget))
+    if stagnation is not None:
+        criteria.append(StagnationTermination(tracker, stagnation))
+    if ftol is not None:
+        criteria.append(RobustTermination(SingleObjectiveSpaceTermination(tol = ftol), period = 15))
+    if gap_tol is not None:
+        criteria.append(GapTermination(bound, gap_tol))
+    if not criteria:
+        raise ValueError('Informe ao menos um critério de parada (n_gen, time_budget, stagnation, ftol ou gap_tol)')
+    termination = criteria[0] if len(criteria) == 1 else TerminationCollection(*criteria)
+
+    callbacks = [tracker]
+    if gap_callback is not None:
+        callbacks.append(gap_callback)
+    if telemetry is not None:
+        callbacks.append(TelemetryCallback(telemetry, timings))
+    callback = Callbacks(*callbacks)
+
+    # Objetos do processo atual que não são gravados nos checkpoints (recriados na retomada): problema, avaliador e barra de progresso
+    external = {'problem': problem, 'evaluator': evaluator}
+    if on_improve is not None:
+        external['on_improve'] = on_improve
+    checkpointer = None
+    if checkpoint is not None:
+        if checkpoint_every is None and checkpoint_seconds is None:
+            checkpoint_every = 10
+        checkpointer = Checkpointer(checkpoint, checkpoint_every, checkpoint_seconds)
+
+    try:
+        if resume is not None:
+            # Retomando o algoritmo (população, gerador aleatório, geração e esquema de epsilon) a partir do checkpoint
+            external['progress'] = ProgressBar() if verbose else _NoProgress()
+            algorithm = load_checkpoint(resume, external)
+            algorithm.display.verbose = verbose
+            callbacks = algorithm.callback.callbacks
+            tracker = callbacks[0]
+            gap_callback = next((c for c in callbacks if isinstance(c, GapCallback)), None)
+            tracker.on_improve = on_improve
+            for c in callbacks:
+                if isinstance(c, TelemetryCallback):
+                    c.timings, c.last = timings, None
+        else:
+            algorithm.setup(problem,
+                            termination = termination,
+                            callback = callback,
+                            return_least_infeasible = True,
+                            seed = seed,
+                            verbose = verbose,
+                            progress = verbose
+                            )
+            if algorithm.display.progress is not None:
+                external['progress'] = algorithm.display.progress
+
+        # Executando as gerações (equivalente a minimize), com gravação periódica do estado do algoritmo
+        while algorithm.has_next():
+            algorithm.next()
+            if migration is not None:
+                migration(algorithm)
+            if checkpointer is not None and checkpointer.due(algorithm.n_gen):
+                checkpointer.save(algorithm, external)
+
+        res = algorithm.result()
+        res.algorithm = algorithm
+    finally:
+        if n_workers > 1:
+            evaluator.close()
+
+    # Resultado: melhor despacho factível encontrado (mesmo quando o GA é encerrado pelo limite de tempo)
+    if tracker.x is not None:
+        res.X = tracker.x
+        res.F = np.array([- tracker.profit])
+        res.CV = np.array([0.0])
+    res.best_history = tracker.history
+
+    # Limite superior e histórico do gap (quando a relaxação linear é resolvida)
+    if gap_callback is not None:
+        res.lp_bound = gap_callback.bound
+        res.gap_history = gap_callback.history
 
 
     return res
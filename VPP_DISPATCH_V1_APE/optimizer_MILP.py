@@ -0,0 +1,196 @@
+from linear_constraints import compile_constraints
+from scenario_context import get_context
+from variable_layout import get_layout
+from evaluator import evaluate
+from get_limits import bounds
+from scipy.optimize import milp, LinearConstraint, Bounds
+from scipy import sparse
+import numpy as np
+
+'''
+    Este script implementa um otimizador exato, por Programação Linear Inteira Mista (MILP), para maximizar o lucro de uma
+    Virtual Power Plant (VPP). O modelo é o mesmo do GA (optimizer_GA), resolvido pelo HiGHS incluído no SciPy (scipy.optimize.milp).
+
+    -> Linearização do modelo:
+        - Produtos p * u: as restrições p <= p_max * u (UBTMs, armazenadores e cargas despacháveis) garantem p = 0 quando u = 0,
+          de modo que p * u = p em qualquer solução factível;
+        - Potência líquida: p_liq = p_exp - p_imp, com p_exp, p_imp >= 0 e um estado binário y (1 exportando, 0 importando):
+          p_exp <= M_exp * y e p_imp <= M_imp * (1 - y), onde M_exp e M_imp são os maiores valores possíveis de p_liq e - p_liq;
+        - Custo de partida das UBTMs: variável s[i, t] >= u_bm[i, t] - u_bm[i, t - 1], s >= 0, para t = 1, ..., Nt - 1;
+        - Restrições de desigualdade e de igualdade: matrizes esparsas compiladas por linear_constraints.
+
+    -> Vetor de variáveis do MILP: z = [x, p_exp, p_imp, y, s], onde x é o vetor de variáveis de decisão do GA (Nr + Ni).
+
+    -> Parâmetros de Entrada:
+        - data (dict): Dicionário com os dados iniciais e projeções temporais da VPP;
+        - time_limit (float): Tempo máximo de solução em segundos (opcional);
+        - mip_rel_gap (float): Gap relativo de otimalidade aceito pelo HiGHS.
+
+    -> Funções disponíveis:
+        - build_model(data): retorna (c, constraints, integrality, bounds, offset) do MILP, com lucro = - c @ z - offset;
+        - solver_milp(data, time_limit, mip_rel_gap): resolve o MILP;
+        - lp_relaxation(data): resolve a relaxação linear (estados em [0, 1]) e retorna (limite superior do lucro, x relaxado, resultado do SciPy).
+
+    -> Saída de solver_milp:
+        - res (MILPResult): Resultado compatível com o do GA (res.X, res.F, res.CV), além do status e da mensagem do HiGHS
+          (res.status, res.message) e do resultado original do SciPy (res.milp).
+'''
+
+class MILPResult:
+
+    def __init__(self, X, F, CV, status: int, message: str, milp_res):
+        self.X = X # Vetor de variáveis de decisão no layout do GA (None se não houver solução)
+        self.F = F # Lucro negativo, shape (1,) (mesma convenção do GA)
+        self.CV = CV # Violação total das restrições, shape (1,)
+        self.status = status
+        self.message = message
+        self.milp = milp_res
+
+def build_model(data: dict)-> tuple:
+
+    layout = get_layout(data)
+    ctx = get_context(data)
+    Nt, Nbm = layout.Nt, layout.Nbm
+    nvars = layout.nvars
+
+    # Posição das variáveis auxiliares em z
+    o_exp = nvars
+    o_imp = o_exp + Nt
+    o_y = o_imp + Nt
+    o_s = o_y + Nt
+    nz = o_s + Nbm * Nt
+
+    # Índice de cada variável de decisão em x, no layout (N, Nt)
+    idx = np.arange(nvars)
+    col = {name: layout.view(idx, name) for name in layout.NAMES}
+    t = np.arange(Nt)
+
+    # Limites das variáveis: x (mesmos do GA), p_exp, p_imp >= 0, y em {0, 1} e s em [0, 1] (nulo em t = 0)
+    ub, lb = bounds(data)
+    s_ub = np.ones((Nbm, Nt))
+    s_ub[:, 0] = 0
+    upper = np.concatenate((ub, np.full(2 * Nt, np.inf), np.ones(Nt), s_ub.ravel()))
+    lower = np.concatenate((lb, np.zeros(3 * Nt + Nbm * Nt)))
+
+    # Variáveis inteiras: estados de operação de x e estado de exportação y
+    integrality = np.zeros(nz)
+    integrality[layout.Nr: nvars] = 1
+    integrality[o_y: o_s] = 1
+
+    # Função objetivo (minimização do lucro negativo, sem os custos fixos Cpv e Cwt)
+    c = np.zeros(nz)
+    c[o_exp: o_imp] = - ctx.tau_pld_pu
+    c[o_imp: o_y] = ctx.tau_dist_pu
+    c[col['p_bm']] = data['kappa_bm'][:, None]
+    c[col['p_chg']] = data['kappa_bat'][:, None]
+    c[col['p_dch']] = data['kappa_bat'][:, None]
+    c[col['p_dl']] = ctx.tau_dl_pu
+    c[o_s: nz] = np.repeat(data['kappa_bm_start'], Nt)
+
+    # Restrições da VPP compiladas (as linhas de igualdade sem variáveis são descartadas)
+    constraints = compile_constraints(data)
+    A_eq = constraints.A_eq
+    rows_eq = np.flatnonzero(np.diff(A_eq.indptr))
+    A_ieq = sparse.hstack((constraints.A_ieq, sparse.csr_matrix((layout.n_ieq, nz - nvars))), format = 'csr')
+    A_eq = sparse.hstack((A_eq[rows_eq], sparse.csr_matrix((len(rows_eq), nz - nvars))), format = 'csr')
+
+    # Balanço de potência: sum p_bm - sum p_dl - sum p_chg - sum p_dch - p_exp + p_imp = - p_fixed
+    rows, cols, vals = [], [], []
+    for name, sign in (('p_bm', 1.0), ('p_dl', -1.0), ('p_chg', -1.0), ('p_dch', -1.0)):
+        rows.append(np.broadcast_to(t, col[name].shape).ravel())
+        cols.append(col[name].ravel())
+        vals.append(np.full(col[name].size, sign))
+    rows += [t, t]
+    cols += [o_exp + t, o_imp + t]
+    vals += [np.full(Nt, -1.0), np.ones(Nt)]
+    A_bal = sparse.csr_matrix((np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))), shape = (Nt, nz))
+
+    # Maiores valores de p_liq e - p_liq em cada instante (big-M da exportação e da importação)
+    M_exp = np.maximum(ctx.p_fixed + np.sum(data['p_bm_max']), 0)
+    M_imp = np.maximum(- ctx.p_fixed + np.sum(data['p_dl_max'], axis = 0) + 2 * np.sum(data['p_bat_max']), 0)
+
+    # p_exp - M_exp * y <= 0 e p_imp + M_imp * y <= M_imp
+    A_exp = sparse.csr_matrix((np.concatenate((np.ones(Nt), - M_exp)), (np.tile(t, 2), np.concatenate((o_exp + t, o_y + t)))), shape = (Nt, nz))
+    A_imp = sparse.csr_matrix((np.concatenate((np.ones(Nt), M_imp)), (np.tile(t, 2), np.concatenate((o_imp + t, o_y + t)))), shape = (Nt, nz))
+
+    # Partidas das UBTMs: u_bm[i, t] - u_bm[i, t - 1] - s[i, t] <= 0, para t = 1, ..., Nt - 1
+    n_start = Nbm * (Nt - 1)
+    r = np.arange(n_start)
+    s_col = (o_s + np.arange(Nbm * Nt).reshape(Nbm, Nt))[:, 1:]
+    A_start = sparse.csr_matrix((np.concatenate((np.ones(n_start), - np.ones(n_start), - np.ones(n_start))),
+                                 (np.tile(r, 3), np.concatenate((col['u_bm'][:, 1:].ravel(), col['u_bm'][:, :-1].ravel(), s_col.ravel())))),
+                                shape = (n_start, nz))
+
+    milp_constraints = [LinearConstraint(A_ieq, - np.inf, constraints.b_ieq),
+                        LinearConstraint(A_eq, constraints.b_eq[rows_eq], constraints.b_eq[rows_eq]),
+                        LinearConstraint(A_bal, - ctx.p_fixed, - ctx.p_fixed),
+                        LinearConstraint(A_exp, - np.inf, 0),
+                        LinearConstraint(A_imp, - np.inf, M_imp),
+                        LinearConstraint(A_start, - np.inf, 0)]
+
+    # Custos fixos do cenário (lucro = - c @ z - offset)
+    offset = ctx.Cpv + ctx.Cwt
+
+    return c, milp_constraints, integrality, Bounds(lower, upper), offset
+
+def solver_milp(data: dict, time_limit: float = None, mip_rel_gap: float = 1E-6)-> MILPResult:
+
+    layout = get_layout(data)
+    nvars = layout.nvars
+    c, milp_constraints, integrality, z_bounds, _ = build_model(data)
+
+    options = {'mip_rel_gap': mip_rel_gap}
+    if time_limit is not None:
+        options['time_limit'] = time_limit
+
+    res = milp(c, constraints = milp_constraints, integrality = integrality, bounds = z_bounds, options = options)
+
+    if res.x is None:
+        return MILPResult(None, None, None, res.status, res.message, res)
+
+    # Solução no layout do GA, avaliada pelas mesmas funções do GA (lucro e violação das restrições)
+    x = res.x[:nvars].copy()
+    x[layout.Nr:] = np.round(x[layout.Nr:])
+    fval, c_ieq, c_eq = evaluate(x, data)
+    CV = np.sum(np.maximum(0, c_ieq)) + np.sum(np.abs(c_eq))
+
+    return MILPResult(x, np.array([- fval]), np.array([CV]), res.status, res.message, res)
+
+def lp_relaxation(data: dict)-> tuple:
+
+    # Relaxação linear do MILP: estados de operação (e de exportação) contínuos em [0, 1]
+    c, milp_constraints, integrality, z_bounds, offset = build_model(data)
+    res = milp(c, constraints = milp_constraints, integrality = np.zeros_like(integrality), bounds = z_bounds)
+
+    if res.x is None:
+        return np.inf, None, res
+
+    # Limite superior do lucro e solução relaxada no layout do GA
+    return - res.fun - offset, res.x[:get_layout(data).nvars], res
+
+# Exemplo de uso
+if __name__ == '__main__':
+
+    from vpp_initial_data import vpp_data
+    from generator_scenarios import import_scenarios_from_pickle
+    from scenario_context import attach_scenario
+    from pathlib import Path
+    from time import perf_counter
+
+    data = vpp_data()
+    data['Nt'] = 24
+
+    # Obtendo as projeções temporais iniciais a partir de um cenário gerado anteriormente
+    path = Path(__file__).parent / 'scenarios_with_PVGIS.pkl'
+    cenario = import_scenarios_from_pickle(path)[0]
+    attach_scenario(data, cenario)
+    data['p_dl_max'] = cenario['p_dl_ref'] * 1.2
+    data['p_dl_min'] = cenario['p_dl_ref'] * 0.8
+
+    start = perf_counter()
+    res = solver_milp(data)
+    print(f'{res.message} ({(perf_counter() - start) * 1E3:.1f} ms)')
+    print(f'Lucro: {- res.F[0]:.4f}, violação das restrições: {res.CV[0]:.2e}')
+
+    bound, x_lp, _ = lp_relaxation(data)
+    print(f'Limite superior (relaxação linear): {bound:.4f}, gap: {(bound + res.F[0]) / abs(bound):.2%}')
@@ -0,0 +1,216 @@
+from evaluator import get_evaluator
+from variable_layout import get_layout
+from multiprocessing import Pool, shared_memory
+from multiprocessing.util import Finalize
+from scenario_context import ScenarioContext
+import numpy as np
+import gc
+
+'''
+    Este script fornece a avaliação paralela da população do GA em um conjunto (pool) de processos. Os arrays do dicionário data
+    (projeções do cenário p_pv, p_wt, p_l, tau_*, limites p_dl_* e parâmetros dos ativos) são copiados uma única vez para memória
+    compartilhada; cada processo monta o seu dicionário data com visões (sem cópia) desses blocos e cria o seu avaliador na
+    inicialização. A população e os resultados (fval, c_ieq, c_eq) também ficam em blocos compartilhados, de modo que a cada
+    geração apenas os limites (begin, end) do trecho de cada processo trafegam entre os processos.
+
+    - Os valores de data que não são arrays são copiados para cada processo (escalares do NumPy como tipos do Python); o
+      contexto do cenário (scenario_ctx) é reconstruído em cada processo e outros tipos levantam TypeError.
+
+    - Classe ParallelEvaluator(data: dict, n_workers: int, backend: str):
+        - Chamada com X, shape (Npop, Nr + Ni): divide a população em n_workers trechos contíguos e retorna (fval, c_ieq, c_eq),
+          na mesma ordem (e com os mesmos valores) da avaliação serial;
+        - close(): encerra os processos e libera a memória compartilhada (também usado como gerenciador de contexto, with).
+'''
+
+# Avaliador, layout e blocos de memória compartilhada de cada processo (definidos em _init_worker e _attach)
+_worker_evaluator = None
+_worker_layout = None
+_worker_blocks = {}
+
+def _share(data: dict)-> tuple[list, dict]:
+
+    # Copiando os arrays de data para memória compartilhada; os demais valores seguem com a especificação
+    blocks, spec = [], {}
+    try:
+        for key, value in data.items():
+            if isinstance(value, np.ndarray):
+                shm = shared_memory.SharedMemory(create = True, size = max(value.nbytes, 1))
+                blocks.append(shm)
+                np.ndarray(value.shape, value.dtype, buffer = shm.buf)[...] = value
+                spec[key] = ('shm', shm.name, value.shape, value.dtype.str)
+            elif isinstance(value, ScenarioContext):
+                continue # Reconstruído em cada processo (scenario_context.get_context)
+            elif isinstance(value, np.generic):
+                spec[key] = ('value', value.item())
+            elif value is None or isinstance(value, (bool, int, float, str, dict, list, tuple)):
+                spec[key] = ('value', value) # Valores pequenos (por exemplo, initial_state), copiados para cada processo
+            else:
+                raise TypeError(f"data['{key}'] do tipo {type(value).__name__} não é suportado pela avaliação paralela")
+    except BaseException:
+        ParallelEvaluator._release(blocks)
+        raise
+
+    return blocks, spec
+
+def _attach(name: str, shape: tuple, dtype: str = '<f8')-> np.ndarray:
+
+    # Visão de um bloco de memória compartilhada (o bloco é aberto uma única vez em cada processo)
+    if name not in _worker_blocks:
+        _worker_blocks[name] = shared_memory.SharedMemory(name = name)
+
+    return np.ndarray(shape, np.dtype(dtype), buffer = _worker_blocks[name].buf)
+
+def _init_worker(spec: dict, backend: str)-> None:
+
+    global _worker_evaluator, _worker_layout
+
+    # Montando data com visões dos blocos compartilhados
+    data = {}
+    for key, item in spec.items():
+        if item[0] == 'shm':
+            _, name, shape, dtype = item
+            data[key] = _attach(name, shape, dtype)
+        else:
+            data[key] = item[1]
+
+    _worker_layout = get_layout(data)
+    _worker_evaluator = get_evaluator(data, backend)
+
+    # Blocos compartilhados fechados ao encerrar o processo
+    Finalize(None, _close_blocks, exitpriority = 10)
+
+def _close_blocks()-> None:
+
+    global _worker_evaluator
+
+    # O avaliador mantém visões dos blocos: é descartado antes de fechá-los
+    _worker_evaluator = None
+    gc.collect()
+    for shm in _worker_blocks.values():
+        try:
+            shm.close()
+        except BufferError:
+            pass # Visões ainda em uso, liberadas pelo sistema ao fim do processo
+    _worker_blocks.clear()
+
+def _evaluate_chunk(task: tuple)-> None:
+
+    # Avalia as linhas [begin, end) da população compartilhada e escreve os resultados nas saídas compartilhadas
+    names, capacity, begin, end = task
+    layout = _worker_layout
+    X = _attach(names[0], (capacity, layout.nvars))
+    F = _attach(names[1], (capacity,))
+    G = _attach(names[2], (capacity, layout.n_ieq))
+    H = _attach(names[3], (capacity, layout.n_eq))
+
+    F[begin: end], G[begin: end], H[begin: end] = _worker_evaluator(X[begin: end])
+
+class ParallelEvaluator:
+
+    def __init__(self, data: dict, n_workers: int, backend: str = 'numpy'):
+
+        self.n_workers = n_workers
+        self.layout = get_layout(data)
+        self.blocks, spec = _share(data)
+        self.buffers = [] # População (X) e resultados (F, G, H) compartilhados
+        self.capacity = 0
+        self.pool = Pool(n_workers, initializer = _init_worker, initargs = (spec, backend))
+
+    def _reserve(self, Npop: int)-> None:
+
+        # (Re)alocando os blocos da população e dos resultados quando a população cresce
+        if Npop <= self.capacity:
+            return
+        self._release(self.buffers)
+        widths = (self.layout.nvars, 1, self.layout.n_ieq, self.layout.n_eq)
+        self.buffers = [shared_memory.SharedMemory(create = True, size = max(8 * Npop * w, 1)) for w in widths]
+        self.capacity = Npop
+
+    def _view(self, k: int, width: int = None)-> np.ndarray:
+        shape = (self.capacity,) if width is None else (self.capacity, width)
+        return np.ndarray(shape, np.float64, buffer = self.buffers[k].buf)
+
+    def __call__(self, X: np.ndarray)-> tuple:
+
+        Npop = X.shape[0]
+        self._reserve(Npop)
+        self._view(0, self.layout.nvars)[:Npop] = X
+
+        # Trechos contíguos da população (um por processo): apenas os índices dos trechos trafegam entre os processos
+        names = tuple(shm.name for shm in self.buffers)
+        limits = np.linspace(0, Npop, self.n_workers + 1).astype(int)
+        tasks = [(names, self.capacity, begin, end) for begin, end in zip(limits[:-1], limits[1:]) if end > begin]
+        self.pool.map(_evaluate_chunk, tasks)
+
+        fval = self._view(1)[:Npop].copy()
+        c_ieq = self._view(2, self.layout.n_ieq)[:Npop].copy()
+        c_eq = self._view(3, self.layout.n_eq)[:Npop].copy()
+
+        return fval, c_ieq, c_eq
+
+    @staticmethod
+    def _release(blocks: list)-> None:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+    def close(self)-> None:
+
+        self.pool.close()
+        self.pool.join()
+        self._release(self.blocks + self.buffers)
+        self.blocks, self.buffers = [], []
+
+    def __deepcopy__(self, memo):
+        # O pool de processos e a memória compartilhada não são copiados (o pymoo copia o problema em ConstraintsAsPenalty)
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# Exemplo de uso (benchmark de escalabilidade)
+if __name__ == '__main__':
+
+    from vpp_initial_data import vpp_data
+    from generator_scenarios import import_scenarios_from_pickle
+    from scenario_context import attach_scenario
+    from get_limits import bounds
+    from pathlib import Path
+    from time import perf_counter
+    import os
+
+    data = vpp_data()
+    data['Nt'] = 24
+
+    # Obtendo as projeções temporais iniciais a partir de um cenário gerado anteriormente
+    path = Path(__file__).parent / 'scenarios_with_PVGIS.pkl'
+    cenario = import_scenarios_from_pickle(path)[0]
+    attach_scenario(data, cenario)
+    data['p_dl_max'] = cenario['p_dl_ref'] * 1.2
+    data['p_dl_min'] = cenario['p_dl_ref'] * 0.8
+
+    ub, lb = bounds(data)
+    X = lb + np.random.default_rng(1).random((20000, len(ub))) * (ub - lb)
+    repeats = 5
+
+    # Avaliação serial de referência
+    evaluator = get_evaluator(data)
+    start = perf_counter()
+    for _ in range(repeats):
+        reference = evaluator(X)
+    t_serial = (perf_counter() - start) / repeats
+    print(f'Serial: {t_serial * 1E3:.1f} ms ({os.cpu_count()} núcleos disponíveis)')
+
+    for n_workers in (1, 2, 4, 8, 16):
+        with ParallelEvaluator(data, n_workers) as parallel:
+            parallel(X) # Inicialização dos processos
+            start = perf_counter()
+            for _ in range(repeats):
+                result = parallel(X)
+            t = (perf_counter() - start) / repeats
+
+        identical = all(np.array_equal(a, b) for a, b in zip(result, reference))
+        print(f'{n_workers:2d} processos: {t * 1E3:.1f} ms, speedup {t_serial / t:.2f}x, resultados idênticos: {identical}')
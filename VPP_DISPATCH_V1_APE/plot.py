@@ -1,5 +1,6 @@
 import numpy as np
 from matplotlib import pyplot as plt
+from profiling import instrument
 
 '''
     Este script tem a finalidade de mostrar graficamente as projeções e os despachos otimizados de uma VPP.
@@ -17,6 +18,7 @@ from matplotlib import pyplot as plt
         - Retorna (None): Não há retorno nessa função.
 '''
 
+@instrument()
 def plot(data: dict)-> None:
 
     # Potência aparente de base (1MVA)
@@ -0,0 +1,225 @@
+from functools import wraps
+from time import perf_counter
+from pathlib import Path
+import tracemalloc
+import json
+import os
+
+'''
+    Este script fornece a instrumentação de tempo e de memória da VPP: intervalos nomeados (spans) e contadores, registrados ao
+    longo dos módulos (leitura das planilhas em load_projections, geração dos cenários, limites, função objetivo, restrições,
+    avaliador e gráficos) e reunidos em um relatório hierárquico ao final da execução (script.py).
+
+    - A instrumentação fica desligada por padrão: os spans e os contadores retornam imediatamente, com custo desprezível em
+      relação às funções instrumentadas. Ela é ligada por enable() ou pela variável de ambiente VPP_PROFILE (VPP_PROFILE=1
+      para tempos e VPP_PROFILE=memory para tempos e pico de memória com tracemalloc, que torna a execução mais lenta).
+
+    - Cada span é identificado pelo caminho dos spans abertos (por exemplo, solve/evaluate/cost_terms) e acumula:
+        - calls: quantidade de chamadas;
+        - time: tempo total (s);
+        - peak: maior pico de memória alocada pelo Python durante uma chamada, acima da memória no início da chamada (bytes,
+          somente com memória ligada).
+
+    - Apenas o processo atual é medido: com n_workers > 1 (batch_scenarios, parallel_evaluator), o tempo dos processos
+      filhos aparece somente no span que os envolve. O span de plot inclui o tempo das janelas abertas por plt.show().
+
+    - Funções disponíveis:
+        - enable(memory) / disable() / enabled(): liga, desliga e consulta a instrumentação;
+        - reset(): descarta os spans e os contadores registrados;
+        - span(name): gerenciador de contexto (with span('solve'): ...);
+        - instrument(name): decorador que registra cada chamada da função em um span (nome padrão: nome da função);
+        - count(name, n): soma n ao contador name;
+        - stats(): dicionário {caminho: (calls, time, peak)} com os spans registrados;
+        - report(): relatório hierárquico em texto (tempo total, médio, fração do span pai e pico de memória) e contadores;
+        - export(path): grava os spans e os contadores em um arquivo JSON.
+'''
+
+_enabled = False
+_memory = False
+_started_tracemalloc = False
+
+_stats = {} # {caminho: [calls, time, peak]}
+_counters = {}
+_stack = [] # Spans abertos: [caminho, início, memória no início, maior pico observado]
+
+def enable(memory: bool = False)-> None:
+
+    global _enabled, _memory, _started_tracemalloc
+
+    _enabled = True
+    _memory = memory
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _started_tracemalloc = True
+
+def disable()-> None:
+
+    global _enabled, _memory, _started_tracemalloc
+
+    _enabled = False
+    _memory = False
+    if _started_tracemalloc:
+        tracemalloc.stop()
+        _started_tracemalloc = False
+
+def enabled()-> bool:
+    return _enabled
+
+def reset()-> None:
+    _stats.clear()
+    _counters.clear()
+
+class _Span:
+
+    __slots__ = ('name',)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+
+        path = f'{_stack[-1][0]}/{self.name}' if _stack else self.name
+        current = 0
+        if _memory:
+            current, peak = tracemalloc.get_traced_memory()
+            # O pico do span pai é guardado antes de reiniciar o pico para o span atual
+            if _stack:
+                _stack[-1][3] = max(_stack[-1][3], peak)
+            tracemalloc.reset_peak()
+
+        _stack.append([path, perf_counter(), current, current])
+
+        return self
+
+    def __exit__(self, *exc):
+
+        end = perf_counter()
+        path, start, current, peak = _stack.pop()
+
+        if _memory:
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            if _stack:
+                _stack[-1][3] = max(_stack[-1][3], peak)
+            tracemalloc.reset_peak()
+
+        record = _stats.get(path)
+        if record is None:
+            record = _stats[path] = [0, 0.0, 0]
+        record[0] += 1
+        record[1] += end - start
+        record[2] = max(record[2], peak - current)
+
+        return False
+
+class _NullSpan:
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+def span(name: str):
+    return _Span(name) if _enabled else _NULL_SPAN
+
+def instrument(name: str = None):
+
+    def decorator(function):
+
+        label = name or function.__name__
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            with _Span(label):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+def count(name: str, n: int = 1)-> None:
+    if _enabled:
+        _counters[name] = _counters.get(name, 0) + n
+
+def stats()-> dict:
+    return {path: tuple(record) for path, record in _stats.items()}
+
+def _children(path: str)-> list:
+
+    # Spans filhos diretos de path (raízes com path None), na ordem do primeiro registro
+    depth = 0 if path is None else path.count('/') + 1
+    prefix = '' if path is None else path + '/'
+    return [child for child in _stats if child.startswith(prefix) and child.count('/') == depth]
+
+def report()-> str:
+
+    lines = [f'{"span":<48}{"calls":>10}{"time (s)":>12}{"mean (ms)":>12}{"% pai":>8}{"pico (MB)":>11}']
+
+    def visit(path: str, parent_time: float):
+        calls, time, peak = _stats[path]
+        name = '  ' * path.count('/') + path.rsplit('/', 1)[-1]
+        share = f'{100 * time / parent_time:.1f}' if parent_time else ''
+        memory = f'{peak / 1E6:.2f}' if _memory or peak else ''
+        lines.append(f'{name:<48}{calls:>10}{time:>12.4f}{1E3 * time / calls:>12.4f}{share:>8}{memory:>11}')
+        for child in _children(path):
+            visit(child, time)
+
+    for root in _children(None):
+        visit(root, 0.0)
+
+    if _counters:
+        lines.append('')
+        lines.append(f'{"contador":<48}{"valor":>10}')
+        lines.extend(f'{name:<48}{value:>10}' for name, value in _counters.items())
+
+    return '\n'.join(lines)
+
+def export(path)-> None:
+
+    spans = [{'span': span_path, 'calls': calls, 'time': time, 'peak': peak} for span_path, (calls, time, peak) in _stats.items()]
+    with open(Path(path), 'w') as file:
+        json.dump({'spans': spans, 'counters': _counters}, file, indent = 2)
+
+# Ligando a instrumentação pela variável de ambiente VPP_PROFILE
+if os.environ.get('VPP_PROFILE', '').strip().lower() not in ('', '0', 'false', 'no'):
+    enable(memory = os.environ['VPP_PROFILE'].strip().lower() == 'memory')
+
+# Exemplo de uso
+if __name__ == '__main__':
+
+    from vpp_initial_data import vpp_data
+    from generator_scenarios import import_scenarios_from_pickle
+    from scenario_context import attach_scenario
+    from optimizer_GA import solver
+
+    data = vpp_data()
+    data['Nt'] = 24
+
+    # Obtendo as projeções temporais iniciais a partir de um cenário gerado anteriormente
+    path = Path(__file__).parent / 'scenarios_with_PVGIS.pkl'
+    cenario = import_scenarios_from_pickle(path)[0]
+    attach_scenario(data, cenario)
+    data['p_dl_max'] = cenario['p_dl_ref'] * 1.2
+    data['p_dl_min'] = cenario['p_dl_ref'] * 0.8
+
+    # Os módulos instrumentados importam o módulo profiling (e não __main__)
+    import profiling
+
+    # Custo da instrumentação desligada e ligada (com e sem pico de memória) na mesma execução do GA
+    for memory in (None, False, True):
+        if memory is not None:
+            profiling.enable(memory = memory)
+        profiling.reset()
+        start = perf_counter()
+        with profiling.span('solve'):
+            solver(data, verbose = False)
+        print(f'Instrumentação {"desligada" if memory is None else "ligada" + (" (memória)" if memory else "")}: {perf_counter() - start:.2f} s')
+        profiling.disable()
+
+    print(profiling.report())
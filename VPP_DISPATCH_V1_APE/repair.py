@@ -0,0 +1,115 @@
+from pymoo.core.repair import Repair
+from variable_layout import get_layout
+from get_limits import bounds
+import numpy as np
+
+'''
+    Este script implementa um operador de reparo (pymoo Repair) para os descendentes do GA, que projeta cada indivíduo, de forma
+    vetorizada sobre toda a população, na estrutura factível das UBTMs, das cargas despacháveis e dos armazenadores antes da avaliação
+    (após limitar x aos limites das variáveis, o que mantém o estado inicial fixado por data['initial_state']):
+
+        - UBTMs: p_bm em [p_bm_min * u_bm, p_bm_max * u_bm] (p_bm = 0 com a usina desligada) e, quando compatível com esses
+          limites, dentro das rampas de subida e de descida em relação ao instante anterior;
+        - Cargas despacháveis: u_dl = 1 nos instantes com p_dl_min > 0 (a carga não pode ser desligada) e p_dl em
+          [p_dl_min * u_dl, p_dl_max * u_dl];
+        - Armazenadores:
+            - Exclusividade: com u_chg e u_dch ligados no mesmo instante, permanece ligado o estado de maior potência;
+            - p_chg em [0, p_bat_max * u_chg] e p_dch em [0, p_bat_max * u_dch];
+            - SoC: soc[t] = soc[t - 1] + p_chg[t] * eta_chg - p_dch[t] / eta_dch (restrições de igualdade), com soc[0] limitado a
+              [soc_min, soc_max]. Quando o SoC resultante sai dos limites, a potência de carga (ou de descarga) do instante é reduzida.
+
+    - Classe VPPRepair(data: dict): utilizada em GA(repair = VPPRepair(data)) no optimizer_GA.
+'''
+
+class VPPRepair(Repair):
+
+    def __init__(self, data: dict):
+        super().__init__()
+        self.layout = get_layout(data)
+        self.ub, self.lb = bounds(data)
+
+        # Parâmetros das UBTMs, das cargas despacháveis e dos armazenadores
+        self.p_bm_min = data['p_bm_min'][:, None]
+        self.p_bm_max = data['p_bm_max'][:, None]
+        self.p_bm_rup = data['p_bm_rup'][:, None]
+        self.p_bm_rdown = data['p_bm_rdown'][:, None]
+        self.p_dl_min = data['p_dl_min']
+        self.p_dl_max = data['p_dl_max']
+        self.p_bat_max = data['p_bat_max'][:, None]
+        self.soc_min = data['soc_min'][:, None]
+        self.soc_max = data['soc_max'][:, None]
+        self.eta_chg = data['eta_chg'][:, None]
+        self.eta_dch = data['eta_dch'][:, None]
+
+    def _do(self, problem, X, **kwargs):
+
+        X = np.clip(np.array(X, dtype = np.float64), self.lb, self.ub)
+        view = lambda name: self.layout.view(X, name) # Visões (sem cópia) de X, shape (Npop, N, Nt)
+
+        # UBTMs: p_bm em [p_bm_min * u_bm, p_bm_max * u_bm] e, quando possível, dentro das rampas em relação ao instante anterior
+        u_bm = view('u_bm') > 0.5
+        p_bm = view('p_bm')
+        lower, upper = self.p_bm_min * u_bm, self.p_bm_max * u_bm
+        p_bm[:] = np.clip(p_bm, lower, upper)
+        for t in range(1, self.layout.Nt):
+            low = np.maximum(lower[:, :, t], p_bm[:, :, t - 1] - self.p_bm_rdown[:, 0])
+            high = np.minimum(upper[:, :, t], p_bm[:, :, t - 1] + self.p_bm_rup[:, 0])
+            ok = low <= high
+            p_bm[:, :, t] = np.where(ok, np.clip(p_bm[:, :, t], low, high), p_bm[:, :, t])
+
+        # Cargas despacháveis: com p_dl_min > 0 a carga não pode ser desligada; p_dl em [p_dl_min * u_dl, p_dl_max * u_dl]
+        u_dl, p_dl = view('u_dl'), view('p_dl')
+        u_dl[:] = np.where(self.p_dl_min > 0, 1.0, u_dl)
+        p_dl[:] = np.clip(p_dl, self.p_dl_min * (u_dl > 0.5), self.p_dl_max * (u_dl > 0.5))
+
+        # Armazenadores: exclusividade entre carga e descarga (desliga o estado de menor potência)
+        p_chg, p_dch, soc = view('p_chg'), view('p_dch'), view('soc')
+        u_chg, u_dch = view('u_chg'), view('u_dch')
+        both = (u_chg > 0.5) & (u_dch > 0.5)
+        u_dch[both & (p_chg >= p_dch)] = 0.0
+        u_chg[both & (p_chg < p_dch)] = 0.0
+
+        # Potências de carga e de descarga limitadas pelos estados
+        p_chg[:] = np.clip(p_chg, 0, self.p_bat_max * (u_chg > 0.5))
+        p_dch[:] = np.clip(p_dch, 0, self.p_bat_max * (u_dch > 0.5))
+
+        # SoC propagado pela dinâmica de carga e descarga, ajustando as potências que levariam o SoC para fora dos limites
+        soc[:, :, 0] = np.clip(soc[:, :, 0], self.soc_min[:, 0], self.soc_max[:, 0])
+        for t in range(1, self.layout.Nt):
+            soc_t = soc[:, :, t - 1] + p_chg[:, :, t] * self.eta_chg[:, 0] - p_dch[:, :, t] / self.eta_dch[:, 0]
+            excess = np.maximum(soc_t - self.soc_max[:, 0], 0)
+            deficit = np.maximum(self.soc_min[:, 0] - soc_t, 0)
+            p_chg[:, :, t] -= excess / self.eta_chg[:, 0]
+            p_dch[:, :, t] -= deficit * self.eta_dch[:, 0]
+            soc[:, :, t] = soc[:, :, t - 1] + p_chg[:, :, t] * self.eta_chg[:, 0] - p_dch[:, :, t] / self.eta_dch[:, 0]
+
+        return X
+
+# Exemplo de uso
+if __name__ == '__main__':
+
+    from vpp_initial_data import vpp_data
+    from generator_scenarios import import_scenarios_from_pickle
+    from scenario_context import attach_scenario
+    from evaluator import evaluate
+    from get_limits import bounds
+    from pathlib import Path
+
+    data = vpp_data()
+    data['Nt'] = 24
+
+    # Obtendo as projeções temporais iniciais a partir de um cenário gerado anteriormente
+    path = Path(__file__).parent / 'scenarios_with_PVGIS.pkl'
+    cenario = import_scenarios_from_pickle(path)[0]
+    attach_scenario(data, cenario)
+    data['p_dl_max'] = cenario['p_dl_ref'] * 1.2
+    data['p_dl_min'] = cenario['p_dl_ref'] * 0.8
+
+    ub, lb = bounds(data)
+    X = lb + np.random.rand(100, len(ub)) * (ub - lb)
+    Xr = VPPRepair(data)._do(None, X)
+
+    # Violação das restrições de desigualdade e de igualdade (SoC)
+    for name, Y in (('Antes do reparo', X), ('Depois do reparo', Xr)):
+        _, c_ieq, c_eq = evaluate(Y, data)
+        print(f'{name}: max c_ieq = {np.max(c_ieq):.4f}, max |c_eq| = {np.max(np.abs(c_eq)):.2e}')
@@ -0,0 +1,146 @@
+from variable_layout import get_layout, VariableLayout
+from optimizer_GA import solver
+from evaluator import evaluate
+from time import perf_counter
+import numpy as np
+
+'''
+    Este script implementa o despacho em horizonte rolante (receding horizon) da VPP para horizontes longos (semanas, anos), em
+    que o vetor de variáveis do horizonte inteiro (cerca de 8 * Nt * ativos variáveis) tornaria o GA inviável. O horizonte é
+    resolvido em janelas de window períodos que avançam window - overlap períodos por vez: de cada janela são mantidos
+    (commit) apenas os primeiros window - overlap períodos e o restante é descartado e resolvido novamente na janela seguinte
+    (a última janela mantém todos os seus períodos). Assim, o tempo e a memória crescem linearmente com o horizonte.
+
+    - Encadeamento entre janelas: a partir da segunda janela o período t = 0 é o último período mantido da janela anterior, fixado
+      por data['initial_state'] (variable_layout.bounds). Desse modo o SoC dos armazenadores, o estado (ligada/desligada) e a
+      potência das UBTMs (limites de rampa e custo de partida) e os demais blocos continuam do despacho anterior. O período
+      fixado é apenas a condição inicial e não entra no despacho final.
+
+    - Funções disponíveis:
+        - window_data(data, begin, end, initial_state): cópia de data restrita aos períodos [begin, end), com o estado inicial
+          initial_state (dicionário {nome do bloco: valores, shape (N,)}, opcional);
+        - rolling_horizon(data, window, overlap, optimizer, warm_start, verbose, **kwargs): resolve o horizonte inteiro de data
+          por janelas e retorna um RollingResult. optimizer é chamado como optimizer(data_janela, **kwargs) e deve retornar um
+          resultado com X (padrão: optimizer_GA.solver; também aceita optimizer_MILP.solver_milp). Com o GA e warm_start = True,
+          cada janela inicia a quente (initial) a partir da solução da janela anterior, e verbose também controla a saída do GA
+          em cada janela (salvo se verbose for informado em kwargs).
+
+    - Classe RollingResult: X (despacho do horizonte inteiro), F (lucro negativo, shape (1,)) e CV (violação total das
+      restrições, shape (1,)), avaliados sobre o horizonte inteiro com as mesmas funções do GA, e windows, uma lista de tuplas
+      (begin, end, lucro da janela, tempo de solução em s) com os períodos mantidos de cada janela.
+'''
+
+# Projeções temporais de data, shape (..., Nt)
+SERIES = ('p_l', 'p_pv', 'p_wt', 'p_dl_ref', 'tau_pld', 'tau_dist', 'tau_dl', 'p_dl_max', 'p_dl_min')
+
+class RollingResult:
+
+    def __init__(self, X, F, CV, windows: list):
+        self.X = X # Vetor de variáveis de decisão do horizonte inteiro
+        self.F = F # Lucro negativo, shape (1,) (mesma convenção do GA)
+        self.CV = CV # Violação total das restrições, shape (1,)
+        self.windows = windows # (begin, end, lucro, tempo) de cada janela
+
+def window_data(data: dict, begin: int, end: int, initial_state: dict = None)-> dict:
+
+    # Contexto do cenário reconstruído para as projeções da janela (scenario_context.get_context)
+    window = {key: value for key, value in data.items() if key != 'scenario_ctx'}
+    for key in SERIES:
+        if key in data:
+            window[key] = data[key][..., begin: end]
+    window['Nt'] = end - begin
+
+    if initial_state is not None:
+        window['initial_state'] = initial_state
+
+    return window
+
+def _carry(x: np.ndarray, layout: VariableLayout, begin: int, new_layout: VariableLayout, new_begin: int)-> np.ndarray:
+
+    # Despacho x (janela iniciada em begin) nos períodos da nova janela (iniciada em new_begin), repetindo o último período
+    t = np.clip(np.arange(new_layout.Nt) + new_begin - begin, 0, layout.Nt - 1)
+    x_new = np.empty(new_layout.nvars)
+    for name in layout.NAMES:
+        new_layout.view(x_new, name)[:] = layout.view(x, name)[:, t]
+
+    return x_new
+
+def rolling_horizon(data: dict, window: int = 24, overlap: int = 0, optimizer = None, warm_start: bool = True, verbose: bool = True, **kwargs)-> RollingResult:
+
+    if not 0 <= overlap < window:
+        raise ValueError('overlap deve estar entre 0 e window - 1')
+    if optimizer is None:
+        optimizer = solver
+
+    Nt = data['Nt']
+    step = window - overlap
+    layout = get_layout(data)
+    X = np.zeros(layout.nvars)
+
+    windows = []
+    state = None # Estado inicial da próxima janela (último período mantido)
+    previous = None # (x, layout, begin) da janela anterior
+    begin = 0
+    while begin < Nt:
+
+        # Janela [first, end): período fixado (first = begin - 1, a partir da segunda janela) e períodos a otimizar
+        anchor = 1 if begin > 0 else 0
+        first = begin - anchor
+        end = min(begin + window, Nt)
+        commit = end - begin if end == Nt else step
+
+        wdata = window_data(data, first, end, state)
+        wlayout = get_layout(wdata)
+
+        options = dict(kwargs)
+        if optimizer is solver:
+            options.setdefault('verbose', verbose)
+        if warm_start and optimizer is solver and previous is not None:
+            options['initial'] = _carry(*previous, wlayout, first)
+
+        start = perf_counter()
+        res = optimizer(wdata, **options)
+        elapsed = perf_counter() - start
+        if res.X is None:
+            raise RuntimeError(f'Janela [{begin}, {end}) sem solução')
+
+        # Mantendo os primeiros commit períodos a otimizar da janela
+        x = np.asarray(res.X, dtype = np.float64)
+        for name in layout.NAMES:
+            layout.view(X, name)[:, begin: begin + commit] = wlayout.view(x, name)[:, anchor: anchor + commit]
+
+        state = {name: layout.view(X, name)[:, begin + commit - 1].copy() for name in layout.NAMES}
+        previous = (x, wlayout, first)
+        windows.append((begin, begin + commit, - res.F[0], elapsed))
+
+        if verbose:
+            print(f'\nJanela [{begin}, {end}): períodos [{begin}, {begin + commit}) mantidos, lucro {- res.F[0]:.4f}, {elapsed:.2f} s')
+
+        begin += commit
+
+    # Despacho do horizonte inteiro avaliado pelas mesmas funções do GA
+    fval, c_ieq, c_eq = evaluate(X, data)
+    CV = np.sum(np.maximum(0, c_ieq)) + np.sum(np.abs(c_eq))
+
+    return RollingResult(X, np.array([- fval]), np.array([CV]), windows)
+
+# Exemplo de uso
+if __name__ == '__main__':
+
+    from vpp_initial_data import vpp_data
+    from generator_scenarios import create_scenarios
+    from scenario_context import attach_scenario
+
+    data = vpp_data()
+    data['Nt'] = 24 * 7
+
+    # Cenário de uma semana, com banda de corte de carga de 20 %
+    cenario = create_scenarios(1, data)[0]
+    attach_scenario(data, cenario)
+    data['p_dl_max'] = cenario['p_dl_ref'] * 1.2
+    data['p_dl_min'] = cenario['p_dl_ref'] * 0.8
+
+    # Janelas de 24 h que avançam 18 h (6 h de sobreposição), com 100 gerações por janela
+    res = rolling_horizon(data, window = 24, overlap = 6, n_gen = 100, stagnation = 20)
+    print(f'\nLucro da semana: {- res.F[0]:.4f}, violação das restrições: {res.CV[0]:.2e}')
+    print(f'Tempo total: {sum(w[3] for w in res.windows):.2f} s em {len(res.windows)} janelas')
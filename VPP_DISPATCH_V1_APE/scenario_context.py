@@ -0,0 +1,94 @@
+import numpy as np
+
+'''
+    Este script reúne as grandezas da função objetivo que dependem apenas do cenário (projeções e tarifas) e não das variáveis
+    de decisão x. Elas são calculadas uma única vez, quando o cenário é acrescentado ao dicionário data, e reutilizadas em todas
+    as avaliações da função objetivo:
+
+        - p_fixed: Parcela da potência líquida das FVs, EOs e cargas NÃO despacháveis (sum p_pv + sum p_wt - sum p_l), shape (Nt,);
+        - Cpv: Custo de geração solar fotovoltaica;
+        - Cwt: Custo de geração eólica;
+        - tau_pld_pu, tau_dist_pu, tau_dl_pu: Tarifas PLD, da distribuidora e de compensação em p.u./h, shape (Nt,).
+
+    - O contexto guarda cópias somente leitura das projeções de que depende (SOURCES) e é reconstruído quando alguma projeção
+      de data difere da cópia, seja por substituição (data['p_l'] = ...) ou por alteração no lugar (data['p_l'] *= cap_load).
+      Os vetores de data e do cenário não são alterados.
+
+    - Funções disponíveis:
+        - attach_scenario(data: dict, scenario: dict): acrescenta as projeções do cenário a data e constrói o contexto em data['scenario_ctx'];
+        - get_context(data: dict): retorna o contexto de data, reconstruindo-o se as projeções de data tiverem sido alteradas.
+          O contexto (re)construído é gravado em data['scenario_ctx'].
+'''
+
+# Projeções das quais o contexto depende
+SOURCES = ('p_pv', 'p_wt', 'p_l', 'tau_pld', 'tau_dist', 'tau_dl', 'kappa_pv', 'kappa_wt')
+
+def _same(source: np.ndarray, value)-> bool:
+
+    # Comparação byte a byte (mais rápida que np.array_equal para os vetores pequenos das projeções)
+    value = np.asarray(value)
+    return source.shape == value.shape and source.dtype == value.dtype and source.tobytes() == value.tobytes()
+
+class ScenarioContext:
+
+    __slots__ = ('sources', 'p_fixed', 'Cpv', 'Cwt', 'tau_pld_pu', 'tau_dist_pu', 'tau_dl_pu')
+
+    def __init__(self, data: dict):
+
+        # Definindo a potência aparente base (1MVA)
+        S_base = 1E6
+
+        # Cópias somente leitura das projeções usadas (para detectar alterações em data, sem alterar os vetores de data)
+        self.sources = tuple(np.array(data[key]) for key in SOURCES)
+        for source in self.sources:
+            source.flags.writeable = False
+
+        # Potência líquida das FVs, EOs e cargas NÃO despacháveis
+        self.p_fixed = np.sum(data['p_pv'], axis = 0) + np.sum(data['p_wt'], axis = 0) - np.sum(data['p_l'], axis = 0)
+
+        # Custos de geração solar fotovoltaica e eólica
+        self.Cpv = np.sum(data['p_pv'] * data['kappa_pv'][:, None])
+        self.Cwt = np.sum(data['p_wt'] * data['kappa_wt'][:, None])
+
+        # Normalizando as tarifas da distribuidora, PLD e de compensação para p.u./h
+        self.tau_pld_pu = data['tau_pld'] / S_base
+        self.tau_dist_pu = data['tau_dist'] / S_base
+        self.tau_dl_pu = data['tau_dl'] / S_base
+
+    def is_current(self, data: dict)-> bool:
+        return all(_same(source, data[key]) for source, key in zip(self.sources, SOURCES))
+
+def attach_scenario(data: dict, scenario: dict)-> None:
+
+    # Atribuindo os dados do cenário ao dicionário data (p_l, p_pv, p_wt, p_dl_ref, tau_pld, tau_dist, tau_dl)
+    for key, value in scenario.items():
+        data[key] = value
+
+    data['scenario_ctx'] = ScenarioContext(data)
+
+def get_context(data: dict)-> ScenarioContext:
+
+    ctx = data.get('scenario_ctx')
+    if ctx is None or not ctx.is_current(data):
+        ctx = ScenarioContext(data)
+        data['scenario_ctx'] = ctx
+
+    return ctx
+
+# Exemplo de uso
+if __name__ == '__main__':
+
+    from vpp_initial_data import vpp_data
+    from generator_scenarios import import_scenarios_from_pickle
+    from pathlib import Path
+
+    data = vpp_data()
+    data['Nt'] = 24
+
+    path = Path(__file__).parent / 'scenarios_with_PVGIS.pkl'
+    cenario = import_scenarios_from_pickle(path)[0]
+    attach_scenario(data, cenario)
+
+    ctx = data['scenario_ctx']
+    print(f'Cpv = {ctx.Cpv:.4f}, Cwt = {ctx.Cwt:.4f}')
+    print(f'p_fixed shape {ctx.p_fixed.shape}\n{ctx.p_fixed}')
@@ -1,11 +1,19 @@
 from generator_scenarios import import_scenarios_from_pickle, create_scenarios
-from decompose_vetor import decompose
+from dispatch_result import DispatchResult
 from vpp_initial_data import vpp_data
+from scenario_context import attach_scenario
 from optimizer_GA import solver
+from optimizer_MILP import solver_milp
+from rolling_horizon import rolling_horizon
+from batch_scenarios import solve_scenarios
 from update_p_bm import update
 from pathlib import Path
 from plot import plot
+from functools import partial
+from time import perf_counter
+import profiling
 import numpy as np
+import os
 
 '''
     Este script simula uma Virtual Power Plant (VPP) e otimiza o despacho de energia para maximizar o lucro dado um horizonte de tempo (Nt).
@@ -17,7 +25,7 @@ import numpy as np
         2. Carregamento de Cenários: O script carrega dados de cenários (perfis de carga, geração renovável, e tarifas) de um arquivo pickle.
         3. Ajuste das Potências: As potências de carga e geração são ajustadas conforme as capacidades instaladas.
         4. Atualização da Biomassa: Calcula os limites de potência para a usina de biomassa e gera uma curva de duração das cargas (Opcional).
-        5. Otimização do Despacho: O Algoritmo Genético é usado para otimizar o despacho de energia, maximizando o lucro.
+        5. Otimização do Despacho: O Algoritmo Genético (ou o otimizador MILP exato) é usado para otimizar o despacho de energia, maximizando o lucro. Com mais de um cenário, todos são resolvidos em paralelo e são exibidas as estatísticas do lucro (média, percentis e pior caso).
         6. Resultados: Exibe o lucro obtido e gera gráficos das durações das cargas e do despacho otimizado.
 
     -> Entradas:
@@ -26,18 +34,27 @@ import numpy as np
         - cap_wt: Capacidade das Usinas Eólicas em p.u.
         - cap_load: Capacidade das Cargas em p.u.
         - delta: Limite percentual de corte de carga.
+        - otimizador: GA (Algoritmo Genético) ou MILP (Programação Linear Inteira Mista).
+        - janela: Janela do horizonte rolante em horas (opcional, para horizontes longos).
 
     -> Saídas:
         - Lucro: Lucro obtido com a operação da VPP.
         - Gráficos: Curvas de duração das cargas e despacho otimizado.
+        - resultado_despacho.npz: Resultado do despacho (DispatchResult).
+        - Instrumentação (com VPP_PROFILE=1 ou VPP_PROFILE=memory): Relatório hierárquico dos tempos, chamadas e picos de memória (instrumentacao.json).
 
     -> Dependências:
         - generator_scenarios: Carrega cenários de um arquivo pickle.
-        - decompose_vetor: Decomposição do vetor de soluções.
+        - dispatch_result: Resultado do despacho (lucro, parcelas e variáveis de decisão) e gravação em arquivo .npz.
         - vpp_initial_data: Dados iniciais da VPP.
+        - scenario_context: Atribuição do cenário e das grandezas fixas do cenário ao dicionário data.
         - optimizer_GA: Otimização do despacho de energia.
+        - optimizer_MILP: Otimização exata do despacho de energia (MILP, HiGHS).
+        - rolling_horizon: Despacho em horizonte rolante.
+        - batch_scenarios: Solução de todos os cenários em paralelo e estatísticas do lucro.
         - update_p_bm: Atualização dos limites da usina de biomassa.
         - plot: Geração de gráficos de resultados.
+        - profiling: Instrumentação de tempo e memória (desligada por padrão).
 
 '''
 
@@ -113,6 +130,30 @@ while True:
     except ValueError as v:
         print(f'Insira um valor numérico e válido {v}')
 
+# Definindo o otimizador do despacho
+while True:
+    otimizador = input('Insira o otimizador (GA ou MILP) ou tecle enter para GA: ').strip().upper()
+    if otimizador == '':
+        otimizador = 'GA'
+    if otimizador in ('GA', 'MILP'):
+        break
+    print('Insira GA ou MILP')
+
+# Definindo a janela do horizonte rolante (horizontes longos são resolvidos por janelas com 1/4 de sobreposição)
+while True:
+    janela = input('Insira a janela do horizonte rolante em horas ou tecle enter para resolver o horizonte inteiro: ')
+    if janela == '':
+        janela = None
+        break
+    try:
+        janela = int(janela)
+        if janela > 0:
+            break
+        else:
+            print('Insira um valor inteiro e positivo')
+    except ValueError as v:
+        print(f'Insira um valor inteiro e positivo! {v}')
+
 # Carregamento de dados iniciais da VPP
 data = vpp_data()
 data['Nt'] = Nt
@@ -142,18 +183,26 @@ while True:
 # Cenários gerados 
 cenarios = create_scenarios(Ns, data)
 
-# Sorteando aleatoriamente um índice de cenário dentre os disponíveis
-idx = np.random.choice(len(cenarios))
-# Selecionando o cenário correspondente ao índice sorteado
-cenario = cenarios[idx]
-# Atribuindo os dados do cenário ao dicionário 'data':
-data['p_l'] = cenario['p_l']                 # perfil de carga
-data['p_pv'] = cenario['p_pv']               # geração fotovoltaica
-data['p_wt'] = cenario['p_wt']               # geração eólica
-data['p_dl_ref'] = cenario['p_dl_ref']       # carga deslocável de referência
-data['tau_pld'] = cenario['tau_pld']         # tarifa PLD
-data['tau_dist'] = cenario['tau_dist']       # tarifa da distribuidora
-data['tau_dl'] = cenario['tau_dl']           # tarifa de corte de carga
+# Definindo o otimizador: GA ou MILP, resolvido em janelas no horizonte rolante quando a janela é menor que o período
+optimizer = solver_milp if otimizador == 'MILP' else solver
+if janela is not None and janela < Nt:
+    optimizer = partial(rolling_horizon, window = janela, overlap = janela // 4, optimizer = optimizer)
+
+# Com mais de um cenário, todos são resolvidos (em paralelo) e são exibidas as estatísticas do lucro
+idx = 0
+if Ns > 1:
+    # Sem saída dos otimizadores nos processos (cada GA desenharia a sua barra de progresso no mesmo terminal)
+    options = {} if optimizer is solver_milp else {'verbose': False}
+    with profiling.span('solve'):
+        batch = solve_scenarios(data, cenarios, optimizer = optimizer, n_workers = min(Ns, os.cpu_count()), delta = delta, **options)
+    print(f'\n{batch.summary()}\n')
+    idx = batch.median_index()
+
+# Selecionando o cenário exibido (o cenário de lucro mediano, com mais de um cenário)
+cenario = cenarios[idx or 0]
+# Atribuindo os dados do cenário ao dicionário 'data' (perfil de carga, geração fotovoltaica, geração eólica,
+# carga deslocável de referência, tarifas PLD, da distribuidora e de corte de carga) e as grandezas fixas do cenário
+attach_scenario(data, cenario)
 
 # Ajustando as potências pelas capacidades instaladas (em p.u)
 p_l = data['p_l'] * cap_load
@@ -165,30 +214,40 @@ p_dl_ref = data['p_dl_ref'] * cap_load
 data['p_dl_max'] = data['p_dl_ref'] + data['p_dl_ref'] * delta
 data['p_dl_min'] = data['p_dl_ref'] - data['p_dl_ref'] * delta
 
-# Resolvendo o problema de otimização com Algoritmo Genético
-res = solver(data)
-
-x = res.X # Matriz a solução ótima
+# Resolvendo o problema de otimização com Algoritmo Genético ou com o otimizador MILP (resultado do lote com mais de um cenário)
+if Ns > 1:
+    x, elapsed = (batch.X[idx], batch.elapsed[idx]) if idx is not None else (None, None)
+else:
+    start = perf_counter()
+    with profiling.span('solve'):
+        res = optimizer(data)
+    x, elapsed = res.X, perf_counter() - start
 
 if x is not None:
 
-    # Decompondo o vetor de soluções nas variáveis de decisão
-    data['p_bm'], data['p_chg'], data['p_dch'], data['soc'], data['p_dl'], data['u_bm'], data['u_chg'], data['u_dch'], data['u_dl'] = decompose(x, data)
-
-    # Ponderando pelas variáveis de estado (antes do plot)
-    data['p_bm']   = data['p_bm']   * data['u_bm']
-    data['p_chg']  = data['p_chg']  * data['u_chg']
-    data['p_dch']  = data['p_dch']  * data['u_dch']
-    # data['p_dl']   = data['p_dl']   * data['u_dl']
+    # Resultado do despacho (variáveis de decisão, lucro, violação e parcelas da função objetivo), sem alterar data
+    result = DispatchResult.from_solution(x, data, {'solve': elapsed}, optimizer = otimizador, Nt = Nt, Ns = Ns, window = janela, scenario = idx)
 
-    # Gerando gráfico
-    plot(data)
+    # Gerando gráfico (potências ponderadas pelas variáveis de estado)
+    plot({**data, **result.plot_data()})
 
     # Exibindo o lucro obtido
-    valor = res.F[0]
+    valor = result.profit
     valor = f'{valor:,.2f}'.replace(',', 'v').replace('.', ',').replace('v', '.')
 
     print(f'\nO lucro obtido nessa simulação foi de {valor} R$\n')
-    print(f'Nessa simulação as restrições foram violadas {res.CV[0]} vezes\n')
+    print(f'Nessa simulação a violação total das restrições foi de {result.CV:.2e}\n')
+
+    # Gravando o resultado do despacho
+    path = Path(__file__).parent / 'resultado_despacho.npz'
+    result.save(path)
+    print(f'Resultado gravado em {path}\n')
 else:
     print('\nSolução não encontrada\n')
+
+# Relatório da instrumentação de tempo e memória (com a variável de ambiente VPP_PROFILE=1 ou VPP_PROFILE=memory)
+if profiling.enabled():
+    print(profiling.report())
+    path = Path(__file__).parent / 'instrumentacao.json'
+    profiling.export(path)
+    print(f'\nInstrumentação gravada em {path}\n')
@@ -0,0 +1,187 @@
+from decompose_vetor import decompose_pop
+from ieq_constraints import ieq_constr_vars
+from eq_constraints import eq_constr_vars
+import numpy as np
+
+'''
+    Este script fornece a função objetivo estocástica da VPP: um único despacho (here-and-now) é avaliado em todos os cenários
+    de uma só vez. As projeções dos Ns cenários (p_pv, p_wt, p_l e tarifas tau_*) são empilhadas em tensores de shape
+    (Ns, ativo, Nt) e o lucro de toda a população em todos os cenários, shape (Npop, Ns), é calculado em uma única passada
+    vetorizada, sem laços em Python sobre os cenários.
+
+    - Classe ScenarioSet(data, scenarios, probabilities): grandezas dos cenários que independem de x (calculadas uma única vez):
+        - p_fixed: Potência líquida das FVs, EOs e cargas NÃO despacháveis de cada cenário, shape (Ns, Nt);
+        - Cpv, Cwt: Custos de geração solar e eólica de cada cenário, shape (Ns,);
+        - tau_pld_pu, tau_dist_pu, tau_dl_pu: Tarifas de cada cenário em p.u./h, shape (Ns, Nt);
+        - probabilities: Probabilidade de cada cenário, shape (Ns,) (padrão: cenários equiprováveis).
+
+    - Funções disponíveis:
+        - scenario_profit(X, data, scenario_set): lucro de cada indivíduo em cada cenário, shape (Npop, Ns) (ou (Ns,) para x 1-D);
+        - expected_profit(profits, probabilities): lucro esperado, shape (Npop,);
+        - cvar(profits, probabilities, alpha): CVaR do lucro no nível alpha (média ponderada dos piores alpha dos cenários),
+          shape (Npop,);
+        - check_alpha(alpha): levanta ValueError se alpha não estiver em (0, 1].
+
+    - Classe StochasticEvaluator(data, scenarios, alpha, beta, probabilities): avaliador x -> (fval, c_ieq, c_eq) para o GA
+      (optimizer_GA.solver(data, scenarios = ...)), com fval = (1 - beta) * E[lucro] + beta * CVaR_alpha[lucro]. As restrições
+      não dependem do cenário e são avaliadas com os limites de data (p_dl_max, p_dl_min).
+'''
+
+S_base = 1E6 # Potência aparente base (1MVA)
+
+class ScenarioSet:
+
+    __slots__ = ('Ns', 'p_fixed', 'Cpv', 'Cwt', 'tau_pld_pu', 'tau_dist_pu', 'tau_dl_pu', 'probabilities')
+
+    def __init__(self, data: dict, scenarios: list, probabilities: np.ndarray = None):
+
+        Nt = data['Nt']
+        stack = lambda key: np.stack([np.asarray(scenario[key])[..., :Nt] for scenario in scenarios])
+
+        # Projeções empilhadas, shape (Ns, ativo, Nt)
+        p_pv, p_wt, p_l = stack('p_pv'), stack('p_wt'), stack('p_l')
+
+        self.Ns = len(scenarios)
+        self.p_fixed = np.sum(p_pv, axis = 1) + np.sum(p_wt, axis = 1) - np.sum(p_l, axis = 1)
+        self.Cpv = np.einsum('sit,i->s', p_pv, data['kappa_pv'])
+        self.Cwt = np.einsum('sit,i->s', p_wt, data['kappa_wt'])
+
+        # Tarifas empilhadas em p.u./h, shape (Ns, Nt)
+        self.tau_pld_pu = stack('tau_pld') / S_base
+        self.tau_dist_pu = stack('tau_dist') / S_base
+        self.tau_dl_pu = stack('tau_dl') / S_base
+
+        if probabilities is None:
+            probabilities = np.full(self.Ns, 1 / self.Ns)
+        self.probabilities = np.asarray(probabilities, dtype = np.float64)
+
+def _scenario_profit_vars(variables: tuple, data: dict, scenario_set: ScenarioSet)-> np.ndarray:
+
+    p_bm, p_chg, p_dch, soc, p_dl, u_bm, u_chg, u_dch, u_dl = variables
+
+    # Potências efetivas (ponderadas pelos estados)
+    p_bm_on = p_bm * u_bm
+    p_dl_on = p_dl * u_dl
+    p_bat_on = p_chg * u_chg + p_dch * u_dch
+
+    # Potência líquida de cada indivíduo em cada cenário, shape (Npop, Ns, Nt)
+    p_x = np.sum(p_bm_on, axis = 1) - np.sum(p_dl_on, axis = 1) - np.sum(p_bat_on, axis = 1)
+    p_liq = scenario_set.p_fixed + p_x[:, None, :]
+    p_exp = np.maximum(0, p_liq)
+    p_imp = np.maximum(0, -p_liq)
+
+    # Receita e despesa com importação em cada cenário, shape (Npop, Ns)
+    R = np.einsum('pst,st->ps', p_exp, scenario_set.tau_pld_pu)
+    D = np.einsum('pst,st->ps', p_imp, scenario_set.tau_dist_pu)
+
+    # Custo de controle da carga despachada (tarifa do cenário), shape (Npop, Ns)
+    Cdl = np.sum(p_dl_on, axis = 1) @ scenario_set.tau_dl_pu.T
+
+    # Custos que independem do cenário (biomassa, partidas e bateria), shape (Npop,)
+    Cbm = np.einsum('pit,i->p', p_bm_on, data['kappa_bm'])
+    Cbm = Cbm + np.einsum('pit,i->p', np.float64(u_bm[:, :, 1:] > u_bm[:, :, :-1]), data['kappa_bm_start'])
+    Cbat = np.einsum('pit,i->p', p_bat_on, data['kappa_bat'])
+
+    return R - (D + scenario_set.Cpv + scenario_set.Cwt + Cbm[:, None] + Cdl + Cbat[:, None])
+
+def scenario_profit(X: np.ndarray, data: dict, scenario_set: ScenarioSet)-> np.ndarray:
+
+    profits = _scenario_profit_vars(decompose_pop(X, data), data, scenario_set)
+    return profits[0] if np.ndim(X) == 1 else profits
+
+def expected_profit(profits: np.ndarray, probabilities: np.ndarray)-> np.ndarray:
+    return profits @ probabilities
+
+def check_alpha(alpha: float)-> None:
+    if alpha is None or not 0 < alpha <= 1:
+        raise ValueError(f'O nível do CVaR (alpha) deve estar em (0, 1], recebido {alpha}')
+
+def cvar(profits: np.ndarray, probabilities: np.ndarray, alpha: float)-> np.ndarray:
+
+    check_alpha(alpha)
+
+    # Cenários ordenados do pior para o melhor lucro em cada indivíduo
+    order = np.argsort(profits, axis = -1)
+    sorted_profits = np.take_along_axis(profits, order, axis = -1)
+    p = probabilities[order]
+
+    # Peso de cada cenário na cauda de probabilidade alpha (o último cenário da cauda entra parcialmente)
+    before = np.cumsum(p, axis = -1) - p
+    weight = np.clip(alpha - before, 0, p)
+
+    return np.sum(weight * sorted_profits, axis = -1) / alpha
+
+class StochasticEvaluator:
+
+    def __init__(self, data: dict, scenarios: list, alpha: float = None, beta: float = 0.0, probabilities: np.ndarray = None):
+
+        if beta > 0:
+            check_alpha(alpha)
+
+        self.data = data
+        self.scenario_set = ScenarioSet(data, scenarios, probabilities)
+        self.alpha = alpha
+        self.beta = beta
+
+    def objective(self, profits: np.ndarray)-> np.ndarray:
+
+        fval = expected_profit(profits, self.scenario_set.probabilities)
+        if self.beta > 0:
+            fval = (1 - self.beta) * fval + self.beta * cvar(profits, self.scenario_set.probabilities, self.alpha)
+
+        return fval
+
+    def __call__(self, x: np.ndarray)-> tuple:
+
+        # Decompondo o vetor (ou a população) uma única vez, shape (Npop, N, Nt)
+        variables = decompose_pop(x, self.data)
+        fval = self.objective(_scenario_profit_vars(variables, self.data, self.scenario_set))
+        c_ieq = ieq_constr_vars(variables, self.data)
+        c_eq = eq_constr_vars(variables, self.data)
+
+        if np.ndim(x) == 1:
+            return fval[0], c_ieq[0], c_eq[0]
+
+        return fval, c_ieq, c_eq
+
+# Exemplo de uso
+if __name__ == '__main__':
+
+    from vpp_initial_data import vpp_data
+    from generator_scenarios import import_scenarios_from_pickle
+    from scenario_context import attach_scenario
+    from variable_layout import get_layout
+    from get_limits import bounds
+    from evaluator import evaluate
+    from time import perf_counter
+    from pathlib import Path
+
+    data = vpp_data()
+    data['Nt'] = 24
+
+    # Cenários gerados anteriormente; banda de corte de carga em torno da carga de referência média
+    path = Path(__file__).parent / 'scenarios_with_PVGIS.pkl'
+    cenarios = import_scenarios_from_pickle(path)
+    p_dl_ref = np.mean([cenario['p_dl_ref'] for cenario in cenarios], axis = 0)
+    data['p_dl_max'] = p_dl_ref * 1.2
+    data['p_dl_min'] = p_dl_ref * 0.8
+
+    # População aleatória dentro dos limites
+    ub, lb = bounds(data)
+    X = lb + np.random.rand(100, get_layout(data).nvars) * (ub - lb)
+
+    scenario_set = ScenarioSet(data, cenarios)
+    start = perf_counter()
+    profits = scenario_profit(X, data, scenario_set)
+    print(f'Lucro por cenário, shape {profits.shape}, em {(perf_counter() - start) * 1E3:.2f} ms')
+
+    # Conferência com a avaliação de um cenário por vez
+    start = perf_counter()
+    loop = np.empty_like(profits)
+    for s, cenario in enumerate(cenarios):
+        attach_scenario(data, cenario)
+        loop[:, s] = evaluate(X, data)[0]
+    print(f'Laço sobre os cenários em {(perf_counter() - start) * 1E3:.2f} ms, diferença máxima {np.max(np.abs(profits - loop)):.2e}')
+
+    P = scenario_set.probabilities
+    print(f'Lucro esperado do primeiro indivíduo: {expected_profit(profits, P)[0]:.4f}, CVaR 20%: {cvar(profits, P, 0.2)[0]:.4f}')
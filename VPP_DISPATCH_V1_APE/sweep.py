@@ -0,0 +1,151 @@
+from batch_scenarios import scenario_data, common_data
+from optimizer_GA import solver
+from evaluator import evaluate
+from telemetry import n_evals
+from multiprocessing import Pool
+from itertools import product
+from time import perf_counter
+import pandas as pd
+import numpy as np
+
+'''
+    Este script fornece uma varredura (sweep) de configurações do GA (optimizer_GA): tamanho da população, penalização,
+    esquema de epsilon (AdaptiveEpsilonConstraintHandling ou apenas ConstraintsAsPenalty), operadores (codificação mista,
+    reparo) e critérios de parada. Cada configuração é executada em um conjunto fixo de cenários e de sementes, em paralelo em
+    um conjunto (pool) de processos, e os resultados são reunidos em tabelas (pandas.DataFrame) para o ajuste do GA.
+
+    - Funções disponíveis:
+        - grid(**axes): lista de configurações (dicionários de parâmetros de optimizer_GA.solver) com todas as combinações dos
+          valores de cada eixo. Um valor que é um dicionário é incorporado à configuração, o que permite eixos com mais de um
+          parâmetro (por exemplo, termination = ({'n_gen': 50}, {'n_gen': 500, 'ftol': 1E-3}));
+        - run_sweep(data, scenarios, configs, seeds, n_workers, delta, **options): executa cada configuração de configs em cada
+          cenário de scenarios e em cada semente de seeds e retorna uma tabela com uma linha por execução:
+            - config: descrição da configuração; scenario, seed: índice do cenário e semente;
+            - time_to_feasible, gen_to_feasible: tempo (s) e geração em que o primeiro despacho factível foi encontrado (NaN se não houver);
+            - feasible: se algum despacho factível foi encontrado;
+            - profit, CV: lucro e violação total das restrições do despacho final, avaliados com as mesmas funções para todas as
+              configurações (o objetivo do GA depende da penalização);
+            - n_gen, n_eval, time, evals_per_s: gerações executadas, avaliações, tempo de execução (s) e avaliações por segundo;
+          seed, verbose e on_improve são definidos pela varredura e não podem aparecer nas configurações nem em options
+          (ValueError);
+        - summarize(rows): tabela com uma linha por configuração (médias das execuções, pior lucro e fração de execuções factíveis),
+          ordenada pelo lucro médio.
+'''
+
+# Parâmetros da VPP comuns aos cenários de cada processo (definidos em _init_worker)
+_worker_data = None
+
+# Parâmetros do solver definidos pela varredura em cada execução
+_RESERVED = ('seed', 'verbose', 'on_improve')
+
+def _init_worker(data: dict)-> None:
+    global _worker_data
+    _worker_data = data
+
+def _label(config: dict)-> str:
+    return ', '.join(f'{key}={value}' for key, value in config.items())
+
+def _check(config: dict)-> None:
+    reserved = [key for key in config if key in _RESERVED]
+    if reserved:
+        raise ValueError(f'Parâmetro(s) {", ".join(reserved)} definido(s) pela varredura (as sementes são dadas por seeds em run_sweep)')
+
+def grid(**axes)-> list[dict]:
+
+    configs = []
+    for values in product(*axes.values()):
+        config = {}
+        for key, value in zip(axes, values):
+            if isinstance(value, dict):
+                config.update(value)
+            else:
+                config[key] = value
+        _check(config)
+        configs.append(config)
+
+    return configs
+
+def _run(task: tuple)-> dict:
+
+    config, k, scenario, seed, delta, options = task
+    data = scenario_data(_worker_data, scenario, delta)
+
+    # Instantes das melhoras do despacho factível (o primeiro é o tempo até a factibilidade)
+    improvements = []
+    start = perf_counter()
+    res = solver(data, **dict(options, seed = seed, verbose = False, on_improve = lambda dispatch: improvements.append(perf_counter()), **config))
+    elapsed = perf_counter() - start
+
+    n_eval = n_evals(res.algorithm)
+
+    fval, c_ieq, c_eq = evaluate(res.X, data)
+
+    return {'config': _label(config), 'scenario': k, 'seed': seed,
+            'time_to_feasible': improvements[0] - start if improvements else np.nan,
+            'gen_to_feasible': res.best_history[0][0] if res.best_history else np.nan,
+            'feasible': bool(improvements),
+            'profit': fval,
+            'CV': np.sum(np.maximum(0, c_ieq)) + np.sum(np.abs(c_eq)),
+            'n_gen': res.algorithm.n_gen - 1,
+            'n_eval': n_eval,
+            'time': elapsed,
+            'evals_per_s': n_eval / elapsed}
+
+def run_sweep(data: dict, scenarios: list, configs: list, seeds: tuple = (1, 2, 3), n_workers: int = 1, delta: float = 0.2, **options)-> pd.DataFrame:
+
+    for config in (*configs, options):
+        _check(config)
+
+    common = common_data(data, scenarios)
+    tasks = [(config, k, scenario, seed, delta, options) for config in configs for k, scenario in enumerate(scenarios) for seed in seeds]
+
+    if n_workers > 1:
+        with Pool(n_workers, initializer = _init_worker, initargs = (common,)) as pool:
+            rows = list(pool.imap_unordered(_run, tasks))
+    else:
+        _init_worker(common)
+        rows = [_run(task) for task in tasks]
+
+    # Linhas na ordem das configurações, cenários e sementes
+    order = {_label(config): c for c, config in enumerate(configs)}
+    rows = pd.DataFrame(rows)
+    rows = rows.sort_values(['config', 'scenario', 'seed'], key = lambda column: column.map(order) if column.name == 'config' else column)
+
+    return rows.reset_index(drop = True)
+
+def summarize(rows: pd.DataFrame)-> pd.DataFrame:
+
+    summary = rows.groupby('config', sort = False).agg(runs = ('profit', 'size'),
+                                                       feasible = ('feasible', 'mean'),
+                                                       time_to_feasible = ('time_to_feasible', 'mean'),
+                                                       profit = ('profit', 'mean'),
+                                                       worst_profit = ('profit', 'min'),
+                                                       CV = ('CV', 'mean'),
+                                                       time = ('time', 'mean'),
+                                                       evals_per_s = ('evals_per_s', 'mean'))
+
+    return summary.sort_values('profit', ascending = False)
+
+# Exemplo de uso
+if __name__ == '__main__':
+
+    from vpp_initial_data import vpp_data
+    from generator_scenarios import import_scenarios_from_pickle
+    from pathlib import Path
+
+    data = vpp_data()
+    data['Nt'] = 24
+
+    # Três cenários gerados anteriormente e duas sementes por configuração
+    path = Path(__file__).parent / 'scenarios_with_PVGIS.pkl'
+    cenarios = import_scenarios_from_pickle(path)[:3]
+
+    configs = grid(pop_size = (50, 100),
+                   eps_until = (0.5, None),
+                   mixed = (True, False),
+                   termination = ({'n_gen': 50}, {'n_gen': 500, 'ftol': 1E-3}))
+
+    rows = run_sweep(data, cenarios, configs, seeds = (1, 2), n_workers = 4)
+
+    pd.set_option('display.width', 200)
+    print(summarize(rows).to_string(float_format = '{:.4f}'.format))
@@ -0,0 +1,131 @@
+from pymoo.core.callback import Callback
+from pymoo.core.individual import calc_cv
+from time import time
+from pathlib import Path
+import numpy as np
+import json
+import csv
+
+'''
+    Este script fornece a telemetria do GA (optimizer_GA): um callback do pymoo que grava, a cada geração, um registro
+    estruturado em um arquivo local JSONL (um objeto JSON por linha) ou CSV, para acompanhar a convergência e o desempenho das
+    execuções sem depender da saída no console.
+
+    - Campos de cada registro:
+        - n_gen: geração;
+        - wall_time: tempo decorrido desde a primeira geração (s);
+        - n_eval, evals_per_s: avaliações acumuladas e avaliações por segundo na geração;
+        - best_F, mean_F: melhor e média do objetivo original (lucro negativo, antes da penalização);
+        - min_CV, mean_CV: menor e média da violação das restrições originais (mesmas tolerâncias do pymoo);
+        - feasible: fração de indivíduos factíveis;
+        - eps: tolerância atual das restrições (epsilon) de AdaptiveEpsilonConstraintHandling (NaN sem o esquema de epsilon);
+        - t_decompose, t_objective, t_constraints: tempos da decomposição, da função objetivo e das restrições na geração
+          (s, NaN quando o avaliador não os informa, por exemplo com o backend 'numba' ou com n_workers > 1).
+
+    - Funções disponíveis:
+        - n_evals(algorithm): avaliações realizadas pelo algoritmo (inclusive com AdaptiveEpsilonConstraintHandling).
+
+    - Classe TelemetryCallback(path, timings): grava os registros em path (.jsonl ou .csv, acrescentando ao arquivo existente);
+      timings é o dicionário de tempos acumulados pelo avaliador (evaluator.evaluate).
+'''
+
+FIELDS = ('n_gen', 'wall_time', 'n_eval', 'evals_per_s', 'best_F', 'mean_F', 'min_CV', 'mean_CV', 'feasible', 'eps',
+          't_decompose', 't_objective', 't_constraints')
+
+def n_evals(algorithm)-> int:
+
+    # Com AdaptiveEpsilonConstraintHandling o avaliador original fica em wrapped
+    evaluator = algorithm.evaluator
+    return getattr(evaluator, 'wrapped', evaluator).n_eval
+
+class TelemetryCallback(Callback):
+
+    def __init__(self, path, timings: dict = None):
+        super().__init__()
+        self.path = str(path)
+        self.timings = timings
+        self.start = None
+        self.last = None # (instante, avaliações, tempos) da geração anterior
+
+    def record(self, algorithm)-> dict:
+
+        now = time()
+        if self.start is None:
+            self.start = now
+        evals = n_evals(algorithm)
+        timings = dict(self.timings) if self.timings else {}
+        last_time, last_evals, last_timings = self.last if self.last is not None else (now, 0, {})
+        self.last = (now, evals, timings)
+
+        # Objetivo e restrições originais (antes da penalização de ConstraintsAsPenalty)
+        pop = algorithm.pop
+        F = pop.get('__F__')
+        if F is None:
+            F, G, H = pop.get('F'), pop.get('G'), pop.get('H')
+        else:
+            G, H = pop.get('__G__'), pop.get('__H__')
+        CV = calc_cv(G = G, H = H)
+
+        config = getattr(algorithm, 'adapted_config', {})
+        elapsed = now - last_time
+
+        record = {'n_gen': algorithm.n_gen,
+                  'wall_time': now - self.start,
+                  'n_eval': evals,
+                  'evals_per_s': (evals - last_evals) / elapsed if elapsed > 0 else np.nan,
+                  'best_F': np.min(F[:, 0]),
+                  'mean_F': np.mean(F[:, 0]),
+                  'min_CV': np.min(CV),
+                  'mean_CV': np.mean(CV),
+                  'feasible': np.mean(CV <= 0),
+                  'eps': config.get('cv_eps', np.nan)}
+        for name in ('decompose', 'objective', 'constraints'):
+            record[f't_{name}'] = timings[name] - last_timings.get(name, 0.0) if name in timings else np.nan
+
+        return {key: float(value) if key not in ('n_gen', 'n_eval') else int(value) for key, value in record.items()}
+
+    def notify(self, algorithm):
+
+        record = self.record(algorithm)
+        path = Path(self.path)
+
+        # Arquivo aberto a cada geração (em modo de acréscimo), o que mantém o callback compatível com os checkpoints
+        if path.suffix == '.csv':
+            new = not path.exists() or path.stat().st_size == 0
+            with open(path, 'a', newline = '') as file:
+                writer = csv.DictWriter(file, fieldnames = FIELDS)
+                if new:
+                    writer.writeheader()
+                writer.writerow(record)
+        else:
+            with open(path, 'a') as file:
+                file.write(json.dumps({key: None if isinstance(value, float) and np.isnan(value) else value
+                                       for key, value in record.items()}) + '\n')
+
+# Exemplo de uso
+if __name__ == '__main__':
+
+    from vpp_initial_data import vpp_data
+    from generator_scenarios import import_scenarios_from_pickle
+    from scenario_context import attach_scenario
+    from optimizer_GA import solver
+    import tempfile
+    import pandas as pd
+
+    data = vpp_data()
+    data['Nt'] = 24
+
+    # Obtendo as projeções temporais iniciais a partir de um cenário gerado anteriormente
+    path = Path(__file__).parent / 'scenarios_with_PVGIS.pkl'
+    cenario = import_scenarios_from_pickle(path)[0]
+    attach_scenario(data, cenario)
+    data['p_dl_max'] = cenario['p_dl_ref'] * 1.2
+    data['p_dl_min'] = cenario['p_dl_ref'] * 0.8
+
+    with tempfile.TemporaryDirectory() as folder:
+        file = Path(folder) / 'telemetria.jsonl'
+        solver(data, verbose = False, telemetry = file)
+        trace = pd.read_json(file, lines = True)
+
+    pd.set_option('display.width', 200)
+    print(trace.iloc[::10].to_string(index = False, float_format = '{:.4g}'.format))
@@ -0,0 +1,130 @@
+from functools import lru_cache
+import numpy as np
+
+'''
+    Este script define o layout do vetor de variáveis de decisão (x) da VPP, sendo a única fonte das posições (offsets) de cada
+    bloco de variáveis dentro de x. Todos os blocos são armazenados com a usina/armazenador/carga no índice externo e o tempo no
+    índice interno (unit-major), ou seja, cada bloco é reshape de shape (N, Nt).
+
+        - Ordem dos blocos em x: (p_bm, p_chg, p_dch, soc, p_dl, u_bm, u_chg, u_dch, u_dl)
+            - Variáveis reais (Nr): p_bm, p_chg, p_dch, soc, p_dl;
+            - Variáveis inteiras (Ni): u_bm, u_chg, u_dch, u_dl;
+
+    - Funções disponíveis:
+        - get_layout(data: dict): retorna o layout (memoizado) para os parâmetros (Nt, Nbm, Nbat, Ndl) contidos em data;
+        - variable_layout(Nt, Nbm, Nbat, Ndl): retorna o layout (memoizado) para os parâmetros informados.
+
+    - A classe VariableLayout fornece:
+        - Nr, Ni, nvars: quantidade de variáveis reais, inteiras e total;
+        - n_ieq, n_eq: quantidade de restrições de desigualdade e de igualdade da VPP;
+        - view(x, name): visão (sem cópia) do bloco name, shape (N, Nt) para x 1-D ou (Npop, N, Nt) para x 2-D;
+        - decompose(x): tupla com todas as variáveis de decisão (binarizando as variáveis de estado);
+        - bounds(data): vetores de limites superiores e inferiores de x. Quando data contém 'initial_state' (dicionário
+          {nome do bloco: valores, shape (N,)}), o período t = 0 desses blocos é fixado nos valores informados (lb = ub), o que
+          encadeia o horizonte a um despacho anterior (SoC, estado e potência das UBTMs para as rampas, ...).
+'''
+
+class VariableLayout:
+
+    # Ordem dos blocos de variáveis de decisão em x
+    REAL = ('p_bm', 'p_chg', 'p_dch', 'soc', 'p_dl')
+    INTEGER = ('u_bm', 'u_chg', 'u_dch', 'u_dl')
+    NAMES = REAL + INTEGER
+
+    __slots__ = ('Nt', 'Nbm', 'Nbat', 'Ndl', 'Nr', 'Ni', 'nvars', 'n_ieq', 'n_eq', 'blocks')
+
+    def __init__(self, Nt: int, Nbm: int, Nbat: int, Ndl: int):
+
+        self.Nt = Nt # Período da simulação da VPP
+        self.Nbm = Nbm # Quantidade de UBTMs da VPP
+        self.Nbat = Nbat # Quantidade de armazenadores da VPP
+        self.Ndl = Ndl # Quantidade de cargas despacháveis da VPP
+
+        # Quantidade de ativos de cada bloco
+        sizes = {'p_bm': Nbm, 'p_chg': Nbat, 'p_dch': Nbat, 'soc': Nbat, 'p_dl': Ndl,
+                 'u_bm': Nbm, 'u_chg': Nbat, 'u_dch': Nbat, 'u_dl': Ndl}
+
+        # Posição (begin, end) e quantidade de ativos (N) de cada bloco em x
+        self.blocks = {}
+        begin = 0
+        for name in self.NAMES:
+            end = begin + sizes[name] * Nt
+            self.blocks[name] = (begin, end, sizes[name])
+            begin = end
+
+        # Quantidade de variáveis reais (Nr), inteiras (Ni) e total (nvars)
+        self.Nr = self.blocks['p_dl'][1]
+        self.nvars = self.blocks['u_dl'][1]
+        self.Ni = self.nvars - self.Nr
+
+        # Quantidade de restrições de desigualdade (UBTMs, armazenadores e cargas despacháveis) e de igualdade (SoC)
+        Nbmc = (Nbm * Nt) + (Nbm * Nt) + (Nbm * (Nt - 1)) + (Nbm * (Nt - 1))
+        Nbatc = (Nbat * Nt) + (Nbat * Nt) + (Nbat * Nt)
+        Ndlc = (Ndl * Nt) + (Ndl * Nt)
+        self.n_ieq = Nbmc + Nbatc + Ndlc
+        self.n_eq = Nbat * Nt
+
+    def view(self, x: np.ndarray, name: str)-> np.ndarray:
+
+        # Visão do bloco name, shape (N, Nt) para um indivíduo ou (Npop, N, Nt) para uma população
+        begin, end, N = self.blocks[name]
+        return x[..., begin: end].reshape(x.shape[:-1] + (N, self.Nt))
+
+    def decompose(self, x: np.ndarray)-> tuple[np.ndarray, ...]:
+
+        # Variáveis reais: visões de x, sem cópia
+        real = tuple(self.view(x, name) for name in self.REAL)
+
+        # Variáveis inteiras: uma única binarização de todo o trecho inteiro de x
+        xi = np.float64(x[..., self.Nr:] > 0.5)
+        integer = []
+        for name in self.INTEGER:
+            begin, end, N = self.blocks[name]
+            integer.append(xi[..., begin - self.Nr: end - self.Nr].reshape(x.shape[:-1] + (N, self.Nt)))
+
+        return real + tuple(integer)
+
+    def bounds(self, data: dict)-> tuple[np.ndarray, np.ndarray]:
+
+        # Iniciando os vetores limitadores superior e inferior (u_bm, u_chg, u_dch, u_dl: limites 0 e 1)
+        upper_bounds = np.ones(self.nvars)
+        lower_bounds = np.zeros(self.nvars)
+
+        # Limites de p_bm, p_chg, p_dch e soc (por ativo, replicados em t) e de p_dl (por carga e por instante t)
+        # O limite inferior de p_bm é 0 (UBTM desligada); o mínimo p_bm_min * u_bm é imposto pelas restrições de desigualdade
+        limits = {'p_bm': (data['p_bm_max'][:, None], 0),
+                  'p_chg': (data['p_bat_max'][:, None], 0),
+                  'p_dch': (data['p_bat_max'][:, None], 0),
+                  'soc': (data['soc_max'][:, None], data['soc_min'][:, None]),
+                  'p_dl': (data['p_dl_max'], data['p_dl_min'])}
+
+        for name, (upper, lower) in limits.items():
+            self.view(upper_bounds, name)[:] = upper
+            self.view(lower_bounds, name)[:] = lower
+
+        # Estado inicial fixado (período t = 0 igual ao último período de um despacho anterior)
+        for name, value in data.get('initial_state', {}).items():
+            self.view(upper_bounds, name)[:, 0] = value
+            self.view(lower_bounds, name)[:, 0] = value
+
+        return upper_bounds, lower_bounds
+
+@lru_cache(maxsize = None)
+def variable_layout(Nt: int, Nbm: int, Nbat: int, Ndl: int)-> VariableLayout:
+    return VariableLayout(Nt, Nbm, Nbat, Ndl)
+
+def get_layout(data: dict)-> VariableLayout:
+    return variable_layout(data['Nt'], data['Nbm'], data['Nbat'], data['Ndl'])
+
+# Exemplo de uso
+if __name__ == '__main__':
+
+    from vpp_initial_data import vpp_data
+
+    data = vpp_data()
+    data['Nt'] = 24
+
+    layout = get_layout(data)
+    print(f'Nr = {layout.Nr}, Ni = {layout.Ni}, nvars = {layout.nvars}, n_ieq = {layout.n_ieq}, n_eq = {layout.n_eq}\n')
+    for name, (begin, end, N) in layout.blocks.items():
+        print(f'{name}: x[{begin}: {end}] -> shape ({N}, {layout.Nt})')
@@ -0,0 +1,89 @@
+from variable_layout import get_layout
+from get_limits import bounds
+import numpy as np
+
+'''
+    Este script fornece o início a quente (warm start) do GA (optimizer_GA) a partir de despachos obtidos anteriormente, por
+    exemplo o res.X do dia anterior ou de uma resolução com previsões desatualizadas. Despachos consecutivos são muito parecidos,
+    de modo que a população inicial formada por eles (e por variações próximas) converge em poucas gerações.
+
+    - Funções disponíveis:
+        - shift_solution(x, data, shift): desloca no tempo um despacho (ou uma população) em shift períodos, para o horizonte
+          rolante: o período t + shift passa a ser o período t e os últimos shift períodos repetem o último período conhecido;
+        - warm_start_population(initial, data, n, sigma, flip, seed): n indivíduos formados pelos despachos de initial (limitados
+          aos limites das variáveis) seguidos de variações mutadas deles: ruído gaussiano de desvio sigma * (ub - lb) nas variáveis
+          reais e inversão de cada estado com probabilidade flip (padrão 1 / Ni, uma inversão por indivíduo em média).
+
+    - initial: vetor x, shape (nvars,), ou matriz de despachos, shape (k, nvars), com o layout de variable_layout.
+'''
+
+def shift_solution(x: np.ndarray, data: dict, shift: int = 1)-> np.ndarray:
+
+    layout = get_layout(data)
+    Nt = layout.Nt
+    if not 0 <= shift < Nt:
+        raise ValueError(f'shift deve estar entre 0 e {Nt - 1}')
+
+    x = np.asarray(x, dtype = np.float64)
+    xs = np.empty_like(x)
+    for name in layout.NAMES:
+        block = layout.view(x, name)
+        shifted = layout.view(xs, name)
+        shifted[..., :Nt - shift] = block[..., shift:]
+        shifted[..., Nt - shift:] = block[..., -1:]
+
+    return xs
+
+def warm_start_population(initial: np.ndarray, data: dict, n: int, sigma: float = 0.05, flip: float = None, seed: int = 1)-> np.ndarray:
+
+    layout = get_layout(data)
+    Nr = layout.Nr
+    ub, lb = bounds(data)
+    rng = np.random.default_rng(seed)
+
+    initial = np.atleast_2d(np.asarray(initial, dtype = np.float64))
+    if initial.shape[1] != layout.nvars:
+        raise ValueError(f'Os despachos iniciais devem ter {layout.nvars} variáveis, mas têm {initial.shape[1]}')
+    if flip is None:
+        flip = 1 / layout.Ni
+
+    # Despachos iniciais limitados aos limites das variáveis, com os estados binarizados
+    initial = np.clip(initial, lb, ub)
+    initial[:, Nr:] = initial[:, Nr:] > 0.5
+
+    # Primeiros indivíduos: os próprios despachos; demais: variações de cada despacho, em ordem cíclica
+    X = initial[np.arange(n) % len(initial)]
+    k = min(n, len(initial))
+    m = n - k
+    X[k:, :Nr] = np.clip(X[k:, :Nr] + sigma * (ub[:Nr] - lb[:Nr]) * rng.standard_normal((m, Nr)), lb[:Nr], ub[:Nr])
+    X[k:, Nr:] = np.abs(X[k:, Nr:] - (rng.random((m, layout.Ni)) < flip))
+
+    return X
+
+# Exemplo de uso
+if __name__ == '__main__':
+
+    from vpp_initial_data import vpp_data
+    from generator_scenarios import import_scenarios_from_pickle
+    from scenario_context import attach_scenario
+    from optimizer_GA import solver
+    from pathlib import Path
+
+    data = vpp_data()
+    data['Nt'] = 24
+
+    # Obtendo as projeções temporais iniciais a partir de um cenário gerado anteriormente
+    path = Path(__file__).parent / 'scenarios_with_PVGIS.pkl'
+    cenario = import_scenarios_from_pickle(path)[0]
+    attach_scenario(data, cenario)
+    data['p_dl_max'] = cenario['p_dl_ref'] * 1.2
+    data['p_dl_min'] = cenario['p_dl_ref'] * 0.8
+
+    res = solver(data, n_gen = 150)
+    print(f'Lucro (início aleatório, 150 gerações): {- res.F[0]:.4f}')
+
+    # Atualização das previsões de preço (+5%) e nova resolução a partir do despacho anterior
+    cenario = dict(cenario, tau_pld = cenario['tau_pld'] * 1.05)
+    attach_scenario(data, cenario)
+    res = solver(data, initial = res.X, n_gen = 150, stagnation = 10)
+    print(f'Lucro (início a quente, previsões atualizadas): {- res.F[0]:.4f} em {res.algorithm.n_gen} gerações')